@@ -101,6 +101,9 @@ class AbstractEnvironment:
     def _send_training_data(self) -> None:
         raise NotImplementedError
 
+    def _flush_training_data(self) -> None:
+        raise NotImplementedError
+
     def _reset_training_data(self) -> None:
         raise NotImplementedError
 
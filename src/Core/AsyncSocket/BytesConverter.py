@@ -1,8 +1,8 @@
-from typing import Callable, Dict, Union, List
-from numpy import ndarray, array, frombuffer, zeros
-from struct import pack, unpack, calcsize
+from typing import Callable, Dict, Union, List, Tuple, Any
+from numpy import ndarray, array, frombuffer, zeros, ascontiguousarray, asarray, generic
+from struct import pack, unpack, unpack_from, calcsize
 
-Convertible = Union[type(None), bytes, str, bool, int, float, List, ndarray]
+Convertible = Union[type(None), bytes, str, bool, int, float, List, ndarray, Dict[Any, Any]]
 
 
 class BytesConverter:
@@ -28,7 +28,7 @@ class BytesConverter:
         # Bytes to data conversions
         self.__bytes_to_data_conversion: Dict[str, Callable[[...], Convertible]] = {
             type(None).__name__: lambda b: None,
-            bytes.__name__: lambda b: b,
+            bytes.__name__: lambda b: bytes(b),
             str.__name__: lambda b: b.decode('utf-8'),
             bool.__name__: lambda b: unpack('?', b)[0],
             int.__name__: lambda b: unpack('i', b)[0],
@@ -42,6 +42,19 @@ class BytesConverter:
         self.size_from_bytes: Callable[[bytes], int] = lambda b: self.__bytes_to_data_conversion[int.__name__](b)
         self.int_size: int = calcsize("i")
 
+        # Framed messages: a fixed size header (type tag, dtype code, ndim, shape, payload size) followed by the payload
+        self.__type_tags: List[type] = [type(None), bytes, str, bool, int, float, list, ndarray, dict]
+        self.__dtype_codes: List[str] = ['', 'bool', 'int8', 'int16', 'int32', 'int64', 'uint8', 'uint16', 'uint32',
+                                         'uint64', 'float16', 'float32', 'float64', 'complex64', 'complex128']
+        self.max_ndim: int = 8
+        self.header_format: str = '=BBB' + 'I' * self.max_ndim + 'Q'
+        self.header_size: int = calcsize(self.header_format)
+        # Framed arrays keep their own datatype: the payload is the array buffer and is recovered without copy
+        self.__frame_to_data_conversion: Dict[str, Callable[[...], Convertible]] = {
+            list.__name__: lambda b, t, s: frombuffer(b, dtype=t).reshape(s).tolist(),
+            ndarray.__name__: lambda b, t, s: frombuffer(b, dtype=t).reshape(s),
+        }
+
     def data_to_bytes(self,
                       data: Convertible,
                       as_list: bool = False) -> Union[bytes, List[bytes]]:
@@ -50,8 +63,8 @@ class BytesConverter:
         Available types: None, bytes, str, bool, signed int, float, list, ndarray.
 
         :param data: Data to convert.
-        :param as_list: (For tests only, False by default) If False, the whole bytes message is returned. If True, the
-                        return will be a list of bytes fields.
+        :param as_list: If False (by default), the whole bytes message is returned. If True, the return will be a list
+                        of bytes fields that can be sent without concatenation.
         :return: Concatenated bytes fields (Number of fields, Size of fields, Type, Data, Args).
         """
 
@@ -115,3 +128,157 @@ class BytesConverter:
 
         # Convert bytes to data
         return self.__bytes_to_data_conversion[data_type](bytes_fields[1], *args)
+
+    def data_to_frame(self,
+                      data: Convertible,
+                      as_list: bool = False) -> Union[bytes, List[bytes]]:
+        """
+        Convert data to a framed bytes message.
+        Available types: None, bytes, str, bool, signed int, float, list, ndarray, dict.
+
+        :param data: Data to convert.
+        :param as_list: If False (by default), the whole bytes message is returned. If True, the return will be the
+                        list [header, payload] that can be sent without concatenation.
+        :return: Concatenated header and payload.
+        """
+
+        # A whole dictionary is packed in a single frame
+        if type(data) == dict:
+            fields = self.__dict_to_frame(data)
+            return fields if as_list else b''.join(fields)
+
+        # Numpy scalars are sent as 0-d arrays
+        if isinstance(data, generic):
+            data = asarray(data)
+
+        # Shape and datatype are only defined for list and array
+        dtype_code, shape = 0, ()
+        if type(data) in [list, ndarray]:
+            # The shape is kept for 0-d arrays, the payload is in native byte order as frames are decoded natively
+            data_array = asarray(data)
+            data_array = ascontiguousarray(data_array,
+                                           dtype=data_array.dtype.newbyteorder('=')).reshape(data_array.shape)
+            if data_array.dtype.name not in self.__dtype_codes:
+                raise ValueError(f"The datatype {data_array.dtype} cannot be converted to bytes.")
+            if data_array.ndim > self.max_ndim:
+                raise ValueError(f"Arrays with more than {self.max_ndim} dimensions cannot be converted to bytes.")
+            dtype_code, shape = self.__dtype_codes.index(data_array.dtype.name), data_array.shape
+            # Use the buffer of the array with its own datatype
+            payload = data_array.data.cast('B')
+        # Convert 'data' to bytes
+        else:
+            payload = self.__data_to_bytes_conversion[type(data)](data)
+
+        # Gather the header fields in a fixed size header
+        header = pack(self.header_format,
+                      self.__type_tags.index(type(data)), dtype_code, len(shape),
+                      *shape, *(0,) * (self.max_ndim - len(shape)), len(payload))
+        if as_list:
+            return [header, payload]
+        return header + payload
+
+    def header_from_bytes(self,
+                          header: bytes) -> Tuple[str, str, Tuple[int, ...], int]:
+        """
+        Recover the fields of a framed message header.
+
+        :param header: Header of the framed message.
+        :return: Data type, array datatype, array shape, payload size.
+        """
+
+        type_tag, dtype_code, ndim, *shape, payload_size = unpack(self.header_format, header)
+        return self.__type_tags[type_tag].__name__, self.__dtype_codes[dtype_code], tuple(shape[:ndim]), payload_size
+
+    def frame_to_data(self,
+                      header_fields: Tuple[str, str, Tuple[int, ...], int],
+                      payload: bytes) -> Convertible:
+        """
+        Recover data from a framed message.
+
+        :param header_fields: Fields returned by 'BytesConverter.header_from_bytes'.
+        :param payload: Payload of the framed message.
+        :return: Converted data.
+        """
+
+        data_type, dtype, shape, _ = header_fields
+        # A whole dictionary is packed in a single frame
+        if data_type == dict.__name__:
+            return self.__frame_to_dict(payload)
+        # Shape and data type are required for list and array
+        if data_type in [list.__name__, ndarray.__name__]:
+            return self.__frame_to_data_conversion[data_type](payload, dtype, shape)
+        return self.__bytes_to_data_conversion[data_type](payload)
+
+    def __dict_to_frame(self,
+                        data: Dict[Any, Any]) -> List[bytes]:
+        """
+        Convert a (nested) dictionary to a single framed bytes message.
+        The payload is made of an index table followed by the payloads of the values.
+        Each entry of the index table stores the nesting depth, the framed key and the header of the value.
+
+        :param data: Dictionary to convert.
+        :return: List [header, index table, values payloads...].
+        """
+
+        table, payloads = [pack('=I', 0)], []
+        nb_entries = 0
+        # Flatten the dictionary as a list of (depth, key, value) entries
+        entries = [(0, key, value) for key, value in data.items()][::-1]
+        while len(entries) > 0:
+            depth, key, value = entries.pop()
+            nb_entries += 1
+            # Nested dictionaries are entries without payload, their fields are the next entries
+            if type(value) == dict:
+                value_header = pack(self.header_format, self.__type_tags.index(dict), 0, 0,
+                                    *(0,) * self.max_ndim, 0)
+                entries += [(depth + 1, k, v) for k, v in value.items()][::-1]
+            else:
+                value_header, value_payload = self.data_to_frame(value, as_list=True)
+                payloads.append(value_payload)
+            table += [pack('=B', depth), *self.data_to_frame(key, as_list=True), value_header]
+        table[0] = pack('=I', nb_entries)
+
+        # Gather the header, the index table and the values payloads
+        table = b''.join(table)
+        payload_size = len(table) + sum([len(payload) for payload in payloads])
+        header = pack(self.header_format, self.__type_tags.index(dict), 0, 0, *(0,) * self.max_ndim, payload_size)
+        return [header, table, *payloads]
+
+    def __frame_to_dict(self,
+                        payload: bytes) -> Dict[Any, Any]:
+        """
+        Recover a (nested) dictionary from the payload of a framed message.
+
+        :param payload: Payload of the framed message (index table and values payloads).
+        :return: Converted dictionary.
+        """
+
+        payload = memoryview(payload).cast('B')
+
+        # Read the index table
+        entries = []
+        nb_entries, offset = unpack_from('=I', payload)[0], calcsize('=I')
+        for _ in range(nb_entries):
+            depth, offset = payload[offset], offset + 1
+            key_fields = self.header_from_bytes(payload[offset:offset + self.header_size])
+            offset += self.header_size
+            key = self.frame_to_data(key_fields, bytes(payload[offset:offset + key_fields[-1]]))
+            offset += key_fields[-1]
+            value_fields = self.header_from_bytes(payload[offset:offset + self.header_size])
+            offset += self.header_size
+            entries.append((depth, key, value_fields))
+
+        # Rebuild the dictionary, arrays are views on the payload
+        data = {}
+        parents = [data]
+        for depth, key, value_fields in entries:
+            del parents[depth + 1:]
+            if value_fields[0] == dict.__name__:
+                parents[depth][key] = {}
+                parents.append(parents[depth][key])
+            else:
+                value = payload[offset:offset + value_fields[-1]]
+                offset += value_fields[-1]
+                value = value if value_fields[0] in [list.__name__, ndarray.__name__] else bytes(value)
+                parents[depth][key] = self.frame_to_data(value_fields, value)
+        return data
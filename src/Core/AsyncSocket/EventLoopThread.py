@@ -0,0 +1,71 @@
+from typing import Any, Coroutine
+from asyncio import new_event_loop, set_event_loop, run_coroutine_threadsafe
+from asyncio import AbstractEventLoop as EventLoop
+from concurrent.futures import Future
+from threading import Thread, get_ident
+
+
+class EventLoopThread:
+
+    def __init__(self,
+                 name: str = 'EventLoopThread'):
+        """
+        EventLoopThread runs a single asyncio event loop in a dedicated thread. Coroutines can be submitted to this
+        loop from any other thread.
+
+        :param name: Name of the thread.
+        """
+
+        self.name: str = name
+
+        # Run the loop forever in a daemon thread
+        self.loop: EventLoop = new_event_loop()
+        self.thread: Thread = Thread(target=self.__run_loop, name=name, daemon=True)
+        self.thread.start()
+
+    def __run_loop(self) -> None:
+        """
+        Run the event loop until it is stopped.
+        """
+
+        set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self,
+               coroutine: Coroutine) -> Future:
+        """
+        Schedule a coroutine on the event loop. Thread-safe.
+
+        :param coroutine: Coroutine to run.
+        :return: Future of the coroutine result.
+        """
+
+        if self.loop.is_closed():
+            coroutine.close()
+            raise RuntimeError(f"[{self.name}] The event loop is closed.")
+        return run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self,
+            coroutine: Coroutine) -> Any:
+        """
+        Run a coroutine on the event loop and wait for its result. Thread-safe.
+
+        :param coroutine: Coroutine to run.
+        :return: Result of the coroutine.
+        """
+
+        # Waiting for the result from the loop thread itself would block the loop forever
+        if get_ident() == self.thread.ident:
+            coroutine.close()
+            raise RuntimeError(f"[{self.name}] Cannot wait for a coroutine from the event loop thread.")
+        return self.submit(coroutine).result()
+
+    def close(self) -> None:
+        """
+        Stop the event loop and wait for the thread to finish.
+        """
+
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
@@ -9,6 +9,7 @@ from SSD.Core.Storage.Database import Database
 
 from DeepPhysX.Core.AsyncSocket.TcpIpObject import TcpIpObject
 from DeepPhysX.Core.AsyncSocket.AbstractEnvironment import AbstractEnvironment
+from DeepPhysX.Core.Database.SharedExchange import SharedExchange
 
 
 class TcpIpClient(TcpIpObject):
@@ -18,7 +19,8 @@ class TcpIpClient(TcpIpObject):
                  ip_address: str = 'localhost',
                  port: int = 10000,
                  instance_id: int = 0,
-                 instance_nb: int = 1):
+                 instance_nb: int = 1,
+                 protocol: str = 'framed'):
         """
         TcpIpClient is a TcpIpObject which communicate with a TcpIpServer and manages an Environment to compute data.
 
@@ -27,6 +29,7 @@ class TcpIpClient(TcpIpObject):
         :param port: Port number of the TcpIpObject.
         :param instance_id: Index of this instance.
         :param instance_nb: Number of simultaneously launched instances.
+        :param protocol: Communication protocol to request to the server, either 'legacy' or 'framed'.
         """
 
         TcpIpObject.__init__(self,
@@ -38,10 +41,15 @@ class TcpIpClient(TcpIpObject):
         self.environment_class = environment
         self.environment_instance = (instance_id, instance_nb)
 
-        # Bind to client address and send ID
+        # Bind to client address, send ID and request a communication protocol
+        if protocol not in self.protocols:
+            raise ValueError(f"[{self.name}] The given 'protocol'={protocol} must be in {self.protocols}.")
         self.sock.connect((ip_address, port))
-        self.sync_send_labeled_data(data_to_send=instance_id, label="instance_ID", receiver=self.sock,
+        label = "instance_ID" if protocol == 'legacy' else f"instance_ID::{protocol}"
+        self.sync_send_labeled_data(data_to_send=instance_id, label=label, receiver=self.sock,
                                     send_read_command=False)
+        if protocol != 'legacy':
+            self.socket_protocol[self.sock] = self.sync_receive_data()
         self.close_client: bool = False
 
     ##########################################################################################
@@ -81,6 +89,9 @@ class TcpIpClient(TcpIpObject):
         # Receive number of sub-steps
         self.simulations_per_step = await self.receive_data(loop=loop, sender=self.sock)
 
+        # Receive size of the write buffer
+        self.environment.write_buffer_size = await self.receive_data(loop=loop, sender=self.sock)
+
         # Receive partitions
         partitions_list = await self.receive_data(loop=loop, sender=self.sock)
         partitions_list, exchange = partitions_list.split('%%%')
@@ -90,6 +101,16 @@ class TcpIpClient(TcpIpObject):
         self.environment.get_database_handler().init_remote(storing_partitions=partitions,
                                                             exchange_db=exchange)
 
+        # Receive the shard in which the Environment writes
+        shard_id, nb_shards = await self.receive_data(loop=loop, sender=self.sock)
+        self.environment.get_database_handler().set_shard(shard_id=shard_id,
+                                                          nb_shards=nb_shards)
+
+        # Receive the name of the shared memory exchange
+        shared_exchange = await self.receive_data(loop=loop, sender=self.sock)
+        if shared_exchange != 'None':
+            self.environment.get_database_handler().set_shared_exchange(SharedExchange(name=shared_exchange))
+
         # Receive visualization database
         visualization_db = await self.receive_data(loop=loop, sender=self.sock)
         visualization_db = None if visualization_db == 'None' else visualization_db.split('///')
@@ -159,6 +180,8 @@ class TcpIpClient(TcpIpObject):
         Close the environment and shutdown the client.
         """
 
+        # Write the remaining buffered samples
+        self.environment._flush_training_data()
         # Close environment
         try:
             self.environment.close()
@@ -166,6 +189,8 @@ class TcpIpClient(TcpIpObject):
             pass
         if self.environment.factory is not None:
             self.environment.factory.close()
+        if self.environment.get_database_handler().get_shared_exchange() is not None:
+            self.environment.get_database_handler().get_shared_exchange().close()
         # Confirm exit command to the server
         loop = get_event_loop()
         await self.send_command_exit(loop=loop, receiver=self.sock)
@@ -317,3 +342,21 @@ class TcpIpClient(TcpIpObject):
         # Update the partition list in the DatabaseHandler
         new_database = await self.receive_data(loop=loop, sender=sender)
         self.environment.get_database_handler().update_list_partitions_remote(new_database.split('///'))
+
+    async def action_on_flush(self,
+                              data: Dict[Any, Any],
+                              client_id: int,
+                              sender: socket,
+                              loop: EventLoop) -> None:
+        """
+        Action to run when receiving the 'flush' command.
+
+        :param data: Dict storing data.
+        :param client_id: ID of the TcpIpClient.
+        :param loop: Asyncio event loop.
+        :param sender: TcpIpObject sender.
+        """
+
+        # Write the buffered samples and send their indices to Server
+        lines = self.environment._flush_training_data()
+        await self.send_data(data_to_send=lines, loop=loop, receiver=sender)
@@ -36,10 +36,13 @@ class TcpIpObject:
         self.port: int = port
         # Create data converter
         self.data_converter: BytesConverter = BytesConverter()
+        # Communication protocols, negotiated for each socket at connection ('legacy' by default)
+        self.protocols: List[str] = ['legacy', 'framed']
+        self.socket_protocol: Dict[socket, str] = {}
         # Available commands
         self.command_dict: Dict[str, bytes] = {'exit': b'exit', 'step': b'step', 'done': b'done', 'finished': b'fini',
                                                'prediction': b'pred', 'read': b'read', 'sample': b'samp',
-                                               'visualisation': b'visu', 'db': b'chdb'}
+                                               'visualisation': b'visu', 'db': b'chdb', 'flush': b'flsh'}
         self.action_on_command: Dict[bytes, Any] = {
             self.command_dict["exit"]: self.action_on_exit,
             self.command_dict["step"]: self.action_on_step,
@@ -49,7 +52,8 @@ class TcpIpObject:
             self.command_dict["read"]: self.action_on_read,
             self.command_dict["sample"]: self.action_on_sample,
             self.command_dict["visualisation"]: self.action_on_visualisation,
-            self.command_dict['db']: self.action_on_change_db
+            self.command_dict['db']: self.action_on_change_db,
+            self.command_dict['flush']: self.action_on_flush
         }
 
     ##########################################################################################
@@ -73,10 +77,13 @@ class TcpIpObject:
         loop = get_event_loop() if loop is None else loop
         receiver = self.sock if receiver is None else receiver
         # Cast data to bytes fields
-        data_as_bytes = self.data_converter.data_to_bytes(data_to_send)
-        # Send the whole message
-        if await loop.sock_sendall(sock=receiver, data=data_as_bytes) is not None:
-            ValueError(f"[{self.name}] Could not send all of the data for an unknown reason")
+        buffers = self.__to_buffers(data_to_send, receiver)
+        # Try to send the whole message at once with a vectored send
+        buffers = self.__consume_buffers(buffers, self.__send_buffers(receiver, buffers))
+        # Send the remaining fields in sequence when the socket is ready
+        for buffer in buffers:
+            if await loop.sock_sendall(sock=receiver, data=buffer) is not None:
+                ValueError(f"[{self.name}] Could not send all of the data for an unknown reason")
 
     def sync_send_data(self,
                        data_to_send: Convertible,
@@ -91,9 +98,10 @@ class TcpIpObject:
 
         receiver = self.sock if receiver is None else receiver
         # Cast data to bytes fields
-        data_as_bytes = self.data_converter.data_to_bytes(data_to_send)
-        # Send the whole message
-        receiver.sendall(data_as_bytes)
+        buffers = self.__to_buffers(data_to_send, receiver)
+        # Send the whole message with vectored sends
+        while len(buffers) > 0:
+            buffers = self.__consume_buffers(buffers, self.__send_buffers(receiver, buffers))
 
     async def receive_data(self,
                            loop: EventLoop,
@@ -106,6 +114,13 @@ class TcpIpObject:
         :return: Converted data.
         """
 
+        # Framed protocol: receive the fixed size header, then the whole payload
+        if self.socket_protocol.get(sender) == 'framed':
+            header = await self.read_data(loop, sender, self.data_converter.header_size)
+            header_fields = self.data_converter.header_from_bytes(header)
+            payload = await self.read_data(loop, sender, header_fields[-1])
+            return self.data_converter.frame_to_data(header_fields, payload)
+
         # Receive the number of fields to receive
         nb_bytes_fields_b = await loop.sock_recv(sender, self.data_converter.int_size)
         nb_bytes_fields = self.data_converter.size_from_bytes(nb_bytes_fields_b)
@@ -126,6 +141,13 @@ class TcpIpObject:
         """
 
         self.sock.setblocking(True)
+        # Framed protocol: receive the fixed size header, then the whole payload
+        if self.socket_protocol.get(self.sock) == 'framed':
+            header = self.sync_read_data(self.data_converter.header_size)
+            header_fields = self.data_converter.header_from_bytes(header)
+            payload = self.sync_read_data(header_fields[-1])
+            return self.data_converter.frame_to_data(header_fields, payload)
+
         # Receive the number of fields to receive
         nb_bytes_fields_b = self.sock.recv(self.data_converter.int_size)
         nb_bytes_fields = self.data_converter.size_from_bytes(nb_bytes_fields_b)
@@ -137,12 +159,72 @@ class TcpIpObject:
         # Return the data in the expected format
         return self.data_converter.bytes_to_data(bytes_fields)
 
+    def __to_buffers(self,
+                     data: Convertible,
+                     receiver: socket) -> List[memoryview]:
+        """
+        Convert data to the bytes fields of a message using the protocol negotiated with the receiver.
+        Fields are not concatenated so that arrays are sent from their own buffer.
+
+        :param data: Data to convert.
+        :param receiver: Socket receiver.
+        :return: List of non-empty bytes fields.
+        """
+
+        if self.socket_protocol.get(receiver) == 'framed':
+            fields = self.data_converter.data_to_frame(data, as_list=True)
+        else:
+            fields = self.data_converter.data_to_bytes(data, as_list=True)
+        return [memoryview(field).cast('B') for field in fields if len(field) > 0]
+
+    @staticmethod
+    def __send_buffers(receiver: socket,
+                       buffers: List[memoryview]) -> int:
+        """
+        Send as many bytes fields as possible with a single system call.
+
+        :param receiver: Socket receiver.
+        :param buffers: List of bytes fields.
+        :return: Number of sent bytes.
+        """
+
+        try:
+            # Scatter / gather send of the fields
+            if hasattr(receiver, 'sendmsg'):
+                return receiver.sendmsg(buffers[:512])
+            # Not available on every platform: send the first field only
+            return receiver.send(buffers[0])
+        except (BlockingIOError, InterruptedError):
+            return 0
+
+    @staticmethod
+    def __consume_buffers(buffers: List[memoryview],
+                          nb_bytes: int) -> List[memoryview]:
+        """
+        Remove the sent bytes from the list of bytes fields.
+
+        :param buffers: List of bytes fields.
+        :param nb_bytes: Number of sent bytes.
+        :return: List of the remaining bytes fields.
+        """
+
+        buffers = buffers.copy()
+        while nb_bytes > 0:
+            # The whole field was sent
+            if nb_bytes >= len(buffers[0]):
+                nb_bytes -= len(buffers.pop(0))
+            # The field was partially sent
+            else:
+                buffers[0] = buffers[0][nb_bytes:]
+                nb_bytes = 0
+        return buffers
+
     async def read_data(self,
                         loop: EventLoop,
                         sender: socket,
-                        read_size: int) -> bytes:
+                        read_size: int) -> bytearray:
         """
-        Read the data on the socket with value of buffer size as relatively small powers of 2.
+        Read the data on the socket in a buffer allocated once with the announced size.
 
         :param loop: Asyncio event loop.
         :param sender: Socket sender.
@@ -150,52 +232,40 @@ class TcpIpObject:
         :return: Bytes field with 'read_size' length.
         """
 
-        # Maximum read size
-        read_sizes = [8192, 4096]
-        bytes_field = b''
-
-        while read_size > 0:
-            # Select the good amount of bytes to read
-            read_size_idx = 0
-            while read_size_idx < len(read_sizes) and read_size < read_sizes[read_size_idx]:
-                read_size_idx += 1
-            # If the amount of bytes to read is too small then read it all
-            chunk_size_to_read = read_size if read_size_idx >= len(read_sizes) else read_sizes[read_size_idx]
-            # Try to read at most chunk_size_to_read bytes from the socket
-            data_received_as_bytes = await loop.sock_recv(sender, chunk_size_to_read)
-            # Todo: add security with <<await asyncio.wait_for(loop.sock_recv(sender, chunk_size_to_read), timeout=1.)>>
-            # Accumulate the data
-            bytes_field += data_received_as_bytes
-            read_size -= len(data_received_as_bytes)
+        bytes_field = bytearray(read_size)
+        buffer = memoryview(bytes_field)
+        position = 0
+
+        while position < read_size:
+            # Fill the remaining part of the buffer with the available data
+            nb_bytes = await loop.sock_recv_into(sender, buffer[position:])
+            # Todo: add security with <<await asyncio.wait_for(loop.sock_recv_into(sender, buffer), timeout=1.)>>
+            if nb_bytes == 0:
+                raise ConnectionError(f"[{self.name}] The socket was closed before receiving all of the data.")
+            position += nb_bytes
 
         return bytes_field
 
     def sync_read_data(self,
-                       read_size: int) -> bytes:
+                       read_size: int) -> bytearray:
         """
-        Read the data on the socket with value of buffer size as relatively small powers of 2.
+        Read the data on the socket in a buffer allocated once with the announced size.
         Synchronous version of 'TcpIpObject.read_data'.
 
         :param read_size: Amount of data to read on the socket.
         :return: Bytes field with 'read_size' length.
         """
 
-        # Maximum read sizes array
-        read_sizes = [8192, 4096]
-        bytes_field = b''
+        bytes_field = bytearray(read_size)
+        buffer = memoryview(bytes_field)
+        position = 0
 
-        while read_size > 0:
-            # Select the good amount of bytes to read
-            read_size_idx = 0
-            while read_size_idx < len(read_sizes) and read_size < read_sizes[read_size_idx]:
-                read_size_idx += 1
-            # If the amount of bytes to read is too small then read it all
-            chunk_size_to_read = read_size if read_size_idx >= len(read_sizes) else read_sizes[read_size_idx]
-            # Try to read at most chunk_size_to_read bytes from the socket
-            data_received_as_bytes = self.sock.recv(chunk_size_to_read)
-            # Accumulate the data
-            bytes_field += data_received_as_bytes
-            read_size -= len(data_received_as_bytes)
+        while position < read_size:
+            # Fill the remaining part of the buffer with the available data
+            nb_bytes = self.sock.recv_into(buffer[position:])
+            if nb_bytes == 0:
+                raise ConnectionError(f"[{self.name}] The socket was closed before receiving all of the data.")
+            position += nb_bytes
 
         return bytes_field
 
@@ -302,7 +372,7 @@ class TcpIpObject:
                         loop: Optional[EventLoop] = None,
                         receiver: Optional[socket] = None) -> None:
         """
-        Send a whole dictionary field by field as labeled data.
+        Send a whole dictionary field by field as labeled data, or as a single message with the framed protocol.
 
         :param name: Name of the dictionary.
         :param dict_to_send: Dictionary to send.
@@ -318,6 +388,12 @@ class TcpIpObject:
             await self.send_command_finished(loop=loop, receiver=receiver)
             return
 
+        # Framed protocol: the whole dictionary is packed in a single message
+        if self.socket_protocol.get(receiver) == 'framed':
+            await self.send_command_read(loop=loop, receiver=receiver)
+            await self.send_data(data_to_send={name: dict_to_send}, loop=loop, receiver=receiver)
+            return
+
         # Sends to make the listener start the receive_dict routine
         await self.send_command_read(loop=loop, receiver=receiver)
         await self.send_labeled_data(data_to_send=name, label="::dict::", loop=loop, receiver=receiver)
@@ -344,7 +420,7 @@ class TcpIpObject:
                        dict_to_send: Dict[Any, Any],
                        receiver: Optional[socket] = None) -> None:
         """
-        Send a whole dictionary field by field as labeled data.
+        Send a whole dictionary field by field as labeled data, or as a single message with the framed protocol.
         Synchronous version of 'TcpIpObject.receive_labeled_data'.
 
         :param name: Name of the dictionary.
@@ -359,6 +435,12 @@ class TcpIpObject:
             self.sync_send_command_finished(receiver=receiver)
             return
 
+        # Framed protocol: the whole dictionary is packed in a single message
+        if self.socket_protocol.get(receiver) == 'framed':
+            self.sync_send_command_read(receiver=receiver)
+            self.sync_send_data(data_to_send={name: dict_to_send}, receiver=receiver)
+            return
+
         # Sends to make the listener start the receive_dict routine
         self.sync_send_command_read()
         self.sync_send_labeled_data(data_to_send=name, label="::dict::", receiver=receiver)
@@ -457,6 +539,12 @@ class TcpIpObject:
         loop = get_event_loop() if loop is None else loop
         sender = self.sock if sender is None else sender
 
+        # Framed protocol: the whole dictionary is received in a single message
+        if self.socket_protocol.get(sender) == 'framed':
+            if await self.receive_data(loop=loop, sender=sender) != self.command_dict['finished']:
+                recv_to.update(await self.receive_data(loop=loop, sender=sender))
+            return
+
         # Receive data while command 'finished' is not received
         while (cmd := await self.receive_data(loop=loop, sender=sender)) != self.command_dict['finished']:
             # Receive field as a labeled data
@@ -482,6 +570,12 @@ class TcpIpObject:
 
         sender = self.sock if sender is None else sender
 
+        # Framed protocol: the whole dictionary is received in a single message
+        if self.socket_protocol.get(sender) == 'framed':
+            if self.sync_receive_data() != self.command_dict['finished']:
+                recv_to.update(self.sync_receive_data())
+            return
+
         # Receive data while command 'finished' is not received
         while self.sync_receive_data() != self.command_dict['finished']:
             # Receive field as a labeled data
@@ -771,6 +865,29 @@ class TcpIpObject:
 
         self.__sync_send_command(receiver=receiver, command='db')
 
+    async def send_command_flush(self,
+                                 loop: Optional[EventLoop] = None,
+                                 receiver: Optional[socket] = None) -> None:
+        """
+        Send the 'flush' command.
+
+        :param loop: Asyncio event loop.
+        :param receiver: TcpIpObject receiver.
+        """
+
+        await self.__send_command(loop=loop, receiver=receiver, command='flush')
+
+    def sync_send_command_flush(self,
+                                receiver: Optional[socket] = None) -> None:
+        """
+        Send the 'flush' command.
+        Synchronous version of 'TcpIpObject.send_command_flush'.
+
+        :param receiver: TcpIpObject receiver.
+        """
+
+        self.__sync_send_command(receiver=receiver, command='flush')
+
     ##########################################################################################
     ##########################################################################################
     #                            Actions to perform on commands                              #
@@ -893,6 +1010,15 @@ class TcpIpObject:
         :param sender: TcpIpObject sender.
         """
 
+        # Framed protocol: a dictionary is received in a single message
+        if self.socket_protocol.get(sender) == 'framed':
+            recv = await self.receive_data(loop=loop, sender=sender)
+            if type(recv) == dict:
+                data[client_id].update(recv)
+            else:
+                data[client_id][recv] = await self.receive_data(loop=loop, sender=sender)
+            return
+
         # Receive labeled data
         label, param = await self.receive_labeled_data(loop=loop, sender=sender)
         # If data to receive appears to be a dict, receive dict
@@ -966,3 +1092,19 @@ class TcpIpObject:
         """
 
         pass
+
+    async def action_on_flush(self,
+                              data: Dict[Any, Any],
+                              client_id: int,
+                              sender: socket,
+                              loop: EventLoop) -> None:
+        """
+        Action to run when receiving the 'flush' command.
+
+        :param data: Dict storing data.
+        :param client_id: ID of the TcpIpClient.
+        :param loop: Asyncio event loop.
+        :param sender: TcpIpObject sender.
+        """
+
+        pass
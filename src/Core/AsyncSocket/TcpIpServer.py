@@ -1,11 +1,13 @@
 from typing import Any, Dict, List, Optional, Tuple
-from asyncio import get_event_loop, gather
+from asyncio import get_event_loop, gather, Future, TimerHandle, Lock
 from asyncio import AbstractEventLoop as EventLoop
-from asyncio import run as async_run
 from socket import socket
 from queue import SimpleQueue
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 from DeepPhysX.Core.AsyncSocket.TcpIpObject import TcpIpObject
+from DeepPhysX.Core.AsyncSocket.EventLoopThread import EventLoopThread
 from DeepPhysX.Core.Database.DatabaseHandler import DatabaseHandler
 
 
@@ -17,6 +19,10 @@ class TcpIpServer(TcpIpObject):
                  nb_client: int = 5,
                  max_client_count: int = 10,
                  batch_size: int = 5,
+                 requests_per_client: int = 1,
+                 write_buffer_size: int = 0,
+                 prediction_batch_size: int = 1,
+                 prediction_window: float = 0.,
                  manager: Optional[Any] = None):
         """
         TcpIpServer is used to communicate with clients associated with Environment to produce batches for the
@@ -27,6 +33,10 @@ class TcpIpServer(TcpIpObject):
         :param nb_client: Number of expected client connections.
         :param max_client_count: Maximum number of allowed clients.
         :param batch_size: Number of samples in a batch.
+        :param requests_per_client: Maximum number of requests sent to a client before receiving its samples.
+        :param write_buffer_size: Number of samples buffered by a client before writing them in the Database.
+        :param prediction_batch_size: Maximum number of prediction requests of the clients computed together.
+        :param prediction_window: Maximum time in seconds a prediction request waits for the requests of other clients.
         :param manager: EnvironmentManager that handles the TcpIpServer.
         """
 
@@ -40,12 +50,29 @@ class TcpIpServer(TcpIpObject):
         self.sock.listen(max_client_count)
         self.sock.setblocking(False)
 
+        # Every communication with clients runs on a single event loop
+        self.event_loop: EventLoopThread = EventLoopThread(name=f'{self.name}Loop')
+
         # Expect a defined number of clients
         self.clients: List[List[int, socket]] = []
+        # A Client is locked while it processes requests, so that no other command is sent in between
+        self.client_locks: Dict[int, Lock] = {}
         self.nb_client: int = min(nb_client, max_client_count)
 
         # Init data to communicate with EnvironmentManager and Clients
         self.batch_size: int = batch_size
+        self.requests_per_client: int = requests_per_client
+        self.write_buffer_size: int = write_buffer_size
+        self.nb_requests: int = 0
+
+        # Prediction requests waiting to be computed together
+        self.prediction_batch_size: int = prediction_batch_size
+        self.prediction_window: float = prediction_window
+        self.pending_predictions: List[Tuple[int, Future]] = []
+        self.prediction_timer: Optional[TimerHandle] = None
+        # Predictions run in a worker thread, the event loop keeps serving the Clients while the Network is busy
+        self.prediction_executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1,
+                                                                          thread_name_prefix=f'{self.name}Prediction')
         self.data_fifo: SimpleQueue = SimpleQueue()
         self.data_dict: Dict[Any, Any] = {}
         self.sample_to_client_id: List[int] = []
@@ -78,12 +105,26 @@ class TcpIpServer(TcpIpObject):
         Partition update event of the DatabaseHandler.
         """
 
-        # Send the new partition to every Client
-        for _, client in self.clients:
-            self.sync_send_command_change_db(receiver=client)
-            new_partition = self.database_handler.get_partitions()[-1]
-            self.sync_send_data(data_to_send=f'{new_partition.get_path()[0]}///{new_partition.get_path()[1]}',
-                                receiver=client)
+        # Send the new partitions (one per shard) to every Client from the event loop, batches can be produced meanwhile
+        new_partitions = self.database_handler.get_partitions()[-self.database_handler.get_nb_shards():]
+        partitions = new_partitions[0].get_path()[0]
+        for partition in new_partitions:
+            partitions += f'///{partition.get_path()[1]}'
+        self.event_loop.run(self.__send_partitions(partitions))
+
+    async def __send_partitions(self,
+                                partitions: str) -> None:
+        """
+        Send the new partitions to every Client in a single message, once it has processed its requests.
+
+        :param partitions: Paths to the new partitions as 'database_dir///database_name_1///database_name_2...'.
+        """
+
+        loop = get_event_loop()
+        for client_id, client in self.clients:
+            async with self.client_locks[client_id]:
+                await self.send_command_change_db(loop=loop, receiver=client)
+                await self.send_data(data_to_send=partitions, loop=loop, receiver=client)
 
     ##########################################################################################
     ##########################################################################################
@@ -97,7 +138,7 @@ class TcpIpServer(TcpIpObject):
         """
 
         print(f"[{self.name}] Waiting for clients...")
-        async_run(self.__connect())
+        self.event_loop.run(self.__connect())
 
     async def __connect(self) -> None:
         """
@@ -111,8 +152,15 @@ class TcpIpServer(TcpIpObject):
             client, _ = await loop.sock_accept(self.sock)
             # Get the instance ID
             label, client_id = await self.receive_labeled_data(loop=loop, sender=client)
+            # Negotiate the communication protocol (Clients which do not request one keep the legacy protocol)
+            if '::' in label:
+                requested_protocol = label.split('::')[-1]
+                protocol = requested_protocol if requested_protocol in self.protocols else 'legacy'
+                await self.send_data(data_to_send=protocol, loop=loop, receiver=client)
+                self.socket_protocol[client] = protocol
             print(f"[{self.name}] Client n°{client_id} connected: {client}")
             self.clients.append([client_id, client])
+            self.client_locks[client_id] = Lock()
 
     ##########################################################################################
     ##########################################################################################
@@ -131,7 +179,7 @@ class TcpIpServer(TcpIpObject):
         """
 
         print(f"[{self.name}] Initializing clients...")
-        async_run(self.__initialize(env_kwargs, visualization_db))
+        self.event_loop.run(self.__initialize(env_kwargs, visualization_db))
 
     async def __initialize(self,
                            env_kwargs: Dict[str, Any],
@@ -146,7 +194,7 @@ class TcpIpServer(TcpIpObject):
         loop = get_event_loop()
 
         # Initialisation process for each client
-        for client_id, client in self.clients:
+        for client_idx, (client_id, client) in enumerate(self.clients):
 
             # Send additional arguments
             await self.send_dict(name='env_kwargs', dict_to_send=env_kwargs, loop=loop, receiver=client)
@@ -159,6 +207,9 @@ class TcpIpServer(TcpIpObject):
             nb_steps = self.environment_manager.simulations_per_step if self.environment_manager else 1
             await self.send_data(data_to_send=nb_steps, loop=loop, receiver=client)
 
+            # Send size of the write buffer
+            await self.send_data(data_to_send=self.write_buffer_size, loop=loop, receiver=client)
+
             # Send partitions
             partitions = self.database_handler.get_partitions()
             if len(partitions) == 0:
@@ -175,6 +226,15 @@ class TcpIpServer(TcpIpObject):
                 partitions_list += f'{exchange.get_path()[0]}///{exchange.get_path()[1]}'
             await self.send_data(data_to_send=partitions_list, loop=loop, receiver=client)
 
+            # Send the shard in which the Client writes
+            nb_shards = self.database_handler.get_nb_shards()
+            await self.send_data(data_to_send=[client_idx % nb_shards, nb_shards], loop=loop, receiver=client)
+
+            # Send the name of the shared memory exchange
+            shared_exchange = self.database_handler.get_shared_exchange()
+            await self.send_data(data_to_send='None' if shared_exchange is None else shared_exchange.name,
+                                 loop=loop, receiver=client)
+
             # Send visualization Database
             visualization = 'None' if visualization_db is None else f'{visualization_db[0]}///{visualization_db[1]}'
             await self.send_data(data_to_send=visualization, loop=loop, receiver=client)
@@ -192,7 +252,7 @@ class TcpIpServer(TcpIpObject):
         Connect the Factories of the Clients to the Visualizer.
         """
 
-        async_run(self.__connect_visualization())
+        self.event_loop.run(self.__connect_visualization())
 
     async def __connect_visualization(self):
         """
@@ -218,35 +278,74 @@ class TcpIpServer(TcpIpObject):
         """
 
         # Trigger communication protocol
-        async_run(self.__request_data_to_clients(animate=animate))
+        self.event_loop.run(self.__request_data_to_clients(animate=animate))
         return self.data_lines
 
     async def __request_data_to_clients(self,
                                         animate: bool = True) -> None:
         """
-        Trigger a communication protocol for each client. Wait for all clients before to launch another communication
-        protocol while the batch is not full.
+        Dispatch the requests between clients as a work queue: as soon as a client returns a sample, it receives the
+        next request while the batch is not full.
 
         :param animate: If True, triggers an environment step
         """
 
-        nb_sample = 0
+        self.nb_requests = 0
         self.data_lines = []
-        # Launch the communication protocol while the batch needs to be filled
-        while nb_sample < self.batch_size:
-            clients = self.clients[:min(len(self.clients), self.batch_size - nb_sample)]
-            # Run communicate protocol for each client and wait for the last one to finish
-            await gather(*[self.__communicate(client=client,
-                                              client_id=client_id,
-                                              animate=animate) for client_id, client in clients])
-            nb_sample += len(clients)
+        # Run the requests loop for each client and wait for the last one to finish
+        await gather(*[self.__locked_communicate(client=client,
+                                                 client_id=client_id,
+                                                 animate=animate) for client_id, client in self.clients])
+
+    def flush(self) -> List[List[int]]:
+        """
+        Write the samples buffered by the clients in the Database.
+
+        :return: Indices of the written samples.
+        """
+
+        if self.write_buffer_size == 0:
+            return []
+        return self.event_loop.run(self.__flush_clients())
+
+    async def __flush_clients(self) -> List[List[int]]:
+        """
+        Send the 'flush' command to each client and get the indices of the written samples.
+        """
+
+        async def flush_client(client: socket, client_id: int) -> List[List[int]]:
+            async with self.client_locks[client_id]:
+                await self.send_command_flush(loop=loop, receiver=client)
+                return await self.receive_data(loop=loop, sender=client)
+
+        loop = get_event_loop()
+        lines = await gather(*[flush_client(client, client_id) for client_id, client in self.clients])
+        return [line for client_lines in lines for line in client_lines]
+
+    async def __locked_communicate(self,
+                                   client: Optional[socket] = None,
+                                   client_id: Optional[int] = None,
+                                   animate: bool = True) -> None:
+        """
+        Run the communication protocol with a client while no other command can be sent to it.
+
+        :param client: TcpIpObject client to communicate with.
+        :param client_id: Index of the client.
+        :param animate: If True, triggers an environment step.
+        """
+
+        async with self.client_locks[client_id]:
+            await self.__communicate(client=client,
+                                     client_id=client_id,
+                                     animate=animate)
 
     async def __communicate(self,
                             client: Optional[socket] = None,
                             client_id: Optional[int] = None,
                             animate: bool = True) -> None:
         """
-        Communication protocol with a client.
+        Communication protocol with a client. Keep up to 'requests_per_client' requests in flight while the batch is
+        not full.
 
         :param client: TcpIpObject client to communicate with.
         :param client_id: Index of the client.
@@ -254,25 +353,52 @@ class TcpIpServer(TcpIpObject):
         """
 
         loop = get_event_loop()
-
-        # 1. Send a sample to the Client if a batch from the Dataset is given
-        if self.batch_from_dataset is not None:
-            # Check if there is remaining samples, otherwise the Client is not used
-            if len(self.batch_from_dataset) == 0:
+        nb_pending = 0
+
+        while True:
+
+            # 1. Send the next requests to the Client
+            while nb_pending < self.requests_per_client and (request := self.__next_request())[0]:
+                # 1.1. Send a sample to the Client if a batch from the Dataset is given
+                if self.batch_from_dataset is not None:
+                    await self.send_command_sample(loop=loop, receiver=client)
+                    await self.send_data(data_to_send=request[1], loop=loop, receiver=client)
+                # 1.2. Execute n steps, the last one send data computation signal
+                if animate:
+                    await self.send_command_step(loop=loop, receiver=client)
+                    nb_pending += 1
+
+            # 2. Every request of the Client was processed, get the indices of the buffered samples
+            if nb_pending == 0:
+                if animate and self.write_buffer_size > 0:
+                    await self.send_command_flush(loop=loop, receiver=client)
+                    self.data_lines += await self.receive_data(loop=loop, sender=client)
                 return
-            # Send the sample to the Client
-            await self.send_command_sample(loop=loop, receiver=client)
-            line = self.batch_from_dataset.pop(0)
-            await self.send_data(data_to_send=line, loop=loop, receiver=client)
-
-        # 2. Execute n steps, the last one send data computation signal
-        if animate:
-            await self.send_command_step(loop=loop, receiver=client)
-            # Receive data
+
+            # 3. Receive data from the oldest request
             await self.listen_while_not_done(loop=loop, sender=client, data_dict=self.data_dict,
                                              client_id=client_id)
             line = await self.receive_data(loop=loop, sender=client)
-            self.data_lines.append(line)
+            # Buffered samples have no index yet
+            if line is not None:
+                self.data_lines.append(line)
+            nb_pending -= 1
+
+    def __next_request(self) -> Tuple[bool, Optional[List[int]]]:
+        """
+        Claim the next request of the batch.
+
+        :return: False if the batch is full, the sample from the Dataset to dispatch with the request.
+        """
+
+        # The batch is full
+        if self.nb_requests >= self.batch_size:
+            return False, None
+        # Check if there is remaining samples, otherwise the Client is not used
+        if self.batch_from_dataset is not None and len(self.batch_from_dataset) == 0:
+            return False, None
+        self.nb_requests += 1
+        return True, None if self.batch_from_dataset is None else self.batch_from_dataset.pop(0)
 
     def set_dataset_batch(self,
                           data_lines: List[int]) -> None:
@@ -293,11 +419,13 @@ class TcpIpServer(TcpIpObject):
 
     def close(self) -> None:
         """
-        Run __close method with asyncio.
+        Run __close method on the event loop.
         """
 
         print(f"[{self.name}] Closing clients...")
-        async_run(self.__close())
+        self.event_loop.run(self.__close())
+        self.event_loop.close()
+        self.prediction_executor.shutdown()
 
     async def __close(self) -> None:
         """
@@ -350,9 +478,58 @@ class TcpIpServer(TcpIpObject):
 
         if self.environment_manager.data_manager is None:
             raise ValueError("Cannot request prediction if DataManager does not exist")
-        self.environment_manager.data_manager.get_prediction(client_id)
+        # Compute the prediction at once
+        if self.prediction_batch_size <= 1:
+            await loop.run_in_executor(self.prediction_executor,
+                                       self.environment_manager.data_manager.get_prediction, client_id)
+        # Wait for the requests of the other Clients to compute the predictions together
+        else:
+            prediction = loop.create_future()
+            self.pending_predictions.append((client_id, prediction))
+            if len(self.pending_predictions) >= self.prediction_batch_size:
+                self.__compute_predictions()
+            elif self.prediction_timer is None:
+                self.prediction_timer = loop.call_later(self.prediction_window, self.__compute_predictions)
+            await prediction
         await self.send_data(data_to_send=True, receiver=sender)
 
+    def __compute_predictions(self) -> None:
+        """
+        Compute the pending prediction requests with a single prediction of the Network. The prediction runs in the
+        prediction worker thread, the requests are resolved when it is done.
+        """
+
+        if self.prediction_timer is not None:
+            self.prediction_timer.cancel()
+            self.prediction_timer = None
+        pending, self.pending_predictions = self.pending_predictions, []
+        if len(pending) == 0:
+            return
+        computation = get_event_loop().run_in_executor(self.prediction_executor,
+                                                       self.environment_manager.data_manager.get_predictions,
+                                                       [client_id for client_id, _ in pending])
+        computation.add_done_callback(partial(self.__resolve_predictions, pending))
+
+    @staticmethod
+    def __resolve_predictions(pending: List[Tuple[int, Future]],
+                              computation: Future) -> None:
+        """
+        Give the result of a prediction of the Network to the pending prediction requests.
+
+        :param pending: Pending prediction requests as (client_id, Future).
+        :param computation: Future of the prediction.
+        """
+
+        for _, prediction in pending:
+            if prediction.done():
+                continue
+            if computation.cancelled():
+                prediction.cancel()
+            elif computation.exception() is not None:
+                prediction.set_exception(computation.exception())
+            else:
+                prediction.set_result(None)
+
     async def action_on_visualisation(self,
                                       data: Dict[Any, Any],
                                       client_id: int,
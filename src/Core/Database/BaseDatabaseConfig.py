@@ -9,8 +9,17 @@ class BaseDatabaseConfig:
                  mode: Optional[str] = None,
                  max_file_size: Optional[float] = None,
                  shuffle: bool = False,
+                 shuffle_block_size: Optional[int] = None,
+                 shard_partitions: bool = False,
+                 backend: str = 'sqlite',
+                 loader_workers: int = 0,
+                 exchange_backend: str = 'sqlite',
                  normalize: bool = False,
-                 recompute_normalization: bool = False):
+                 normalize_per_component: bool = False,
+                 recompute_normalization: bool = False,
+                 normalization_chunk_size: int = 1000,
+                 normalization_workers: int = 0,
+                 journal_checkpoint: int = 100):
         """
         BaseDatabaseConfig is a configuration class to parameterize the Database and the DatabaseManager.
 
@@ -18,8 +27,26 @@ class BaseDatabaseConfig:
         :param mode: Specify the Dataset mode that should be used between 'training', 'validation' and 'running'.
         :param max_file_size: Maximum size (in Gb) of a single dataset file.
         :param shuffle: Specify if the Dataset should be shuffled when a batch is taken.
+        :param shuffle_block_size: If not None, the Dataset is shuffled by blocks of consecutive samples: blocks are
+                                   taken in a random order and the samples of a block are shuffled when it is reached.
+        :param shard_partitions: If True, each TcpIpClient writes in its own partition to avoid concurrent writes.
+        :param backend: Backend used to read the training samples, either 'sqlite' (read the Database partitions) or
+                        'mmap' (read fixed-shape Fields from memory-mapped files, for sessions that do not produce
+                        data).
+        :param loader_workers: Number of threads reading and normalizing the next training batches when the training
+                               is done from an existing Dataset (0 to read each batch when it is used).
+        :param exchange_backend: Backend used to exchange data between the Environments and the Network for online
+                                 predictions, either 'sqlite' (the exchange Database) or 'shared_memory' (shared memory
+                                 blocks, for Environments running on the same machine).
         :param normalize: If True, the data will be normalized using standard score.
+        :param normalize_per_component: If True, the mean and the standard deviation are computed for each component of
+                                        the data fields instead of a single value per field.
         :param recompute_normalization: If True, compute the normalization coefficients.
+        :param normalization_chunk_size: Number of lines read at once when computing the normalization coefficients.
+        :param normalization_workers: Number of processes scanning the partitions in parallel when computing the
+                                      normalization coefficients (0 to scan them in the main process).
+        :param journal_checkpoint: Number of batches recorded in the dataset journal before it is compacted in the
+                                   dataset.json file.
         """
 
         self.name: str = self.__class__.__name__
@@ -45,19 +72,52 @@ class BaseDatabaseConfig:
             max_file_size = int(max_file_size * 1e9) if max_file_size > 0 else None
         if type(shuffle) != bool:
             raise TypeError(f"[{self.name}] The given 'shuffle'={shuffle} must be a bool.")
+        if shuffle_block_size is not None and (type(shuffle_block_size) != int or shuffle_block_size < 1):
+            raise ValueError(f"[{self.name}] The given 'shuffle_block_size'={shuffle_block_size} must be a positive "
+                             f"integer.")
+        if type(shard_partitions) != bool:
+            raise TypeError(f"[{self.name}] The given 'shard_partitions'={shard_partitions} must be a bool.")
+        if backend not in (available_backends := ['sqlite', 'mmap']):
+            raise ValueError(f"[{self.name}] The given 'backend'={backend} must be in {available_backends}.")
+        if type(loader_workers) != int or loader_workers < 0:
+            raise ValueError(f"[{self.name}] The given 'loader_workers'={loader_workers} must be a positive integer.")
+        if exchange_backend not in (available_exchange_backends := ['sqlite', 'shared_memory']):
+            raise ValueError(f"[{self.name}] The given 'exchange_backend'={exchange_backend} must be in "
+                             f"{available_exchange_backends}.")
         if type(normalize) != bool:
             raise TypeError(f"[{self.name}] The given 'normalize'={normalize} must be a bool.")
+        if type(normalize_per_component) != bool:
+            raise TypeError(f"[{self.name}] The given 'normalize_per_component'={normalize_per_component} must be a "
+                            f"bool.")
         if type(recompute_normalization) != bool:
             raise TypeError(f"[{self.name}] The given 'recompute_normalization'={recompute_normalization} must be a "
                             f"bool.")
+        if type(normalization_chunk_size) != int or normalization_chunk_size < 1:
+            raise ValueError(f"[{self.name}] The given 'normalization_chunk_size'={normalization_chunk_size} must be a "
+                             f"positive integer.")
+        if type(normalization_workers) != int or normalization_workers < 0:
+            raise ValueError(f"[{self.name}] The given 'normalization_workers'={normalization_workers} must be a "
+                             f"positive integer.")
+        if type(journal_checkpoint) != int or journal_checkpoint < 1:
+            raise ValueError(f"[{self.name}] The given 'journal_checkpoint'={journal_checkpoint} must be a positive "
+                             f"integer.")
 
         # DatabaseManager parameterization
         self.existing_dir: Optional[str] = existing_dir
         self.mode: Optional[str] = mode
         self.max_file_size: int = max_file_size
         self.shuffle: bool = shuffle
+        self.shuffle_block_size: Optional[int] = shuffle_block_size
+        self.shard_partitions: bool = shard_partitions
+        self.backend: str = backend
+        self.loader_workers: int = loader_workers
+        self.exchange_backend: str = exchange_backend
         self.normalize: bool = normalize
+        self.normalize_per_component: bool = normalize_per_component
         self.recompute_normalization: bool = recompute_normalization
+        self.normalization_chunk_size: int = normalization_chunk_size
+        self.normalization_workers: int = normalization_workers
+        self.journal_checkpoint: int = journal_checkpoint
 
     def __str__(self):
 
@@ -67,6 +127,12 @@ class BaseDatabaseConfig:
         description += f"    Mode: {self.mode}\n"
         description += f"    Max size: {self.max_file_size}\n"
         description += f"    Shuffle: {self.shuffle}\n"
+        description += f"    Shuffle block size: {self.shuffle_block_size}\n"
+        description += f"    Shard partitions: {self.shard_partitions}\n"
+        description += f"    Backend: {self.backend}\n"
+        description += f"    Loader workers: {self.loader_workers}\n"
+        description += f"    Exchange backend: {self.exchange_backend}\n"
         description += f"    Normalize: {self.normalize}\n"
+        description += f"    Normalize per component: {self.normalize_per_component}\n"
         description += f"    Recompute normalization: {self.recompute_normalization}\n"
         return description
@@ -0,0 +1,113 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from threading import Thread, Lock, Condition, Semaphore, Event
+
+
+class BatchLoader:
+
+    def __init__(self,
+                 get_indices: Callable[[], List[List[int]]],
+                 load_batch: Callable[[List[List[int]]], Any],
+                 nb_workers: int = 1,
+                 queue_size: int = 2,
+                 pending: Optional[List[Tuple[List[List[int]], Any]]] = None):
+        """
+        BatchLoader reads the next batches of samples in worker threads while the current one is used. Batches are
+        always delivered in the order their indices were drawn.
+
+        :param get_indices: Function returning the indices of the next batch.
+        :param load_batch: Function reading a batch from its indices.
+        :param nb_workers: Number of worker threads.
+        :param queue_size: Maximum number of batches drawn and not yet delivered.
+        :param pending: Batches already read by a previous BatchLoader, delivered first.
+        """
+
+        self.name: str = self.__class__.__name__
+
+        self.get_indices: Callable[[], List[List[int]]] = get_indices
+        self.load_batch: Callable[[List[List[int]]], Any] = load_batch
+
+        # Batches are numbered when their indices are drawn, then delivered in this order
+        pending = [] if pending is None else pending
+        self.__ready: Dict[int, Any] = dict(enumerate(pending))
+        self.__next_drawn: int = len(pending)
+        self.__next_delivered: int = 0
+        self.__draw_lock: Lock = Lock()
+        self.__ready_condition: Condition = Condition()
+        self.__slots: Semaphore = Semaphore(max(queue_size - len(pending), 0))
+        self.__stop: Event = Event()
+
+        # Launch the workers
+        self.workers: List[Thread] = [Thread(target=self.__work, name=f'{self.name}_{i}', daemon=True)
+                                      for i in range(nb_workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def __work(self) -> None:
+        """
+        Draw the indices of the next batch and read it while the loader is not closed.
+        """
+
+        while True:
+            self.__slots.acquire()
+            if self.__stop.is_set():
+                return
+            # Indices are drawn one batch at a time
+            with self.__draw_lock:
+                batch_id = self.__next_drawn
+                self.__next_drawn += 1
+                try:
+                    data_lines = self.get_indices()
+                except BaseException as error:
+                    self.__deliver(batch_id, error)
+                    return
+            # Batches are read in parallel
+            try:
+                self.__deliver(batch_id, (data_lines, self.load_batch(data_lines)))
+            except BaseException as error:
+                self.__deliver(batch_id, error)
+                return
+
+    def __deliver(self,
+                  batch_id: int,
+                  batch: Any) -> None:
+        """
+        Make a batch available.
+
+        :param batch_id: Number of the batch.
+        :param batch: Indices and content of the batch, or the error raised while reading it.
+        """
+
+        with self.__ready_condition:
+            self.__ready[batch_id] = batch
+            self.__ready_condition.notify_all()
+
+    def get(self) -> Tuple[List[List[int]], Any]:
+        """
+        Get the next batch.
+
+        :return: Indices and content of the batch.
+        """
+
+        with self.__ready_condition:
+            self.__ready_condition.wait_for(lambda: self.__next_delivered in self.__ready)
+            batch = self.__ready.pop(self.__next_delivered)
+            self.__next_delivered += 1
+        self.__slots.release()
+        if isinstance(batch, BaseException):
+            raise batch
+        return batch
+
+    def close(self) -> List[Tuple[List[List[int]], Any]]:
+        """
+        Stop the workers.
+
+        :return: Batches read and not delivered yet, in their order.
+        """
+
+        self.__stop.set()
+        for _ in self.workers:
+            self.__slots.release()
+        for worker in self.workers:
+            worker.join()
+        return [self.__ready[batch_id] for batch_id in sorted(self.__ready)
+                if not isinstance(self.__ready[batch_id], BaseException)]
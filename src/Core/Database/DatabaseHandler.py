@@ -1,9 +1,11 @@
 from typing import Union, List, Dict, Any, Callable, Optional, Type, Tuple
-from numpy import array, where
-from itertools import chain
+from numpy import ndarray, array, empty, arange, append, unique, lexsort, argsort, searchsorted
 
 from SSD.Core.Storage.Database import Database
 
+from DeepPhysX.Core.Database.MemmapPartition import MemmapPartition
+from DeepPhysX.Core.Database.SharedExchange import SharedExchange
+
 
 class DatabaseHandler:
 
@@ -20,6 +22,12 @@ class DatabaseHandler:
         # Databases variables
         self.__storing_partitions: List[Database] = []
         self.__exchange_db: Optional[Database] = None
+        self.__memmap_partitions: List[Optional[MemmapPartition]] = []
+        self.__shared_exchange: Optional[SharedExchange] = None
+
+        # Shard variables (a writer only adds lines in its own partition among the last 'nb_shards' ones)
+        self.__shard_id: int = 0
+        self.__nb_shards: int = 1
 
         # Event handlers
         self.__on_init_handler = self.default_handler if on_init_handler is None else on_init_handler
@@ -36,16 +44,25 @@ class DatabaseHandler:
 
     def init(self,
              storing_partitions: List[Database],
-             exchange_db: Database) -> None:
+             exchange_db: Database,
+             nb_shards: int = 1,
+             memmap_partitions: Optional[List[Optional[MemmapPartition]]] = None,
+             shared_exchange: Optional[SharedExchange] = None) -> None:
         """
         Initialize the list of the partitions.
 
         :param storing_partitions: List of the storing Database partitions.
         :param exchange_db: Exchange Database.
+        :param nb_shards: Number of partitions written simultaneously by different writers.
+        :param memmap_partitions: Memory-mapped Fields of each storing partition.
+        :param shared_exchange: Lines of the Exchange Table in shared memory (the exchange Database is used if None).
         """
 
         self.__storing_partitions = storing_partitions.copy()
         self.__exchange_db = exchange_db
+        self.__nb_shards = nb_shards
+        self.__memmap_partitions = [] if memmap_partitions is None else memmap_partitions.copy()
+        self.__shared_exchange = shared_exchange
         self.__on_init_handler()
 
     def init_remote(self,
@@ -65,28 +82,73 @@ class DatabaseHandler:
         self.__on_init_handler()
 
     def update_list_partitions(self,
-                               partition: Database) -> None:
+                               partitions: List[Database]) -> None:
         """
-        Add a new storing partition to the list.
+        Add new storing partitions to the list (one per shard).
 
-        :param partition: New storing partition to add.
+        :param partitions: New storing partitions to add.
         """
 
-        self.__storing_partitions.append(partition)
+        self.__storing_partitions += partitions
         self.__on_partitions_handler()
 
     def update_list_partitions_remote(self,
-                                      partition: List[str]) -> None:
+                                      partitions: List[str]) -> None:
         """
-        Add a new storing partition to the list in remote DatabaseHandler.
+        Add new storing partitions to the list in remote DatabaseHandler.
 
-        :param partition: Path to the new storing partition.
+        :param partitions: Directory of the new storing partitions followed by their names.
         """
 
-        self.__storing_partitions.append(Database(database_dir=partition[0],
-                                                  database_name=partition[1]).load())
+        self.__storing_partitions += [Database(database_dir=partitions[0],
+                                               database_name=partition_name).load()
+                                      for partition_name in partitions[1:]]
         self.__on_partitions_handler()
 
+    def set_shared_exchange(self,
+                            shared_exchange: Optional[SharedExchange]) -> None:
+        """
+        Define the lines of the Exchange Table in shared memory.
+
+        :param shared_exchange: Lines of the Exchange Table in shared memory (the exchange Database is used if None).
+        """
+
+        self.__shared_exchange = shared_exchange
+
+    def get_shared_exchange(self) -> Optional[SharedExchange]:
+        """
+        Get the lines of the Exchange Table in shared memory.
+        """
+
+        return self.__shared_exchange
+
+    def set_shard(self,
+                  shard_id: int,
+                  nb_shards: int) -> None:
+        """
+        Define the partition in which the component writes when the partitions are sharded between writers.
+
+        :param shard_id: Index of the shard of the component.
+        :param nb_shards: Number of partitions written simultaneously by different writers.
+        """
+
+        self.__shard_id = shard_id
+        self.__nb_shards = nb_shards
+
+    def get_nb_shards(self) -> int:
+        """
+        Get the number of partitions written simultaneously by different writers.
+        """
+
+        return self.__nb_shards
+
+    def __get_writing_partition_id(self) -> int:
+        """
+        Get the index of the storing partition in which the component writes.
+        """
+
+        return len(self.__storing_partitions) - self.__nb_shards + self.__shard_id
+
     def load(self) -> None:
         """
         Load the Database partitions stored by the component.
@@ -148,6 +210,11 @@ class DatabaseHandler:
             if len(self.__storing_partitions[0].get_fields(table_name=table_name)) <= 2:
                 self.__storing_partitions[0].create_fields(table_name=table_name,
                                                            fields=fields)
+            # Each writer creates the Field(s) in its own shard
+            partition = self.__storing_partitions[self.__get_writing_partition_id()]
+            if partition is not self.__storing_partitions[0] and len(partition.get_fields(table_name=table_name)) <= 2:
+                partition.create_fields(table_name=table_name,
+                                        fields=fields)
 
     def get_fields(self,
                    table_name: str) -> List[str]:
@@ -184,24 +251,36 @@ class DatabaseHandler:
 
         # Add data in the storing Database
         else:
-            return [len(self.__storing_partitions) - 1,
-                    self.__storing_partitions[-1].add_data(table_name=table_name, data=data)]
+            partition_id = self.__get_writing_partition_id()
+            return [partition_id,
+                    self.__storing_partitions[partition_id].add_data(table_name=table_name, data=data)]
 
     def add_batch(self,
                   table_name: str,
-                  batch: Dict[str, List[Any]]) -> None:
+                  batch: Dict[str, List[Any]]) -> List[List[int]]:
         """
         Add a batch of data in a Database.
 
         :param table_name: Name of the Table.
         :param batch: New lines of the Table.
+        :return: Indices of the new lines. The first line is written alone to get its index, the next lines of the
+                 batch are consecutive, which requires a single writer per partition (see 'shard_partitions').
         """
 
         # Only available in the storing Database
         if table_name == 'Exchange':
             raise ValueError(f"Cannot add a batch in the Exchange Database.")
-        self.__storing_partitions[-1].add_batch(table_name=table_name,
-                                                batch=batch)
+        batch_size = len(next(iter(batch.values()))) if len(batch) > 0 else 0
+        if batch_size == 0:
+            return []
+        partition_id = self.__get_writing_partition_id()
+        partition = self.__storing_partitions[partition_id]
+        first_line = partition.add_data(table_name=table_name,
+                                        data={field: values[0] for field, values in batch.items()})
+        if batch_size > 1:
+            partition.add_batch(table_name=table_name,
+                                batch={field: values[1:] for field, values in batch.items()})
+        return [[partition_id, line_id] for line_id in range(first_line, first_line + batch_size)]
 
     def update(self,
                table_name: str,
@@ -217,7 +296,16 @@ class DatabaseHandler:
         :param create_fields: Create missing fields.
         """
 
+        # The Exchange Table can be stored in shared memory
+        if table_name == 'Exchange' and self.__shared_exchange is not None:
+            return self.__shared_exchange.update(line_id=line_id,
+                                                 data=data)
+
         database = self.__exchange_db if table_name == 'Exchange' else self.__storing_partitions[line_id[0]]
+        # The memory-mapped Fields of the partition are outdated
+        if table_name == 'Training' and line_id[0] < len(self.__memmap_partitions) and \
+                self.__memmap_partitions[line_id[0]] is not None:
+            self.__memmap_partitions[line_id[0]].invalidate()
         line_id = line_id[1] if type(line_id) == list else line_id
         database.update(table_name=table_name, data=data, line_id=line_id, create_fields=create_fields)
 
@@ -233,7 +321,16 @@ class DatabaseHandler:
         :param fields: Data fields to extract.
         """
 
+        # The Exchange Table can be stored in shared memory
+        if table_name == 'Exchange' and self.__shared_exchange is not None:
+            return self.__shared_exchange.get_line(line_id=line_id,
+                                                   fields=fields)
+
         database = self.__exchange_db if table_name == 'Exchange' else self.__storing_partitions[line_id[0]]
+        # The memory-mapped Fields of the partition are outdated
+        if table_name == 'Training' and line_id[0] < len(self.__memmap_partitions) and \
+                self.__memmap_partitions[line_id[0]] is not None:
+            self.__memmap_partitions[line_id[0]].invalidate()
         line_id = line_id[1] if type(line_id) == list else line_id
         if database.nb_lines(table_name=table_name) == 0:
             return {}
@@ -244,38 +341,126 @@ class DatabaseHandler:
     def get_lines(self,
                   table_name: str,
                   lines_id: List[List[int]],
-                  fields: Optional[Union[str, List[str]]] = None) -> Dict[str, Any]:
+                  fields: Optional[Union[str, List[str]]] = None,
+                  out: Optional[Dict[str, ndarray]] = None) -> Dict[str, Any]:
         """
         Get lines of data from a Database.
+        The lines are read partition by partition in ascending order, then returned in the requested order. Array
+        Fields are gathered in a single array.
 
         :param table_name: Name of the Table.
         :param lines_id: Indices of the lines to get.
-        :param fields: Data fields to extract.
-        """
+        :param fields: Data Fields to extract.
+        :param out: Arrays in which the array Fields are read. An array which does not match the shape of the batch is
+                    replaced in 'out' by a new array with the same type.
+        """
+
+        # 1. Group the lines by partition with a single sort
+        batch_indices = array(lines_id, dtype=int).reshape((-1, 2))
+        order = lexsort((batch_indices[:, 1], batch_indices[:, 0]))
+        sorted_indices = batch_indices[order]
+        partition_ids, first = unique(sorted_indices[:, 0], return_index=True)
+        last = append(first[1:], len(order))
+
+        # 2. Read the lines of each partition and put them at their positions in the batch
+        batch = {}
+        fields_list = [fields] if type(fields) == str else fields
+        for partition_id, start, end in zip(partition_ids, first, last):
+            positions = order[start:end]
+            lines = sorted_indices[start:end, 1]
+            # Read the memory-mapped Fields if they are all available for this partition
+            memmap = self.__memmap_partitions[partition_id] if partition_id < len(self.__memmap_partitions) else None
+            if table_name == 'Training' and memmap is not None and fields_list is not None \
+                    and memmap.has_fields(fields_list):
+                data = memmap.get_lines(lines_id=lines,
+                                        fields=fields_list)
+                rows = arange(len(lines))
+            # Otherwise, read each line once in the Database and match the read lines with their indices
+            else:
+                data = self.__storing_partitions[partition_id].get_lines(table_name=table_name,
+                                                                         lines_id=unique(lines).tolist(),
+                                                                         fields=fields,
+                                                                         batched=True)
+                read_lines = array(data.pop('id'))
+                read_order = argsort(read_lines)
+                rows = read_order[searchsorted(read_lines, lines, sorter=read_order)]
+            self.__scatter_lines(batch=batch,
+                                 data=data,
+                                 rows=rows,
+                                 positions=positions,
+                                 batch_size=len(batch_indices),
+                                 out=out)
+        return batch
+
+    def get_lines_projections(self,
+                              table_name: str,
+                              lines_id: List[List[int]],
+                              projections: Dict[str, List[str]],
+                              out: Optional[Dict[str, ndarray]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Get lines of data for several consumers with a single read of the union of their Fields. Each consumer gets the
+        columns of its own Fields, a Field requested by several consumers is shared between them.
 
-        # Transform list of lines to batch of lines per partition
-        batch_indices = array(lines_id)
-        partition_batch_indices = []
-        for i in range(len(self.__storing_partitions)):
-            partition_indices = where(batch_indices[:, 0] == i)[0]
-            if len(partition_indices) > 0:
-                partition_batch_indices.append([i, batch_indices[partition_indices, 1].tolist()])
-
-        # Get lines of data
-        partition_batches = []
-        for partition_indices in partition_batch_indices:
-            data = self.__storing_partitions[partition_indices[0]].get_lines(table_name=table_name,
-                                                                             lines_id=partition_indices[1],
-                                                                             fields=fields,
-                                                                             batched=True)
-            del data['id']
-            partition_batches.append(data)
-
-        # Merge batches
-        if len(partition_batches) == 1:
-            return partition_batches[0]
-        else:
-            return dict(zip(partition_batches[0].keys(),
-                            [list(chain.from_iterable([partition_batches[i][key]
-                                                       for i in range(len(partition_batches))]))
-                             for key in partition_batches[0].keys()]))
+        :param table_name: Name of the Table.
+        :param lines_id: Indices of the lines to get.
+        :param projections: Data Fields to extract for each consumer.
+        :param out: Arrays in which the array Fields are read.
+        """
+
+        fields = list(dict.fromkeys(field for consumer_fields in projections.values() for field in consumer_fields))
+        batch = self.get_lines(table_name=table_name,
+                               lines_id=lines_id,
+                               fields=fields,
+                               out=out)
+        return {consumer: {field: batch[field] for field in consumer_fields}
+                for consumer, consumer_fields in projections.items()}
+
+    def __scatter_lines(self,
+                        batch: Dict[str, Any],
+                        data: Dict[str, Any],
+                        rows: ndarray,
+                        positions: ndarray,
+                        batch_size: int,
+                        out: Optional[Dict[str, ndarray]] = None) -> None:
+        """
+        Put the lines read in a partition at their positions in the batch.
+
+        :param batch: Batch of lines to fill.
+        :param data: Lines read in a partition.
+        :param rows: Index in the read lines of each line to put in the batch.
+        :param positions: Position in the batch of each line.
+        :param batch_size: Number of lines in the batch.
+        :param out: Arrays in which the array Fields are read.
+        """
+
+        for field, values in data.items():
+            # Fields of joined Tables are read as dictionaries
+            if isinstance(values, dict):
+                self.__scatter_lines(batch=batch.setdefault(field, {}),
+                                     data=values,
+                                     rows=rows,
+                                     positions=positions,
+                                     batch_size=batch_size)
+                continue
+            # Array Fields are gathered in a preallocated array, other Fields in a list
+            if field not in batch:
+                sample = values[rows[0]]
+                if not isinstance(sample, ndarray):
+                    batch[field] = [None] * batch_size
+                elif out is not None and field in out and out[field].shape == (batch_size, *sample.shape):
+                    batch[field] = out[field]
+                else:
+                    batch[field] = empty((batch_size, *sample.shape),
+                                         dtype=out[field].dtype if out is not None and field in out else sample.dtype)
+                    if out is not None:
+                        out[field] = batch[field]
+            # Arrays with different shapes are kept in a list
+            if isinstance(batch[field], ndarray) and \
+                    any(not isinstance(values[row], ndarray) or values[row].shape != batch[field].shape[1:]
+                        for row in rows):
+                batch[field] = list(batch[field])
+            if isinstance(batch[field], ndarray) and isinstance(values, ndarray):
+                batch[field][positions] = values[rows]
+            else:
+                for position, row in zip(positions, rows):
+                    batch[field][position] = values[row]
@@ -0,0 +1,157 @@
+from typing import Dict, List, Tuple
+from os import remove, replace, stat
+from os.path import isfile, join
+from json import load as json_load, dump as json_dump
+from numpy import ndarray, array, asarray, load
+from numpy.lib.format import open_memmap
+
+from SSD.Core.Storage.Database import Database
+
+
+class MemmapPartition:
+
+    def __init__(self,
+                 partition: Database,
+                 fields: Dict[str, Tuple[int]],
+                 chunk_size: int = 1000):
+        """
+        MemmapPartition stores the fixed-shape Fields of the Training Table of a Database partition in memory-mapped
+        files (one .npy file per Field) to read batches of samples without decoding the lines of the Database.
+        The modification stamp of the partition is stored with the files: a file exported from an older version of the
+        partition is exported again, and the Fields are no longer read once the partition is modified.
+
+        :param partition: Database partition to map.
+        :param fields: Shape of a sample for each Field to map.
+        :param chunk_size: Number of lines read at once when a Field is exported from the Database.
+        """
+
+        self.name: str = self.__class__.__name__
+
+        # Memory-mapped Fields
+        self.partition: Database = partition
+        self.arrays: Dict[str, ndarray] = {}
+
+        # Modification stamp of the partition when the Fields were mapped
+        database_dir, database_name = partition.get_path()
+        self.database_path: str = join(database_dir, f'{database_name}.db')
+        self.stamp: List[int] = self.get_stamp()
+
+        # Map each Field, export it from the Database if the file does not exist or is outdated
+        nb_lines = partition.nb_lines(table_name='Training')
+        if nb_lines == 0:
+            return
+        stamps_path = join(database_dir, f'{database_name}.mmap.json')
+        stamps = {}
+        if isfile(stamps_path):
+            with open(stamps_path) as stamps_file:
+                stamps = json_load(stamps_file)
+        for field, shape in fields.items():
+            path = join(database_dir, f'{database_name}.{field}.npy')
+            if not isfile(path) or stamps.get(field) != self.stamp or \
+                    load(path, mmap_mode='r').shape != (nb_lines, *shape):
+                stamps.pop(field, None)
+                if not self.__export(field=field, shape=tuple(shape), path=path, nb_lines=nb_lines,
+                                     chunk_size=chunk_size):
+                    continue
+                stamps[field] = self.stamp
+            self.arrays[field] = load(path, mmap_mode='r')
+        with open(f'{stamps_path}.tmp', 'w') as stamps_file:
+            json_dump(stamps, stamps_file)
+        replace(f'{stamps_path}.tmp', stamps_path)
+
+    def get_stamp(self) -> List[int]:
+        """
+        Get the modification stamp of the partition: the change counter of the SQLite header (incremented by each
+        transaction), with the modification time and the size of the Database files.
+        """
+
+        stamp = []
+        if isfile(self.database_path):
+            with open(self.database_path, 'rb') as database_file:
+                database_file.seek(24)
+                stamp.append(int.from_bytes(database_file.read(4), 'big'))
+        for path in (self.database_path, f'{self.database_path}-wal'):
+            if isfile(path):
+                file_stat = stat(path)
+                stamp += [file_stat.st_mtime_ns, file_stat.st_size]
+        return stamp
+
+    def is_current(self) -> bool:
+        """
+        Check that the partition was not modified since its Fields were mapped.
+        """
+
+        if len(self.arrays) > 0 and self.get_stamp() != self.stamp:
+            self.invalidate()
+        return len(self.arrays) > 0
+
+    def invalidate(self) -> None:
+        """
+        Stop reading the memory-mapped Fields, the lines are then read in the Database.
+        """
+
+        self.arrays = {}
+
+    def __export(self,
+                 field: str,
+                 shape: Tuple[int],
+                 path: str,
+                 nb_lines: int,
+                 chunk_size: int) -> bool:
+        """
+        Write a Field of the Training Table in a .npy file. Lines are read by chunks.
+
+        :param field: Name of the Field.
+        :param shape: Shape of a sample of the Field.
+        :param path: Path to the .npy file.
+        :param nb_lines: Number of lines in the Table.
+        :param chunk_size: Number of lines read at once.
+        :return: False if the samples of the Field do not have a fixed shape.
+        """
+
+        # Write in a temporary file, so that an interrupted export is never loaded
+        tmp_path = f'{path}.tmp'
+        field_array = None
+        for first_line in range(1, nb_lines + 1, chunk_size):
+            values = self.partition.get_lines(table_name='Training',
+                                              fields=[field],
+                                              lines_id=list(range(first_line,
+                                                                  min(first_line + chunk_size, nb_lines + 1))),
+                                              batched=True)[field]
+            # Fields with a variable shape are not mapped
+            if any(asarray(value).shape != shape for value in values):
+                del field_array
+                if isfile(tmp_path):
+                    remove(tmp_path)
+                return False
+            data = array(values)
+            if field_array is None:
+                field_array = open_memmap(tmp_path, mode='w+', dtype=data.dtype, shape=(nb_lines, *shape))
+            field_array[first_line - 1:first_line - 1 + len(data)] = data
+        field_array.flush()
+        del field_array
+        replace(tmp_path, path)
+        return True
+
+    def has_fields(self,
+                   fields: List[str]) -> bool:
+        """
+        Check if Fields are memory-mapped.
+
+        :param fields: Names of the Fields.
+        """
+
+        return self.is_current() and all(field in self.arrays for field in fields)
+
+    def get_lines(self,
+                  lines_id: List[int],
+                  fields: List[str]) -> Dict[str, ndarray]:
+        """
+        Get lines of data from the memory-mapped Fields, in the requested order.
+
+        :param lines_id: Indices of the lines to get.
+        :param fields: Data Fields to extract.
+        """
+
+        lines = array(lines_id) - 1
+        return {field: self.arrays[field][lines] for field in fields}
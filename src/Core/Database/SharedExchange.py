@@ -0,0 +1,196 @@
+from typing import Any, Dict, List, Optional, Union
+from os import getpid
+from json import dumps, loads
+from multiprocessing.shared_memory import SharedMemory
+from numpy import ndarray, asarray
+
+
+class SharedExchange:
+
+    # Size of the header of a Field block (shape and type of the data) and of the directory of a line
+    header_size: int = 256
+    directory_size: int = 4096
+
+    def __init__(self,
+                 name: str):
+        """
+        SharedExchange stores the lines of the Exchange Table in shared memory, so that the Environments and the Network
+        exchange data without going through the exchange Database. Each line (one per Environment instance) is a
+        directory block listing the blocks of its Fields. Writers and readers are synchronized by the requests sent
+        between them.
+
+        :param name: Name of the SharedExchange, shared by all the processes.
+        """
+
+        self.name: str = name
+
+        # Shared memory blocks, with the process that created each owned block (only this process unlinks it)
+        self.__blocks: Dict[str, SharedMemory] = {}
+        self.__owned_blocks: Dict[str, int] = {}
+        self.__nb_blocks: int = 0
+
+    def __attach(self,
+                 block_name: str) -> SharedMemory:
+        """
+        Get a shared memory block, attach to it if it was created by another process.
+
+        :param block_name: Name of the block.
+        """
+
+        if block_name not in self.__blocks:
+            try:
+                block = SharedMemory(name=block_name, track=False)
+            except TypeError:
+                # Without 'track', the block is registered again in the resource tracker, which is shared with the
+                # spawned and forked processes, the cleanup of the block still belongs to the process that created it
+                block = SharedMemory(name=block_name)
+            self.__blocks[block_name] = block
+        return self.__blocks[block_name]
+
+    def __create(self,
+                 block_name: str,
+                 size: int) -> SharedMemory:
+        """
+        Create a new shared memory block.
+
+        :param block_name: Name of the block.
+        :param size: Size of the block in bytes.
+        """
+
+        block = SharedMemory(name=block_name, create=True, size=size)
+        self.__blocks[block_name] = block
+        self.__owned_blocks[block_name] = getpid()
+        return block
+
+    def __get_directory(self,
+                        line_id: int,
+                        create: bool = False) -> Optional[SharedMemory]:
+        """
+        Get the directory block of a line.
+
+        :param line_id: Index of the line.
+        :param create: If True, the directory is created if it does not exist.
+        """
+
+        directory_name = f'{self.name}_{line_id}'
+        try:
+            return self.__attach(directory_name)
+        except FileNotFoundError:
+            if not create:
+                return None
+        try:
+            block = self.__create(block_name=directory_name, size=self.directory_size)
+            block.buf[:2] = b'{}'
+            return block
+        except FileExistsError:
+            return self.__attach(directory_name)
+
+    @staticmethod
+    def __read_json(block: SharedMemory,
+                    size: int) -> Dict[str, Any]:
+        """
+        Read a json content at the beginning of a block.
+
+        :param block: Shared memory block.
+        :param size: Maximum size of the content.
+        """
+
+        return loads(bytes(block.buf[:size]).split(b'\0', 1)[0])
+
+    @staticmethod
+    def __write_json(block: SharedMemory,
+                     content: Dict[str, Any],
+                     size: int) -> None:
+        """
+        Write a json content at the beginning of a block.
+
+        :param block: Shared memory block.
+        :param content: Content to write.
+        :param size: Maximum size of the content.
+        """
+
+        encoded = dumps(content, separators=(',', ':')).encode()
+        if len(encoded) >= size:
+            raise ValueError(f"[SharedExchange] The content {content} exceeds the size of the block.")
+        block.buf[:len(encoded) + 1] = encoded + b'\0'
+
+    def update(self,
+               line_id: int,
+               data: Dict[str, Any]) -> None:
+        """
+        Update a line of the Exchange Table. A Field block is replaced by a larger one if the data does not fit.
+
+        :param line_id: Index of the line to edit.
+        :param data: Updated Fields of the line.
+        """
+
+        directory = self.__get_directory(line_id=line_id, create=True)
+        fields = self.__read_json(block=directory, size=self.directory_size)
+        for field, value in data.items():
+            value = asarray(value)
+            if value.dtype.hasobject:
+                raise ValueError(f"[SharedExchange] The Field '{field}' can not be stored in shared memory.")
+            # Get the block of the Field, create a new one if the data does not fit
+            block = self.__attach(fields[field]) if field in fields else None
+            if block is None or block.size < self.header_size + value.nbytes:
+                block_name = f'{self.name}_{getpid()}_{self.__nb_blocks}'
+                self.__nb_blocks += 1
+                if field in fields and fields[field] in self.__owned_blocks:
+                    self.__release(block_name=fields[field])
+                block = self.__create(block_name=block_name, size=self.header_size + max(value.nbytes, 1))
+                fields[field] = block_name
+                self.__write_json(block=directory, content=fields, size=self.directory_size)
+            # Write the data after its description
+            self.__write_json(block=block,
+                              content={'dtype': value.dtype.str, 'shape': value.shape, 'scalar': value.ndim == 0},
+                              size=self.header_size)
+            ndarray(value.shape, dtype=value.dtype, buffer=block.buf, offset=self.header_size)[...] = value
+
+    def get_line(self,
+                 line_id: int,
+                 fields: Optional[Union[str, List[str]]] = None) -> Dict[str, Any]:
+        """
+        Get a line of the Exchange Table.
+
+        :param line_id: Index of the line to get.
+        :param fields: Data Fields to extract (every Field of the line if None).
+        """
+
+        directory = self.__get_directory(line_id=line_id)
+        if directory is None:
+            return {}
+        blocks = self.__read_json(block=directory, size=self.directory_size)
+        fields = blocks.keys() if fields is None else [fields] if type(fields) == str else fields
+        line = {'id': line_id}
+        for field in fields:
+            block = self.__attach(blocks[field])
+            header = self.__read_json(block=block, size=self.header_size)
+            value = ndarray(header['shape'], dtype=header['dtype'], buffer=block.buf, offset=self.header_size).copy()
+            line[field] = value.item() if header['scalar'] else value
+        return line
+
+    def __release(self,
+                  block_name: str) -> None:
+        """
+        Close a shared memory block and unlink it if it was created by this process.
+
+        :param block_name: Name of the block.
+        """
+
+        block = self.__blocks.pop(block_name)
+        block.close()
+        # A forked process gets the owned blocks of its parent, but only the creating process unlinks them
+        if self.__owned_blocks.pop(block_name, None) == getpid():
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+
+    def close(self) -> None:
+        """
+        Close the shared memory blocks and unlink those created by this process. Closing twice has no effect.
+        """
+
+        for block_name in list(self.__blocks.keys()):
+            self.__release(block_name=block_name)
+        self.__owned_blocks = {}
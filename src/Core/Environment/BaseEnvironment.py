@@ -39,6 +39,15 @@ class BaseEnvironment(AbstractEnvironment):
         self.sample_training: Optional[Dict[str, Any]] = None
         self.sample_additional: Optional[Dict[str, Any]] = None
         self.__first_add: List[bool] = [True, True]
+        # Fields read in the Training and Additional Tables for a sample of the Dataset (every field if None)
+        self.training_fields: Optional[List[str]] = None
+        self.additional_fields: Optional[List[str]] = None
+
+        # Write buffer variables (samples are written one by one if the buffer size is 0)
+        self.write_buffer_size: int = 0
+        self.__buffer_training: List[Dict[str, Any]] = []
+        self.__buffer_additional: List[Dict[str, Any]] = []
+        self.__flushed_lines: List[List[int]] = []
 
         # Connect the Environment to the data Database
         self.__database_handler = DatabaseHandler(on_init_handler=self.__database_handler_init)
@@ -347,20 +356,69 @@ class BaseEnvironment(AbstractEnvironment):
 
         self.factory.connect_visualizer()
 
-    def _send_training_data(self) -> List[int]:
+    def _send_training_data(self) -> Optional[List[int]]:
         """
         Add the training data and the additional data in their respective Databases.
+        If the write buffer is used, the sample is buffered and the buffer is written when it is full.
         Should not be used by users.
 
-        :return: Index of the samples in the Database.
+        :return: Index of the samples in the Database, None if the sample is buffered.
         """
 
+        # Buffer the sample (arrays are copied since they can be modified in place by the next steps)
+        if self.write_buffer_size > 0:
+            self.__buffer_training.append({field: value.copy() if isinstance(value, ndarray) else value
+                                           for field, value in self.__data_training.items()})
+            self.__buffer_additional.append({field: value.copy() if isinstance(value, ndarray) else value
+                                             for field, value in self.__data_additional.items()})
+            if len(self.__buffer_training) >= self.write_buffer_size:
+                self.__write_buffer()
+            return None
+
         line_id = self.__database_handler.add_data(table_name='Training',
                                                    data=self.__data_training)
         self.__database_handler.add_data(table_name='Additional',
                                          data=self.__data_additional)
         return line_id
 
+    def _flush_training_data(self) -> List[List[int]]:
+        """
+        Write the buffered samples in the Databases.
+        Should not be used by users.
+
+        :return: Indices of the samples written since the last flush.
+        """
+
+        self.__write_buffer()
+        lines = self.__flushed_lines
+        self.__flushed_lines = []
+        return lines
+
+    def __write_buffer(self) -> None:
+        """
+        Write the buffered samples in their respective Databases with a single batch for each Table.
+        """
+
+        if len(self.__buffer_training) == 0:
+            return
+        # Lines without additional data only store the instance index, so that every Table has a line per sample
+        self.__buffer_additional = [sample if len(sample) > 0 else {'env_id': self.instance_id}
+                                    for sample in self.__buffer_additional]
+        for table_name, buffer in zip(['Training', 'Additional'], [self.__buffer_training, self.__buffer_additional]):
+            # Samples with the same fields are written in a single batch
+            if all(sample.keys() == buffer[0].keys() for sample in buffer):
+                lines = self.__database_handler.add_batch(table_name=table_name,
+                                                          batch={field: [sample[field] for sample in buffer]
+                                                                 for field in buffer[0].keys()})
+            # Otherwise, lines are added one by one to keep the Tables aligned
+            else:
+                lines = [self.__database_handler.add_data(table_name=table_name,
+                                                          data=sample) for sample in buffer]
+            if table_name == 'Training':
+                self.__flushed_lines += lines
+        self.__buffer_training = []
+        self.__buffer_additional = []
+
     def _update_training_data(self,
                               line_id: List[int]) -> None:
         """
@@ -390,10 +448,19 @@ class BaseEnvironment(AbstractEnvironment):
 
         self.update_line = line_id
         self.sample_training = self.__database_handler.get_line(table_name='Training',
-                                                                line_id=line_id)
-        self.sample_additional = self.__database_handler.get_line(table_name='Additional',
-                                                                  line_id=line_id)
-        self.sample_additional = None if len(self.sample_additional) == 1 else self.sample_additional
+                                                                line_id=line_id,
+                                                                fields=self.training_fields)
+        # The Additional Table is not read if no field is required
+        if self.additional_fields is None:
+            self.sample_additional = self.__database_handler.get_line(table_name='Additional',
+                                                                      line_id=line_id)
+            self.sample_additional = None if len(self.sample_additional) == 1 else self.sample_additional
+        elif len(self.additional_fields) == 0:
+            self.sample_additional = None
+        else:
+            self.sample_additional = self.__database_handler.get_line(table_name='Additional',
+                                                                      line_id=line_id,
+                                                                      fields=self.additional_fields)
 
     def _reset_training_data(self) -> None:
         """
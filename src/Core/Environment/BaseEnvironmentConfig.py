@@ -1,12 +1,17 @@
-from typing import Any, Optional, Type, Dict, Tuple
+from typing import Any, Optional, Type, Dict, List, Tuple, Union
 from os import cpu_count
 from os.path import join, dirname
 from threading import Thread
+from concurrent.futures import Future, InvalidStateError
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from subprocess import run
 from sys import modules, executable
+from multiprocessing import get_context, get_all_start_methods
+from multiprocessing.process import BaseProcess
 
 from DeepPhysX.Core.AsyncSocket.TcpIpServer import TcpIpServer
 from DeepPhysX.Core.Environment.BaseEnvironment import BaseEnvironment
+from DeepPhysX.Core.Environment.launcherBaseEnvironment import launch_client
 
 
 class BaseEnvironmentConfig:
@@ -15,13 +20,20 @@ class BaseEnvironmentConfig:
                  environment_class: Type[BaseEnvironment],
                  as_tcp_ip_client: bool = True,
                  number_of_thread: int = 1,
+                 requests_per_client: int = 1,
                  ip_address: str = 'localhost',
                  port: int = 10000,
+                 startup_timeout: Optional[Union[int, float]] = None,
+                 client_launcher: str = 'subprocess',
                  simulations_per_step: int = 1,
                  max_wrong_samples_per_step: int = 10,
                  load_samples: bool = False,
                  only_first_epoch: bool = True,
                  always_produce: bool = False,
+                 prefetch_batches: int = 0,
+                 write_buffer_size: int = 0,
+                 prediction_batch_size: int = 1,
+                 prediction_window: float = 0.,
                  visualizer: Optional[str] = None,
                  record_wrong_samples: bool = False,
                  env_kwargs: Optional[Dict[str, Any]] = None):
@@ -32,14 +44,29 @@ class BaseEnvironmentConfig:
         :param environment_class: Class from which an instance will be created.
         :param as_tcp_ip_client: Environment is owned by a TcpIpClient if True, by an EnvironmentManager if False.
         :param number_of_thread: Number of thread to run.
+        :param requests_per_client: Maximum number of step requests sent to a TcpIpClient before receiving its samples.
+                                    Values greater than 1 require Environments that do not request predictions.
         :param ip_address: IP address of the TcpIpObject.
         :param port: Port number of the TcpIpObject.
+        :param startup_timeout: Maximum time in seconds to wait for the TcpIpClients to connect and initialize
+                                (None for no limit).
+        :param client_launcher: Method to launch the TcpIpClients, either 'subprocess' (a new interpreter per client)
+                                or 'forkserver' (clients forked from a process with pre-imported modules).
         :param simulations_per_step: Number of iterations to compute in the Environment at each time step.
         :param max_wrong_samples_per_step: Maximum number of wrong samples to produce in a step.
         :param load_samples: If True, the dataset will always be used in the environment.
         :param only_first_epoch: If True, data will always be created from environment. If False, data will be created
                                  from the environment during the first epoch and then re-used from the Dataset.
         :param always_produce: If True, data will always be produced in Environment(s).
+        :param prefetch_batches: Number of batches produced in advance by Environment(s) while the Network is
+                                 trained (0 to disable).
+        :param write_buffer_size: Number of samples buffered by an Environment before writing them in the Database in
+                                  a single batch (0 to write each sample). Requires sharded partitions with several
+                                  TcpIpClients.
+        :param prediction_batch_size: Maximum number of prediction requests of the TcpIpClients computed together in a
+                                      single prediction (1 to compute each request when it is received).
+        :param prediction_window: Maximum time in seconds a prediction request waits for the requests of other
+                                  TcpIpClients before the pending requests are computed.
         :param visualizer: Backend of the Visualizer to use.
         :param record_wrong_samples: If True, wrong samples are recorded through Visualizer.
         :param env_kwargs: Additional arguments to pass to the Environment.
@@ -67,6 +94,37 @@ class BaseEnvironmentConfig:
             raise TypeError(f"[{self.name}] The number_of_thread number must be a positive integer.")
         if number_of_thread < 0:
             raise ValueError(f"[{self.name}] The number_of_thread number must be a positive integer.")
+        if type(requests_per_client) != int:
+            raise TypeError(f"[{self.name}] The requests_per_client number must be a positive integer.")
+        if requests_per_client < 1:
+            raise ValueError(f"[{self.name}] The requests_per_client number must be a positive integer.")
+        if startup_timeout is not None and type(startup_timeout) not in [int, float]:
+            raise TypeError(f"[{self.name}] Wrong startup_timeout type: float required, get {type(startup_timeout)}")
+        if startup_timeout is not None and startup_timeout <= 0:
+            raise ValueError(f"[{self.name}] Given startup_timeout value is negative or null")
+        if client_launcher not in ['subprocess', 'forkserver']:
+            raise ValueError(f"[{self.name}] The given 'client_launcher'={client_launcher} must be in "
+                             f"['subprocess', 'forkserver'].")
+        if client_launcher == 'forkserver' and 'forkserver' not in get_all_start_methods():
+            raise ValueError(f"[{self.name}] The 'forkserver' client_launcher is not available on this platform.")
+        if type(prefetch_batches) != int:
+            raise TypeError(f"[{self.name}] Wrong prefetch_batches type: int required, get {type(prefetch_batches)}")
+        if prefetch_batches < 0:
+            raise ValueError(f"[{self.name}] Given prefetch_batches value is negative")
+        if type(write_buffer_size) != int:
+            raise TypeError(f"[{self.name}] Wrong write_buffer_size type: int required, get {type(write_buffer_size)}")
+        if write_buffer_size < 0:
+            raise ValueError(f"[{self.name}] Given write_buffer_size value is negative")
+        if type(prediction_batch_size) != int:
+            raise TypeError(f"[{self.name}] Wrong prediction_batch_size type: int required, get "
+                            f"{type(prediction_batch_size)}")
+        if prediction_batch_size < 1:
+            raise ValueError(f"[{self.name}] Given prediction_batch_size value is negative or null")
+        if type(prediction_window) not in [int, float]:
+            raise TypeError(f"[{self.name}] Wrong prediction_window type: float required, get "
+                            f"{type(prediction_window)}")
+        if prediction_window < 0:
+            raise ValueError(f"[{self.name}] Given prediction_window value is negative")
 
         # TcpIpClients variables
         self.environment_class: Type[BaseEnvironment] = environment_class
@@ -75,9 +133,15 @@ class BaseEnvironmentConfig:
 
         # TcpIpServer variables
         self.number_of_thread: int = min(max(number_of_thread, 1), cpu_count())  # Assert nb is between 1 and cpu_count
+        self.requests_per_client: int = requests_per_client
+        self.prediction_batch_size: int = prediction_batch_size
+        self.prediction_window: float = float(prediction_window)
         self.ip_address: str = ip_address
         self.port: int = port
+        self.startup_timeout: Optional[float] = startup_timeout
+        self.client_launcher: str = client_launcher
         self.server_is_ready: bool = False
+        self.client_processes: List[BaseProcess] = []
         self.max_client_connections: int = 100
 
         # EnvironmentManager variables
@@ -86,6 +150,8 @@ class BaseEnvironmentConfig:
         self.load_samples: bool = load_samples
         self.only_first_epoch: bool = only_first_epoch
         self.always_produce: bool = always_produce
+        self.prefetch_batches: int = prefetch_batches
+        self.write_buffer_size: int = write_buffer_size
         self.env_kwargs: Dict[str, Any] = {} if env_kwargs is None else env_kwargs
 
         # Visualizer variables
@@ -111,49 +177,129 @@ class BaseEnvironmentConfig:
                              nb_client=self.number_of_thread,
                              max_client_count=self.max_client_connections,
                              batch_size=batch_size,
+                             requests_per_client=self.requests_per_client,
+                             write_buffer_size=self.write_buffer_size,
+                             prediction_batch_size=self.prediction_batch_size,
+                             prediction_window=self.prediction_window,
                              manager=environment_manager)
-        server_thread = Thread(target=self.start_server, args=(server, visualization_db))
+        # The readiness of the server is notified through a Future, which also carries the errors of the startup
+        ready = Future()
+        server_thread = Thread(target=self.start_server, args=(server, visualization_db, ready), daemon=True)
         server_thread.start()
 
         # Create clients
+        if self.client_launcher == 'forkserver':
+            # Modules are imported once in the forkserver, then shared by every forked client
+            preload = [launch_client.__module__]
+            if self.environment_class.__module__ != '__main__':
+                preload.append(self.environment_class.__module__)
+            get_context('forkserver').set_forkserver_preload(preload)
         client_threads = []
         for i in range(self.number_of_thread):
-            client_thread = Thread(target=self.start_client, args=(i + 1,))
+            client_thread = Thread(target=self.start_client, args=(i + 1, ready), daemon=True)
             client_threads.append(client_thread)
         for client in client_threads:
             client.start()
 
         # Return server to manager when it is ready
-        while not self.server_is_ready:
-            pass
+        try:
+            ready.result(timeout=self.startup_timeout)
+        except FutureTimeoutError:
+            connected = sorted([client_id for client_id, _ in server.clients])
+            missing = [idx for idx in range(1, self.number_of_thread + 1) if idx not in connected]
+            raise TimeoutError(f"[{self.name}] The TcpIpServer was not ready after {self.startup_timeout}s. "
+                               f"Connected clients: {connected}, missing clients: {missing}.")
         return server
 
     def start_server(self,
                      server: TcpIpServer,
-                     visualization_db: Optional[Tuple[str, str]] = None) -> None:
+                     visualization_db: Optional[Tuple[str, str]] = None,
+                     ready: Optional[Future] = None) -> None:
         """
         Start TcpIpServer.
 
         :param server: TcpIpServer.
         :param visualization_db: Path to the visualization Database to connect to.
+        :param ready: Future to notify when the TcpIpServer is ready.
         """
 
-        server.connect()
-        server.initialize(visualization_db=visualization_db,
-                          env_kwargs=self.env_kwargs)
+        try:
+            server.connect()
+            server.initialize(visualization_db=visualization_db,
+                              env_kwargs=self.env_kwargs)
+        except BaseException as error:
+            self.__notify(ready, error=error)
+            raise
         self.server_is_ready = True
+        self.__notify(ready)
 
     def start_client(self,
-                     idx: int = 1) -> None:
+                     idx: int = 1,
+                     ready: Optional[Future] = None) -> None:
         """
-        Run a subprocess to start a TcpIpClient.
+        Run a subprocess or a forked process to start a TcpIpClient.
 
         :param idx: Index of client.
+        :param ready: Future to notify if the TcpIpClient fails.
+        """
+
+        # Fork a process from the forkserver
+        if self.client_launcher == 'forkserver':
+            module_name = self.environment_class.__module__
+            process = get_context('forkserver').Process(target=launch_client,
+                                                        args=(self.environment_file, self.environment_class.__name__,
+                                                              self.ip_address, self.port, idx,
+                                                              self.number_of_thread,
+                                                              None if module_name == '__main__' else module_name))
+            self.client_processes.append(process)
+            process.start()
+            process.join()
+            exit_code = process.exitcode
+
+        # Run the launcher script in a new interpreter
+        else:
+            script = join(dirname(modules[BaseEnvironment.__module__].__file__), 'launcherBaseEnvironment.py')
+            exit_code = run([executable, script, self.environment_file, self.environment_class.__name__,
+                             self.ip_address, str(self.port), str(idx), str(self.number_of_thread)]).returncode
+
+        # A Client that exits with an error before the server is ready would make it wait forever
+        if exit_code != 0:
+            self.__notify(ready, error=RuntimeError(f"[{self.name}] Client n°{idx} exited with code {exit_code}."))
+
+    def close_clients(self,
+                      timeout: float = 10.) -> None:
+        """
+        Wait for the processes of the TcpIpClients to exit, terminate those that are still running after the timeout.
+
+        :param timeout: Maximum time in seconds to wait for each process.
+        """
+
+        for process in self.client_processes:
+            process.join(timeout=timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self.client_processes = []
+
+    @staticmethod
+    def __notify(ready: Optional[Future],
+                 error: Optional[BaseException] = None) -> None:
         """
+        Notify the readiness of the TcpIpServer or the failure of the startup if it is not already done.
 
-        script = join(dirname(modules[BaseEnvironment.__module__].__file__), 'launcherBaseEnvironment.py')
-        run([executable, script, self.environment_file, self.environment_class.__name__,
-             self.ip_address, str(self.port), str(idx), str(self.number_of_thread)])
+        :param ready: Future to notify.
+        :param error: Error that occurred during the startup.
+        """
+
+        if ready is None:
+            return
+        try:
+            if error is None:
+                ready.set_result(True)
+            else:
+                ready.set_exception(error)
+        except InvalidStateError:
+            pass
 
     def create_environment(self) -> BaseEnvironment:
         """
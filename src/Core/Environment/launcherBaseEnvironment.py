@@ -1,31 +1,62 @@
+from typing import Optional
 from os import sep
 from os.path import dirname
 from sys import argv, path
+from importlib import import_module
 
-from DeepPhysX.Core.Environment.BaseEnvironment import BaseEnvironment as Environment
 from DeepPhysX.Core.AsyncSocket.TcpIpClient import TcpIpClient
 
-if __name__ == '__main__':
 
-    # Check script call
-    if len(argv) != 7:
-        print(f"Usage: python3 {argv[0]} <file_path> <environment_class> <ip_address> <port> <instance_id> "
-              f"<max_instance_count>")
-        exit(1)
+def launch_client(file_path: str,
+                  environment_class: str,
+                  ip_address: str,
+                  port: int,
+                  instance_id: int,
+                  instance_nb: int,
+                  module_name: Optional[str] = None) -> None:
+    """
+    Create, init and run a TcpIpClient with its Environment.
+    Used by the launcher script and as the target of processes started from a forkserver.
+
+    :param file_path: Path to the file of the Environment class.
+    :param environment_class: Name of the Environment class.
+    :param ip_address: IP address of the TcpIpServer.
+    :param port: Port number of the TcpIpServer.
+    :param instance_id: Index of this instance.
+    :param instance_nb: Number of simultaneously launched instances.
+    :param module_name: Qualified name of the module of the Environment class (imported from its file if None).
+    """
 
-    # Import environment_class
-    path.append(dirname(argv[1]))
-    module_name = argv[1].split(sep)[-1][:-3]
-    exec(f"from {module_name} import {argv[2]} as Environment")
+    # Import environment_class, by its qualified name to reuse the module preloaded by the forkserver
+    if module_name is None:
+        path.append(dirname(file_path))
+        module_name = file_path.split(sep)[-1][:-3]
+    environment = getattr(import_module(module_name), environment_class)
 
     # Create, init and run Tcp-Ip environment
-    client = TcpIpClient(environment=Environment,
-                         ip_address=argv[3],
-                         port=int(argv[4]),
-                         instance_id=int(argv[5]),
-                         instance_nb=int(argv[6]))
+    client = TcpIpClient(environment=environment,
+                         ip_address=ip_address,
+                         port=port,
+                         instance_id=instance_id,
+                         instance_nb=instance_nb)
     client.initialize()
     client.launch()
 
     # Client is closed at this point
-    print(f"[launcherBaseEnvironment] Shutting down client {argv[5]}")
+    print(f"[launcherBaseEnvironment] Shutting down client {instance_id}")
+
+
+if __name__ == '__main__':
+
+    # Check script call
+    if len(argv) != 7:
+        print(f"Usage: python3 {argv[0]} <file_path> <environment_class> <ip_address> <port> <instance_id> "
+              f"<max_instance_count>")
+        exit(1)
+
+    launch_client(file_path=argv[1],
+                  environment_class=argv[2],
+                  ip_address=argv[3],
+                  port=int(argv[4]),
+                  instance_id=int(argv[5]),
+                  instance_nb=int(argv[6]))
@@ -1,10 +1,13 @@
-from typing import Any, Optional, Dict, List
+from typing import Any, Optional, Dict, List, Tuple, Union
+from threading import Thread, Event, Lock, Semaphore
+from queue import Queue
 
 from DeepPhysX.Core.Manager.DatabaseManager import DatabaseManager
 from DeepPhysX.Core.Manager.EnvironmentManager import EnvironmentManager
 from DeepPhysX.Core.Environment.BaseEnvironmentConfig import BaseEnvironmentConfig
 from DeepPhysX.Core.Database.BaseDatabaseConfig import BaseDatabaseConfig
 from DeepPhysX.Core.Database.DatabaseHandler import DatabaseHandler
+from DeepPhysX.Core.Database.BatchLoader import BatchLoader
 
 
 class DataManager:
@@ -37,13 +40,23 @@ class DataManager:
         self.database_manager: Optional[DatabaseManager] = None
         self.environment_manager: Optional[EnvironmentManager] = None
 
-        # Create a DatabaseManager
+        # Create a DatabaseManager (each TcpIpClient writes in its own partition if partitions are sharded)
+        nb_shards = 1
+        if database_config is not None and database_config.shard_partitions and environment_config is not None \
+                and environment_config.as_tcp_ip_client and pipeline.type != 'prediction':
+            nb_shards = environment_config.number_of_thread
+        # The indices of the buffered samples are deduced from the size of the partition, which can not be shared
+        if environment_config is not None and environment_config.as_tcp_ip_client and pipeline.type != 'prediction' \
+                and environment_config.write_buffer_size > 0 and nb_shards < environment_config.number_of_thread:
+            raise ValueError(f"[{self.name}] Buffering the samples of several TcpIpClients ('write_buffer_size' > 0) "
+                             f"requires 'shard_partitions' in the database_config.")
         self.database_manager = DatabaseManager(database_config=database_config,
                                                 data_manager=self,
                                                 pipeline=pipeline.type,
                                                 session=session,
                                                 new_session=new_session,
-                                                produce_data=produce_data)
+                                                produce_data=produce_data,
+                                                nb_shards=nb_shards)
 
         # Create an EnvironmentManager if required
         if environment_config is not None:
@@ -58,6 +71,22 @@ class DataManager:
         self.produce_data = produce_data
         self.batch_size = batch_size
         self.data_lines: List[List[int]] = []
+        self.data_batch: Optional[Dict[str, Dict[str, Any]]] = None
+
+        # Prefetch variables
+        self.prefetch_batches: int = 0 if environment_config is None else environment_config.prefetch_batches
+        self.prefetch_queue: Queue = Queue()
+        self.prefetch_slots: Semaphore = Semaphore(self.prefetch_batches)
+        self.prefetch_thread: Optional[Thread] = None
+        self.prefetch_stop: Event = Event()
+        # Predictions can be requested by Environments while the Network is optimized
+        self.network_lock: Lock = Lock()
+
+        # Loader variables
+        self.loader_workers: int = 0 if database_config is None else database_config.loader_workers
+        self.loader: Optional[BatchLoader] = None
+        self.loader_pending: List[Any] = []
+        self.loader_indexing: Optional[Tuple[str, int]] = None
 
     @property
     def nb_environment(self) -> Optional[int]:
@@ -99,10 +128,13 @@ class DataManager:
         :param load_samples: If True, trigger a sample loading from the Database.
         """
 
+        # Batches are only read in advance by the loader
+        self.data_batch = None
+
         # Data generation case
         if self.pipeline.type == 'data_generation':
-            self.environment_manager.get_data(animate=animate)
-            self.database_manager.add_data()
+            self.data_lines = self.environment_manager.get_data(animate=animate)
+            self.database_manager.add_data(self.data_lines)
 
         # Training case
         elif self.pipeline.type == 'training':
@@ -110,12 +142,25 @@ class DataManager:
             # Get data from Environment(s) if used and if the data should be created at this epoch
             if self.environment_manager is not None and self.produce_data and \
                     (epoch == 0 or self.environment_manager.always_produce):
-                self.data_lines = self.environment_manager.get_data(animate=animate)
+                # Get the next batch from the prefetch queue while the next ones are produced
+                if self.prefetch_batches > 0 and self.database_manager.mode == 'training':
+                    self.__start_prefetch(animate=animate)
+                    self.data_lines = self.__get_prefetched_batch()
+                else:
+                    self.data_lines = self.environment_manager.get_data(animate=animate)
                 self.database_manager.add_data(self.data_lines)
 
             # Get data from Dataset
             else:
-                self.data_lines = self.database_manager.get_data(batch_size=self.batch_size)
+                # The batches produced in advance are no longer used
+                self.__stop_prefetch()
+                # Read the next batches in advance if the Environments are no longer used
+                if self.loader_workers > 0 and self.environment_manager is None and \
+                        self.database_manager.mode == 'training':
+                    self.__start_loader()
+                    self.data_lines, self.data_batch = self.loader.get()
+                else:
+                    self.data_lines = self.database_manager.get_data(batch_size=self.batch_size)
                 # Dispatch a batch to clients
                 if self.environment_manager is not None:
                     if self.environment_manager.load_samples and \
@@ -124,8 +169,7 @@ class DataManager:
                                                                 animate=animate)
                     # Environment is no longer used
                     else:
-                        self.environment_manager.close()
-                        self.environment_manager = None
+                        self.__close_environment()
 
         # Prediction pipeline
         else:
@@ -149,6 +193,116 @@ class DataManager:
                     if self.produce_data:
                         self.database_manager.add_data(self.data_lines)
 
+    ##########################################################################################
+    ##########################################################################################
+    #                                  Prefetch management                                   #
+    ##########################################################################################
+    ##########################################################################################
+
+    def __start_prefetch(self,
+                         animate: bool = True) -> None:
+        """
+        Launch the production of the next batches in a background thread if it is not running.
+
+        :param animate: Allow EnvironmentManager to trigger a step itself in order to generate a new sample.
+        """
+
+        if self.prefetch_thread is None:
+            # The samples produced in advance must not be counted in the statistics before being added
+            self.database_manager.freeze_normalization()
+            self.prefetch_stop.clear()
+            self.prefetch_slots = Semaphore(self.prefetch_batches)
+            self.prefetch_thread = Thread(target=self.__prefetch, args=(animate,), daemon=True)
+            self.prefetch_thread.start()
+
+    def __prefetch(self,
+                   animate: bool = True) -> None:
+        """
+        Produce batches with the EnvironmentManager until the prefetch is stopped. A batch is only produced when one of
+        the 'prefetch_batches' slots is free, a slot is freed when a batch is used.
+
+        :param animate: Allow EnvironmentManager to trigger a step itself in order to generate a new sample.
+        """
+
+        while True:
+            # Wait for a free slot, the stop event is checked before producing the next batch
+            while not self.prefetch_slots.acquire(timeout=0.1):
+                if self.prefetch_stop.is_set():
+                    return
+            if self.prefetch_stop.is_set():
+                return
+            try:
+                self.prefetch_queue.put(self.environment_manager.get_data(animate=animate))
+            except BaseException as error:
+                self.prefetch_queue.put(error)
+                return
+
+    def __get_prefetched_batch(self) -> List[List[int]]:
+        """
+        Get the next batch produced by the prefetch thread.
+
+        :return: Batch of indices of samples.
+        """
+
+        data_lines: Union[List[List[int]], BaseException] = self.prefetch_queue.get()
+        self.prefetch_slots.release()
+        if isinstance(data_lines, BaseException):
+            self.prefetch_thread.join()
+            self.prefetch_thread = None
+            raise data_lines
+        return data_lines
+
+    def __stop_prefetch(self) -> None:
+        """
+        Stop the prefetch thread. The batches already produced are added to the Database.
+        """
+
+        if self.prefetch_thread is None:
+            return
+        # The batch being produced is completed, then the thread stops
+        self.prefetch_stop.set()
+        self.prefetch_thread.join()
+        self.prefetch_thread = None
+        while not self.prefetch_queue.empty():
+            data_lines = self.prefetch_queue.get()
+            if not isinstance(data_lines, BaseException):
+                self.database_manager.add_data(data_lines)
+
+    ##########################################################################################
+    ##########################################################################################
+    #                                   Loader management                                    #
+    ##########################################################################################
+    ##########################################################################################
+
+    def __start_loader(self) -> None:
+        """
+        Launch the loader workers if they are not running. The batches read before the last stop are used first if they
+        were drawn from the current indexing of the samples, otherwise they are dropped.
+        """
+
+        if self.loader is None:
+            if self.loader_indexing != (self.database_manager.mode, self.database_manager.indexing_id):
+                self.loader_pending = []
+            network_manager = self.pipeline.network_manager
+            self.loader = BatchLoader(get_indices=lambda: self.database_manager.get_data(batch_size=self.batch_size),
+                                      load_batch=lambda data_lines: network_manager.load_batch(
+                                          data_lines=data_lines, normalization=self.normalization),
+                                      nb_workers=self.loader_workers,
+                                      queue_size=2 * self.loader_workers,
+                                      pending=self.loader_pending)
+            self.loader_pending = []
+
+    def __stop_loader(self) -> None:
+        """
+        Stop the loader workers. The batches already read are kept for the next start with the indexing they were
+        drawn from.
+        """
+
+        if self.loader is not None:
+            self.loader_pending = self.loader.close()
+            self.loader_indexing = (self.database_manager.mode, self.database_manager.indexing_id)
+            self.loader = None
+
     def load_sample(self) -> List[int]:
         """
         Load a sample from the Database.
@@ -168,22 +322,56 @@ class DataManager:
         # Get a prediction
         if self.pipeline is None:
             raise ValueError("Cannot request prediction if Manager (and then NetworkManager) does not exist.")
-        self.pipeline.network_manager.compute_online_prediction(instance_id=instance_id,
-                                                                normalization=self.normalization)
+        with self.network_lock:
+            self.pipeline.network_manager.compute_online_prediction(instance_id=instance_id,
+                                                                    normalization=self.normalization)
+
+    def get_predictions(self,
+                        instance_ids: List[int]) -> None:
+        """
+        Get a single Network prediction for several Environment instances.
+
+        :param instance_ids: Indices of the Environment instances.
+        """
+
+        # Get the predictions
+        if self.pipeline is None:
+            raise ValueError("Cannot request prediction if Manager (and then NetworkManager) does not exist.")
+        with self.network_lock:
+            self.pipeline.network_manager.compute_online_predictions(instance_ids=instance_ids,
+                                                                     normalization=self.normalization)
 
     def set_eval(self):
+        self.__stop_prefetch()
+        self.__stop_loader()
         self.database_manager.set_eval()
 
     def set_train(self):
+        self.__stop_prefetch()
+        self.__stop_loader()
         self.database_manager.set_train()
 
+    def __close_environment(self) -> None:
+        """
+        Close the EnvironmentManager. The samples still buffered by the Environment(s) are added to the Database.
+        """
+
+        if self.produce_data:
+            data_lines = self.environment_manager.flush_data()
+            if len(data_lines) > 0:
+                self.database_manager.add_data(data_lines)
+        self.environment_manager.close()
+        self.environment_manager = None
+
     def close(self) -> None:
         """
         Launch the closing procedure of the DataManager.
         """
 
+        self.__stop_prefetch()
+        self.__stop_loader()
         if self.environment_manager is not None:
-            self.environment_manager.close()
+            self.__close_environment()
         if self.database_manager is not None:
             self.database_manager.close()
 
@@ -1,17 +1,25 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, TextIO, Tuple
 from os.path import isfile, isdir, join
-from os import listdir, symlink, sep, remove, rename
+from os import listdir, symlink, sep, remove, rename, replace, fsync, getpid
+from threading import Thread
 from json import dump as json_dump
 from json import load as json_load
-from numpy import arange, ndarray, array, abs, mean, sqrt, empty, concatenate
-from numpy.random import shuffle
+from json import dumps as json_dumps
+from json import loads as json_loads
+from numpy import arange, ndarray, array, sqrt, empty, concatenate, where, cumsum, minimum, searchsorted, stack, \
+    unique
+from numpy.random import permutation, randint, default_rng
 
 from SSD.Core.Storage.Database import Database
 
 from DeepPhysX.Core.Database.BaseDatabaseConfig import BaseDatabaseConfig
 from DeepPhysX.Core.Database.DatabaseHandler import DatabaseHandler
+from DeepPhysX.Core.Database.MemmapPartition import MemmapPartition
+from DeepPhysX.Core.Database.SharedExchange import SharedExchange
 from DeepPhysX.Core.Utils.path import create_dir, copy_dir, get_first_caller
 from DeepPhysX.Core.Utils.jsonUtils import CustomJSONEncoder
+from DeepPhysX.Core.Utils.statisticsUtils import compute_statistics, merge_statistics, statistics_to_list, \
+    scan_partitions
 
 
 class DatabaseManager:
@@ -22,7 +30,8 @@ class DatabaseManager:
                  pipeline: str = '',
                  session: str = 'sessions/default',
                  new_session: bool = True,
-                 produce_data: bool = True):
+                 produce_data: bool = True,
+                 nb_shards: int = 1):
         """
         DatabaseManager handle all operations with input / output files. Allows saving and read tensors from files.
 
@@ -32,6 +41,7 @@ class DatabaseManager:
         :param session: Path to the session repository.
         :param new_session: If True, the session is done in a new repository.
         :param produce_data: If True, this session will store data in the Database.
+        :param nb_shards: Number of partitions written simultaneously, one for each writer.
         """
 
         self.name: str = self.__class__.__name__
@@ -46,10 +56,16 @@ class DatabaseManager:
         # Dataset parameters
         self.max_file_size: int = database_config.max_file_size
         self.shuffle: bool = database_config.shuffle
+        self.shuffle_block_size: Optional[int] = database_config.shuffle_block_size
         self.produce_data = produce_data
         self.normalize: bool = database_config.normalize
-        self.total_nb_sample: int = 0
+        self.normalize_per_component: bool = database_config.normalize_per_component
         self.recompute_normalization: bool = database_config.recompute_normalization
+        self.normalization_chunk_size: int = database_config.normalization_chunk_size
+        self.normalization_workers: int = database_config.normalization_workers
+        self.__normalization: Optional[Dict[str, List[ndarray]]] = None
+        self.__normalization_source: Optional[Dict[str, List[Any]]] = None
+        self.normalization_frozen: bool = False
 
         # Dataset modes
         self.modes: List[str] = ['training', 'validation', 'prediction']
@@ -67,10 +83,32 @@ class DatabaseManager:
         self.partition_index: Dict[str, int] = {mode: 0 for mode in self.modes}
         self.partition_names: Dict[str, List[str]] = {mode: [] for mode in self.modes}
         self.partitions: Dict[str, List[Database]] = {mode: [] for mode in self.modes}
-
-        # Dataset indexing
-        self.sample_indices: ndarray = empty((0, 2), dtype=int)
+        self.nb_shards: int = nb_shards
+        self.backend: str = database_config.backend
+        self.memmap_partitions: List[Optional[MemmapPartition]] = []
+
+        # Partitions size tracking (the size is estimated from the number of samples between two measures)
+        self.sample_size: Optional[float] = None
+        self.next_size_check: int = 0
+        self.next_partitions: List[str] = []
+        self.next_partitions_thread: Optional[Thread] = None
+
+        # Dataset indexing (samples are identified by a flat index mapped to [partition_id, line_id])
+        self.partition_offsets: ndarray = array([0])
+        self.nb_indexed_samples: int = 0
+        self.sample_order: Optional[ndarray] = None
+        self.block_order: Optional[ndarray] = None
+        self.block_ends: Optional[ndarray] = None
+        self.shuffle_seed: int = 0
+        self.__block_permutation: Tuple[int, Optional[ndarray]] = (-1, None)
         self.sample_id: int = 0
+        # Samples added after the indexing are appended to it as [partition_id, line_id]
+        self.indexed_counts: List[int] = []
+        self.extended_samples: ndarray = empty((0, 2), dtype=int)
+        # Each indexing is identified, so that the batches drawn from a previous indexing can be recognized
+        self.indexing_id: int = 0
+        # Indexing of the other modes, restored when the mode changes
+        self.mode_indexing: Dict[str, Dict[str, Any]] = {}
         self.first_add = True
 
         # Dataset json file
@@ -78,9 +116,15 @@ class DatabaseManager:
                                                         'nb_samples': {mode: [] for mode in self.modes},
                                                         'architecture': {},
                                                         'data_shape': {},
-                                                        'normalization': {}}
+                                                        'normalization': {},
+                                                        'normalization_stats': {}}
         self.json_content: Dict[str, Dict[str, Any]] = self.json_default.copy()
 
+        # Dataset journal file (updates recorded between two compactions of the json file)
+        self.journal_checkpoint: int = database_config.journal_checkpoint
+        self.journal_file: Optional[TextIO] = None
+        self.nb_journal_records: int = 0
+
         # DataGeneration case
         if self.pipeline == 'data_generation':
 
@@ -89,7 +133,7 @@ class DatabaseManager:
                 # Generate data from scratch --> create a new directory
                 if database_config.existing_dir is None:
                     create_dir(session_dir=session, session_name='dataset')
-                    self.create_partition()
+                    self.create_partitions()
                 # Complete a Database in a new session --> copy and load the existing directory
                 else:
                     copy_dir(src_dir=database_config.existing_dir, dest_dir=session,
@@ -109,7 +153,7 @@ class DatabaseManager:
                     # Generate data from scratch --> create a new directory
                     if database_config.existing_dir is None:
                         create_dir(session_dir=session, session_name='dataset')
-                        self.create_partition()
+                        self.create_partitions()
                     # Complete a Database in a new session --> copy and load the existing directory
                     else:
                         copy_dir(src_dir=database_config.existing_dir, dest_dir=session,
@@ -138,6 +182,10 @@ class DatabaseManager:
         self.exchange = Database(database_dir=self.database_dir,
                                  database_name='Exchange').new(remove_existing=True)
         self.exchange.create_table(table_name='Exchange')
+        # The lines of the exchange Table can be stored in shared memory
+        self.shared_exchange: Optional[SharedExchange] = None
+        if database_config.exchange_backend == 'shared_memory':
+            self.shared_exchange = SharedExchange(name=f'dpx_{getpid()}')
 
     ##########################################################################################
     ##########################################################################################
@@ -164,19 +212,21 @@ class DatabaseManager:
             json_found = True
             with open(join(self.database_dir, 'dataset.json')) as json_file:
                 self.json_content = json_load(json_file)
+            # Files written before the normalization accumulators were stored
+            self.json_content.setdefault('normalization_stats', {})
+            # Apply the updates recorded after the last compaction
+            if self.replay_journal():
+                self.update_json()
 
         # 3. Update json file if not found
         if not json_found or self.json_content == self.json_default:
             self.search_partitions_info()
             self.update_json()
-        if self.recompute_normalization or (
-                self.normalize and self.json_content['normalization'] == self.json_default['normalization']):
-            self.json_content['normalization'] = self.compute_normalization()
-            self.update_json()
 
         # 4. Load partitions for each mode
         self.partition_names = self.json_content['partitions']
-        self.partition_index = {mode: len(self.partition_names[mode]) for mode in self.modes}
+        self.partition_index = {mode: max([int(name.split('_')[-1]) + 1 for name in self.partition_names[mode]
+                                           if name.split('_')[-1].isdigit()], default=0) for mode in self.modes}
         if rename_partitions:
             for mode in self.modes:
                 current_name = self.partition_template[mode].split(f'_{mode}_')[0]
@@ -192,59 +242,189 @@ class DatabaseManager:
                 db = Database(database_dir=self.database_dir,
                               database_name=name).load()
                 self.partitions[mode].append(db)
-        if len(self.partitions[self.mode]) == 0:
-            self.create_partition()
-        elif self.max_file_size is not None and self.partitions[self.mode][-1].memory_size > self.max_file_size \
-                and self.produce_data:
+
+        # 6. Compute the normalization coefficients if required (the training partitions must be loaded)
+        if self.recompute_normalization or (self.normalize and not self.check_normalization()):
+            self.json_content['normalization'] = self.compute_normalization()
+            self.update_json()
+        if len(self.partitions[self.mode]) < self.nb_shards:
+            self.create_partitions()
+        elif self.max_file_size is not None and self.produce_data:
+            self.check_partitions_size()
+
+        # 7. Map the partitions to memory-mapped files if they are only read
+        if self.backend == 'mmap' and not self.produce_data:
+            self.map_partitions()
+
+    def create_partitions(self) -> None:
+        """
+        Create a new partition of the Database for each writer.
+        """
+
+        # 1. Create the partitions of every writer
+        for _ in range(self.nb_shards):
             self.create_partition()
 
-        # 6. Index partitions
-        self.index_samples()
+        # 2. Update the partitions in handlers at once, so that writers never get a part of the new shards
+        for handler in self.database_handlers:
+            handler.update_list_partitions(self.partitions[self.mode][-self.nb_shards:])
+        self.json_content['partitions'] = self.partition_names
+        self.get_nb_samples()
+        self.update_json()
 
     def create_partition(self) -> None:
         """
-        Create a new partition of the Database.
+        Create a new partition of the Database. The handlers are updated by 'create_partitions'.
         """
 
         # 1. Define the partition name
         partition_name = self.partition_template[self.mode].format(self.partition_index[self.mode])
         self.partition_names[self.mode].append(partition_name)
 
-        # 2. Create the Database partition
+        # 2. Create the Database partition, or load it if it was prepared
+        if self.next_partitions_thread is not None:
+            self.next_partitions_thread.join()
+            self.next_partitions_thread = None
+        if partition_name in self.next_partitions:
+            self.next_partitions.remove(partition_name)
+            db = Database(database_dir=self.database_dir,
+                          database_name=partition_name).load()
+        else:
+            db = self.new_partition(partition_name=partition_name,
+                                    fields=self.get_partition_fields())
+        self.partitions[self.mode].append(db)
+        self.partition_index[self.mode] += 1
+
+    def get_partition_fields(self) -> Optional[Dict[str, List[Tuple[str, type]]]]:
+        """
+        Get the Fields of each Table of the first partition of the current mode (None if there is no partition yet).
+        """
+
+        if len(self.partitions[self.mode]) == 0:
+            return None
+        fields = {}
+        types = {'INT': int, 'FLOAT': float, 'STR': str, 'BOOL': bool, 'NUMPY': ndarray}
+        for table_name in self.partitions[self.mode][0].get_tables():
+            fields[table_name] = []
+            F = self.partitions[self.mode][0].get_fields(table_name=table_name,
+                                                         only_names=False)
+            for field in [f for f in F if f not in ['id', '_dt_']]:
+                fields[table_name].append((field, types[F[field].field_type]))
+        return fields
+
+    def new_partition(self,
+                      partition_name: str,
+                      fields: Optional[Dict[str, List[Tuple[str, type]]]] = None) -> Database:
+        """
+        Create a new Database partition file with the Tables and Fields of the Database.
+
+        :param partition_name: Name of the partition.
+        :param fields: Fields of each Table (the default Fields of a first partition if None).
+        """
+
+        # 1. Create the Database partition
         db = Database(database_dir=self.database_dir,
                       database_name=partition_name).new()
         db.create_table(table_name='Training')
         db.create_table(table_name='Additional')
-        self.partitions[self.mode].append(db)
 
-        # 3. If the partition is an additional one, create all fields
-        if self.partition_index[self.mode] > 0:
-            # Get fields
-            fields = {}
-            types = {'INT': int, 'FLOAT': float, 'STR': str, 'BOOL': bool, 'NUMPY': ndarray}
-            for table_name in self.partitions[self.mode][0].get_tables():
-                fields[table_name] = []
-                F = self.partitions[self.mode][0].get_fields(table_name=table_name,
-                                                             only_names=False)
-                for field in [f for f in F if f not in ['id', '_dt_']]:
-                    fields[table_name].append((field, types[F[field].field_type]))
-            # Re-create them
+        # 2. If the partition is an additional one, create all fields
+        if fields is not None:
             for table_name in fields.keys():
-                self.partitions[self.mode][-1].create_fields(table_name=table_name,
-                                                             fields=fields[table_name])
+                db.create_fields(table_name=table_name,
+                                 fields=fields[table_name])
+        else:
+            db.create_fields(table_name='Training',
+                             fields=('env_id', int))
+            db.create_fields(table_name='Additional',
+                             fields=('env_id', int))
+
+        return db
+
+    def prepare_partitions(self) -> None:
+        """
+        Create the next partition of each writer in a background thread, before the current ones are full. The names
+        and the Fields of the partitions are defined when they are scheduled, the thread only writes the files.
+        """
+
+        def prepare(names: List[str],
+                    fields: Optional[Dict[str, List[Tuple[str, type]]]]):
+            for name in names:
+                # A partition that fails to be prepared is created when it is needed
+                try:
+                    self.new_partition(partition_name=name,
+                                       fields=fields).close()
+                except Exception:
+                    if isfile(path := join(self.database_dir, f'{name}.db')):
+                        remove(path)
+                    return
+                self.next_partitions.append(name)
+
+        next_names = [self.partition_template[self.mode].format(index)
+                      for index in range(self.partition_index[self.mode],
+                                         self.partition_index[self.mode] + self.nb_shards)]
+        if self.next_partitions_thread is not None or all(name in self.next_partitions for name in next_names):
+            return
+        self.next_partitions_thread = Thread(target=prepare, args=(next_names, self.get_partition_fields()),
+                                             daemon=True)
+        self.next_partitions_thread.start()
+
+    def discard_prepared_partitions(self) -> None:
+        """
+        Wait for the partitions being prepared, then erase the prepared partitions that were not used.
+        """
+
+        if self.next_partitions_thread is not None:
+            self.next_partitions_thread.join()
+            self.next_partitions_thread = None
+        for name in self.next_partitions:
+            if isfile(path := join(self.database_dir, f'{name}.db')):
+                remove(path)
+        self.next_partitions = []
+
+    def check_partitions_size(self) -> None:
+        """
+        Create new partitions if the current ones exceed the maximum size. The size of the partitions is only measured
+        when their estimated size (from the number of samples) reaches half of the remaining space since the last
+        measure. The next partitions are prepared once the current ones are half full.
+        """
+
+        # 1. Estimate the size of the partitions from their number of samples
+        nb_samples = max(self.json_content['nb_samples'][self.mode][-self.nb_shards:], default=0)
+        if nb_samples < self.next_size_check:
+            return
+
+        # 2. Measure the size of the partitions and update the size of a sample
+        size = max(partition.memory_size for partition in self.get_shards())
+        if nb_samples > 0:
+            self.sample_size = size / nb_samples
+
+        # 3. Create the new partitions if the current ones are full, prepare them if they are half full
+        if size > self.max_file_size:
+            self.create_partitions()
+            nb_samples, size = 0, 0
+        elif size > self.max_file_size / 2:
+            self.prepare_partitions()
+
+        # 4. Define when the size should be measured next
+        if self.sample_size is None or self.sample_size == 0:
+            self.next_size_check = nb_samples + 1
         else:
-            self.partitions[self.mode][-1].create_fields(table_name='Training',
-                                                         fields=('env_id', int))
-            self.partitions[self.mode][-1].create_fields(table_name='Additional',
-                                                         fields=('env_id', int))
+            remaining_samples = int((self.max_file_size - size) / self.sample_size)
+            self.next_size_check = nb_samples + max(remaining_samples // 2, 1)
 
-        # 4. Update the partitions in handlers
-        for handler in self.database_handlers:
-            handler.update_list_partitions(self.partitions[self.mode][-1])
-        self.partition_index[self.mode] += 1
-        self.json_content['partitions'] = self.partition_names
-        self.get_nb_samples()
-        self.update_json()
+    def map_partitions(self) -> None:
+        """
+        Map the fixed-shape Fields of the Training Table of each partition of the current mode to memory-mapped files.
+        """
+
+        fields = {}
+        for field, shape in self.json_content['data_shape'].items():
+            table_name, field_name = field.split('.')
+            if table_name == 'Training':
+                fields[field_name] = tuple(shape)
+        self.memmap_partitions = [MemmapPartition(partition=partition,
+                                                  fields=fields) for partition in self.partitions[self.mode]]
 
     def get_partition_objects(self) -> List[Database]:
         """
@@ -260,21 +440,30 @@ class DatabaseManager:
 
         return [db.get_path() for db in self.partitions[self.mode]]
 
+    def get_shards(self) -> List[Database]:
+        """
+        Get the partitions of the Database currently written for the current mode, one for each writer.
+        """
+
+        return self.partitions[self.mode][-self.nb_shards:]
+
     def remove_empty_partitions(self):
         """
         Remove every empty partitions of the Database.
         """
 
         for mode in self.modes:
-            # Check if the last partition for the mode is empty
-            if len(self.partitions[mode]) > 0 and self.partitions[mode][-1].nb_lines(table_name='Training') == 0:
+            # Several shards can be empty, at any position in the partitions of the mode
+            empty_partitions = [partition_id for partition_id, partition in enumerate(self.partitions[mode])
+                                if partition.nb_lines(table_name='Training') == 0]
+            for partition_id in reversed(empty_partitions):
                 # Erase partition file
-                path = self.partitions[mode].pop(-1).get_path()
+                path = self.partitions[mode].pop(partition_id).get_path()
                 remove(join(path[0], f'{path[1]}.db'))
                 # Remove from information
-                self.partition_names[mode].pop(-1)
-                self.partition_index[mode] -= 1
-                self.json_content['nb_samples'][mode].pop(-1)
+                self.partition_names[mode].pop(partition_id)
+                self.json_content['nb_samples'][mode].pop(partition_id)
+            if len(empty_partitions) > 0:
                 self.json_content['partitions'] = self.partition_names
                 self.update_json()
 
@@ -285,8 +474,18 @@ class DatabaseManager:
 
         :param mode: Name of the Database mode.
         """
+        # The partitions prepared for the previous mode are not used
+        self.discard_prepared_partitions()
+        # Each mode keeps its indexing, the samples of a new mode are indexed at the next batch
+        indexing = ['partition_offsets', 'nb_indexed_samples', 'sample_order', 'block_order', 'block_ends',
+                    'shuffle_seed', 'sample_id', 'indexed_counts', 'extended_samples', 'indexing_id']
+        self.mode_indexing[self.mode] = {attribute: getattr(self, attribute) for attribute in indexing}
         self.mode = mode
-        self.index_samples()
+        for attribute, value in self.mode_indexing.pop(mode, {'sample_id': 0, 'nb_indexed_samples': 0}).items():
+            setattr(self, attribute, value)
+        self.__block_permutation = (-1, None)
+        # The size of the partitions of the new mode is measured at the next batch
+        self.next_size_check = 0
 
     ##########################################################################################
     ##########################################################################################
@@ -378,20 +577,102 @@ class DatabaseManager:
         Get the number of sample in each partition.
         """
 
-        nb_samples = self.partitions[self.mode][-1].nb_lines(table_name='Training')
-        if len(self.json_content['nb_samples'][self.mode]) == self.partition_index[self.mode]:
-            self.json_content['nb_samples'][self.mode][-1] = nb_samples
-        else:
-            self.json_content['nb_samples'][self.mode].append(nb_samples)
+        # Only the partitions currently written can change
+        nb_partitions = len(self.partitions[self.mode])
+        for partition_id in range(max(nb_partitions - self.nb_shards, 0), nb_partitions):
+            nb_samples = self.partitions[self.mode][partition_id].nb_lines(table_name='Training')
+            if partition_id < len(self.json_content['nb_samples'][self.mode]):
+                self.json_content['nb_samples'][self.mode][partition_id] = nb_samples
+            else:
+                self.json_content['nb_samples'][self.mode].append(nb_samples)
+
+    def update_nb_samples(self,
+                          data_lines: List[List[int]]) -> List[int]:
+        """
+        Update the number of samples in each partition from the indices of the newly added lines, without querying the
+        partitions. The lines are appended, so the number of samples of a partition is its highest line index.
+
+        :param data_lines: Indices of the newly added lines.
+        :return: Indices of the updated partitions.
+        """
+
+        nb_samples = self.json_content['nb_samples'][self.mode]
+        nb_samples += [0] * (len(self.partitions[self.mode]) - len(nb_samples))
+        updated = set()
+        for partition_id, line_id in data_lines:
+            if line_id > nb_samples[partition_id]:
+                nb_samples[partition_id] = line_id
+                updated.add(partition_id)
+        return sorted(updated)
 
     def update_json(self) -> None:
         """
-        Update the JSON info file with the current Database information.
+        Update the JSON info file with the current Database information. The journal is compacted in the file.
         """
 
-        # Overwrite json file
-        with open(join(self.database_dir, 'dataset.json'), 'w') as json_file:
+        # Write a temporary file then replace the json file, so that an interrupted write never corrupts it
+        json_path = join(self.database_dir, 'dataset.json')
+        with open(f'{json_path}.tmp', 'w') as json_file:
             json_dump(self.json_content, json_file, indent=3, cls=CustomJSONEncoder)
+            json_file.flush()
+            fsync(json_file.fileno())
+        replace(f'{json_path}.tmp', json_path)
+
+        # The recorded updates are now in the json file
+        if self.journal_file is not None:
+            self.journal_file.close()
+            self.journal_file = None
+        if isfile(journal_path := join(self.database_dir, 'dataset.journal')):
+            remove(journal_path)
+        self.nb_journal_records = 0
+
+    def record_json(self,
+                    record: Dict[str, Any]) -> None:
+        """
+        Append an update of the JSON info file to the journal. The journal is compacted in the file every
+        'journal_checkpoint' records.
+
+        :param record: Updated values, 'nb_samples' for the current mode as {partition_id: nb_samples}.
+        """
+
+        if self.journal_file is None:
+            self.journal_file = open(join(self.database_dir, 'dataset.journal'), 'a')
+        self.journal_file.write(json_dumps({'mode': self.mode, **record}, separators=(',', ':')) + '\n')
+        self.journal_file.flush()
+        self.nb_journal_records += 1
+        if self.nb_journal_records >= self.journal_checkpoint:
+            self.update_json()
+
+    def replay_journal(self) -> bool:
+        """
+        Apply the updates recorded in the journal to the JSON info content. Records are absolute values, so a record
+        already compacted in the file can be applied again. The normalization is not recorded, it is cleared to be
+        computed again if training samples were recorded.
+
+        :return: True if some updates were applied.
+        """
+
+        if not isfile(journal_path := join(self.database_dir, 'dataset.journal')):
+            return False
+        nb_records = 0
+        with open(journal_path) as journal_file:
+            for line in journal_file:
+                # The last record may have been interrupted
+                try:
+                    record = json_loads(line)
+                except ValueError:
+                    break
+                nb_samples = self.json_content['nb_samples'][record['mode']]
+                for partition_id, nb_sample in sorted(record['nb_samples'].items(), key=lambda item: int(item[0])):
+                    if int(partition_id) < len(nb_samples):
+                        nb_samples[int(partition_id)] = nb_sample
+                    else:
+                        nb_samples.append(nb_sample)
+                if record['mode'] == 'training':
+                    self.json_content['normalization'] = {}
+                    self.json_content['normalization_stats'] = {}
+                nb_records += 1
+        return nb_records > 0
 
     ##########################################################################################
     ##########################################################################################
@@ -408,26 +689,97 @@ class DatabaseManager:
         """
 
         handler.init(storing_partitions=self.get_partition_objects(),
-                     exchange_db=self.exchange)
+                     exchange_db=self.exchange,
+                     nb_shards=self.nb_shards,
+                     memmap_partitions=self.memmap_partitions,
+                     shared_exchange=self.shared_exchange)
         self.database_handlers.append(handler)
 
     def index_samples(self) -> None:
         """
-        Create a new indexing list of samples. Samples are identified by [partition_id, line_id].
+        Create a new indexing of samples. Samples are identified by a flat index, the offset of each partition in the
+        flat indices allows to get the [partition_id, line_id] of a sample.
         """
 
-        self.sample_indices = empty((0, 2), dtype=int)
-        # Create the indices for each sample such as [partition_id, line_id]
-        for i, nb_sample in enumerate(self.json_content['nb_samples'][self.mode]):
-            partition_indices = empty((nb_sample, 2), dtype=int)
-            partition_indices[:, 0] = i
-            partition_indices[:, 1] = arange(1, nb_sample + 1)
-            self.sample_indices = concatenate((self.sample_indices, partition_indices))
+        # Compute the offset of each partition
+        self.indexing_id += 1
+        self.indexed_counts = list(self.json_content['nb_samples'][self.mode])
+        self.extended_samples = empty((0, 2), dtype=int)
+        self.partition_offsets = concatenate(([0], cumsum(self.indexed_counts, dtype=int)))
+        self.nb_indexed_samples = int(self.partition_offsets[-1])
         # Init current sample position
         self.sample_id = 0
-        # Shuffle the indices if required
+        # Shuffle the flat indices if required
+        if self.shuffle and self.shuffle_block_size is None:
+            self.sample_order = permutation(self.nb_indexed_samples)
+        # Shuffle blocks of consecutive flat indices, the indices of a block are shuffled when the block is reached
+        elif self.shuffle:
+            nb_blocks = -(-self.nb_indexed_samples // self.shuffle_block_size)
+            self.block_order = permutation(nb_blocks)
+            self.block_ends = cumsum(minimum(self.shuffle_block_size,
+                                             self.nb_indexed_samples - self.block_order * self.shuffle_block_size))
+            self.shuffle_seed = randint(2 ** 31)
+            self.__block_permutation = (-1, None)
+
+    def extend_indexing(self) -> None:
+        """
+        Append the samples added since the indexing to the current indexing, so that they are used in the current
+        epoch without indexing the Database again. The new samples are shuffled together if required.
+        """
+
+        nb_samples = self.json_content['nb_samples'][self.mode]
+        new_samples = []
+        for partition_id, nb_lines in enumerate(nb_samples):
+            nb_indexed = self.indexed_counts[partition_id] if partition_id < len(self.indexed_counts) else 0
+            new_samples += [[partition_id, line_id] for line_id in range(nb_indexed + 1, nb_lines + 1)]
+        if len(new_samples) == 0:
+            return
+        new_samples = array(new_samples, dtype=int)
         if self.shuffle:
-            shuffle(self.sample_indices)
+            new_samples = new_samples[permutation(len(new_samples))]
+        self.extended_samples = concatenate((self.extended_samples, new_samples))
+        self.indexed_counts = list(nb_samples)
+        self.nb_indexed_samples += len(new_samples)
+
+    def get_sample_indices(self,
+                           start: int,
+                           end: int) -> List[List[int]]:
+        """
+        Get the [partition_id, line_id] of the samples between two positions of the current indexing.
+
+        :param start: First position.
+        :param end: Last position (excluded).
+        """
+
+        # 1. Get the flat indices of the samples (the samples appended to the indexing are given as they are)
+        nb_flat_samples = int(self.partition_offsets[-1])
+        if end > nb_flat_samples:
+            extended = self.extended_samples[max(start - nb_flat_samples, 0):end - nb_flat_samples].tolist()
+            return (self.get_sample_indices(start=start, end=nb_flat_samples) if start < nb_flat_samples else []) + \
+                extended
+        if not self.shuffle:
+            flat_ids = arange(start, end)
+        elif self.shuffle_block_size is None:
+            flat_ids = self.sample_order[start:end]
+        else:
+            positions = arange(start, end)
+            blocks = searchsorted(self.block_ends, positions, side='right')
+            flat_ids = empty(len(positions), dtype=int)
+            for block in unique(blocks):
+                in_block = blocks == block
+                block_size = self.block_ends[block] - (self.block_ends[block - 1] if block > 0 else 0)
+                # The permutation of the current block is computed once
+                if self.__block_permutation[0] != block:
+                    self.__block_permutation = (block,
+                                                default_rng([self.shuffle_seed, block]).permutation(block_size))
+                offsets = positions[in_block] - (self.block_ends[block] - block_size)
+                flat_ids[in_block] = self.block_order[block] * self.shuffle_block_size + \
+                    self.__block_permutation[1][offsets]
+
+        # 2. Get the partition and the line of each sample
+        partition_ids = searchsorted(self.partition_offsets, flat_ids, side='right') - 1
+        line_ids = flat_ids - self.partition_offsets[partition_ids] + 1
+        return stack((partition_ids, line_ids), axis=1).tolist()
 
     def add_data(self,
                  data_lines: Optional[List[int]] = None) -> None:
@@ -437,9 +789,15 @@ class DatabaseManager:
         :param data_lines: Indices of the newly added lines.
         """
 
-        # 1. Update the json file
-        self.get_nb_samples()
-        self.update_json()
+        # 1. Update the json file (the partitions are only queried if the new lines are unknown)
+        if data_lines is None:
+            self.get_nb_samples()
+            nb_partitions = len(self.partitions[self.mode])
+            updated = range(max(nb_partitions - self.nb_shards, 0), nb_partitions)
+        else:
+            updated = self.update_nb_samples(data_lines=data_lines)
+        record = {'nb_samples': {partition_id: self.json_content['nb_samples'][self.mode][partition_id]
+                                 for partition_id in updated}}
         # 1.1. Init partitions information on the first sample
         if self.first_add:
             for handler in self.database_handlers:
@@ -449,15 +807,14 @@ class DatabaseManager:
             self.json_content['data_shape'] = self.get_data_shapes()
             self.update_json()
             self.first_add = False
-        # 1.2. Update the normalization coefficients if required
+        # 1.2. Update the normalization coefficients if required (they are only written in the json file at compaction)
         if self.normalize and self.mode == 'training' and self.pipeline == 'training' and data_lines is not None:
             self.json_content['normalization'] = self.update_normalization(data_lines=data_lines)
-            self.update_json()
+        self.record_json(record=record)
 
-        # 2. Check the size of the current partition
+        # 2. Check the size of the current partitions
         if self.max_file_size is not None:
-            if self.partitions[self.mode][-1].memory_size > self.max_file_size:
-                self.create_partition()
+            self.check_partitions_size()
 
     def get_data(self,
                  batch_size: int) -> List[List[int]]:
@@ -467,14 +824,17 @@ class DatabaseManager:
         :param batch_size: Number of sample in a single batch.
         """
 
-        # 1. Check if dataset is loaded and if the current sample is not the last
-        if self.sample_id >= len(self.sample_indices):
+        # 1. Check if dataset is indexed and if the current sample is not the last
+        if self.sample_id >= self.nb_indexed_samples:
             self.index_samples()
+        elif self.indexed_counts != self.json_content['nb_samples'][self.mode]:
+            self.extend_indexing()
 
         # 2. Update dataset index and get a batch of data
         idx = self.sample_id
         self.sample_id += batch_size
-        lines = self.sample_indices[idx:self.sample_id].tolist()
+        lines = self.get_sample_indices(start=idx,
+                                        end=min(self.sample_id, self.nb_indexed_samples))
 
         # 3. Ensure the batch has the good size
         if len(lines) < batch_size:
@@ -489,119 +849,126 @@ class DatabaseManager:
     ##########################################################################################
 
     @property
-    def normalization(self) -> Optional[Dict[str, List[float]]]:
+    def normalization(self) -> Optional[Dict[str, List[ndarray]]]:
         """
-        Get the normalization coefficients.
+        Get the normalization coefficients as arrays (scalars or arrays shaped as the data).
         """
 
         if self.json_content['normalization'] == {} or not self.normalize:
             return None
-        return self.json_content['normalization']
+        # Convert the coefficients to arrays once for each new normalization
+        if self.__normalization_source is not self.json_content['normalization']:
+            self.__normalization_source = self.json_content['normalization']
+            self.__normalization = {field: [array(mean_value), array(std_value)]
+                                    for field, (mean_value, std_value) in self.__normalization_source.items()}
+        return self.__normalization
 
-    def compute_normalization(self) -> Dict[str, List[float]]:
+    def check_normalization(self,
+                            content: str = 'normalization') -> bool:
         """
-        Compute the mean and the standard deviation of all the training samples for each data field.
+        Check that the normalization coefficients or their running statistics exist and match the normalization option
+        (a single value or a value per component for each field).
+
+        :param content: Either 'normalization' for the coefficients or 'normalization_stats' for the statistics.
+        """
+
+        values = self.json_content[content]
+        mean_index = 0 if content == 'normalization' else 1
+        return len(values) > 0 and all(isinstance(field_values[mean_index], list) == self.normalize_per_component
+                                       for field_values in values.values())
+
+    def get_normalization_fields(self) -> List[str]:
+        """
+        Get the data fields of the Training Table to normalize.
         """
 
-        # 1. Get the fields to normalize
         fields = []
         for field in self.json_content['data_shape']:
             table_name, field_name = field.split('.')
             fields += [field_name] if table_name == 'Training' else []
-        normalization = {field: [0., 1.] for field in fields}
-
-        # 2. Compute the mean of samples for each field
-        means = {field: [] for field in fields}
-        nb_samples = []
-        # 2.1. Compute the mean for each partition
-        for partition in self.partitions['training']:
-            data_to_normalize = self.load_partitions_fields(partition=partition, fields=fields)
-            nb_samples.append(data_to_normalize['id'][-1])
-            for field in fields:
-                data = array(data_to_normalize[field])
-                means[field].append(data.mean())
-        # 2.2. Compute the global mean
-        for field in fields:
-            normalization[field][0] = sum([(n / sum(nb_samples)) * m
-                                           for n, m in zip(nb_samples, means[field])])
-
-        # 3. Compute the standard deviation of samples for each field
-        stds = {field: [] for field in fields}
-        # 3.1. Compute the standard deviation for each partition
-        for partition in self.partitions['training']:
-            data_to_normalize = self.load_partitions_fields(partition=partition,
-                                                            fields=fields)
-            for field in fields:
-                data = array(data_to_normalize[field])
-                stds[field].append(mean(abs(data - normalization[field][0]) ** 2))
-        # 3.2. Compute the global standard deviation
-        for field in fields:
-            normalization[field][1] = sqrt(sum([(n / sum(nb_samples)) * std
-                                                for n, std in zip(nb_samples, stds[field])]))
+        return fields
 
-        return normalization
+    def freeze_normalization(self) -> None:
+        """
+        Compute the running statistics from the samples already added to the Database if they do not exist. Once
+        frozen, the statistics are only updated with the samples given to 'add_data', so that the samples produced in
+        advance but not added yet are never counted twice.
+        """
+
+        if self.normalize and self.mode == 'training' and self.pipeline == 'training':
+            if len(self.json_content['data_shape']) > 0 and \
+                    (self.normalization is None or not self.check_normalization(content='normalization_stats')):
+                self.json_content['normalization'] = self.compute_normalization()
+            self.normalization_frozen = True
+
+    def compute_normalization(self) -> Dict[str, List[Any]]:
+        """
+        Compute the mean and the standard deviation of all the training samples for each data field.
+        Partitions are scanned by chunks of lines, in a pool of processes if required. The running statistics of each
+        field are stored to be updated with the next samples.
+        """
+
+        # 1. Scan the training partitions
+        stats = scan_partitions(database_paths=[partition.get_path() for partition in self.partitions['training']],
+                                fields=self.get_normalization_fields(),
+                                chunk_size=self.normalization_chunk_size,
+                                per_component=self.normalize_per_component,
+                                nb_workers=self.normalization_workers)
+        stats = {field: statistics_to_list(field_stats) for field, field_stats in stats.items()}
+        self.json_content['normalization_stats'] = stats
+
+        return self.normalization_from_statistics(stats)
 
     def update_normalization(self,
-                             data_lines: List[int]) -> Dict[str, List[float]]:
+                             data_lines: List[List[int]]) -> Dict[str, List[Any]]:
         """
         Update the mean and the standard deviation of all the training samples with newly added samples for each data
-        field.
+        field. Only the new samples are loaded, their statistics are merged with the running ones.
 
         :param data_lines: Indices of the newly added lines.
         """
 
-        # 1. Get the previous normalization coefficients and number of samples
-        previous_normalization = self.normalization
-        if previous_normalization is None:
+        # 1. Get the running statistics, compute them from the whole Database if they do not exist
+        if not self.normalization_frozen and \
+                (self.normalization is None or not self.check_normalization(content='normalization_stats')):
             return self.compute_normalization()
-        new_normalization = previous_normalization.copy()
-        previous_nb_samples = self.total_nb_sample
-        self.total_nb_sample += len(data_lines)
-
-        # 2. Compute the global mean of samples for each field
-        fields = list(previous_normalization.keys())
-        data_to_normalize = self.partitions[self.mode][-1].get_lines(table_name='Training',
-                                                                     fields=fields,
-                                                                     lines_id=data_lines,
-                                                                     batched=True)
-        for field in fields:
-            data = array(data_to_normalize[field])
-            m = (previous_nb_samples / self.total_nb_sample) * previous_normalization[field][0] + \
-                (len(data_lines) / self.total_nb_sample) * data.mean()
-            new_normalization[field][0] = m
-
-        # 3. Compute standard deviation of samples for each field
-        stds = {field: [] for field in fields}
-        nb_samples = []
-        # 3.1. Recompute the standard deviation for each partition with the new mean value
-        for partition in self.partitions['training']:
-            data_to_normalize = self.load_partitions_fields(partition=partition,
-                                                            fields=fields)
-            nb_samples.append(data_to_normalize['id'][-1])
+        # Frozen statistics only start from the samples given to 'add_data'
+        stats = self.json_content['normalization_stats']
+        for field in self.get_normalization_fields():
+            stats.setdefault(field, [0, 0., 0.])
+        fields = list(stats.keys())
+
+        # 2. Load the new samples of each partition and merge their statistics
+        lines_per_partition: Dict[int, List[int]] = {}
+        for partition_id, line_id in data_lines:
+            lines_per_partition.setdefault(partition_id, []).append(line_id)
+        for partition_id, lines_id in lines_per_partition.items():
+            data_to_normalize = self.partitions[self.mode][partition_id].get_lines(table_name='Training',
+                                                                                   fields=fields,
+                                                                                   lines_id=lines_id,
+                                                                                   batched=True)
             for field in fields:
-                data = array(data_to_normalize[field])
-                stds[field].append(mean(abs(data - new_normalization[field][0]) ** 2))
-        # 3.2. Compute the global standard deviation
-        for field in fields:
-            new_normalization[field][1] = sqrt(sum([(n / sum(nb_samples)) * std
-                                                    for n, std in zip(nb_samples, stds[field])]))
+                stats[field] = statistics_to_list(merge_statistics(stats[field],
+                                                                   compute_statistics(data_to_normalize[field],
+                                                                                      self.normalize_per_component)))
 
-        return new_normalization
+        return self.normalization_from_statistics(stats)
 
     @staticmethod
-    def load_partitions_fields(partition: Database,
-                               fields: List[str]) -> Dict[str, ndarray]:
+    def normalization_from_statistics(stats: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
         """
-        Load all the samples from a Field of a Table in the Database.
+        Get the mean and the standard deviation of each data field from their statistics.
 
-        :param partition: Database partition to load.
-        :param fields: Data Fields to get.
+        :param stats: Statistics [count, mean, M2] of each field.
+        :return: Normalization coefficients [mean, std] of each field.
         """
 
-        partition.load()
-        return partition.get_lines(table_name='Training',
-                                   fields=fields,
-                                   batched=True)
+        normalization = {}
+        for field, (count, mean_value, m2) in stats.items():
+            std = sqrt(array(m2) / count) if count > 0 else array(1.)
+            # Constant components are not scaled
+            normalization[field] = [mean_value, where(std == 0., 1., std).tolist()]
+        return normalization
 
     ##########################################################################################
     ##########################################################################################
@@ -628,11 +995,20 @@ class DatabaseManager:
             self.json_content['normalization'] = self.compute_normalization()
             self.update_json()
 
+        # Compact the journal in the json file
+        if self.journal_file is not None or self.nb_journal_records > 0:
+            self.update_json()
+
+        # Erase the prepared partitions that were not used
+        self.discard_prepared_partitions()
+
         # Close Database partitions
         for mode in self.modes:
             for database in self.partitions[mode]:
                 database.close()
         self.exchange.close(erase_file=True)
+        if self.shared_exchange is not None:
+            self.shared_exchange.close()
 
     def __str__(self):
 
@@ -1,5 +1,6 @@
 from typing import Any, Optional, List
-from asyncio import run as async_run
+from asyncio import new_event_loop
+from asyncio import AbstractEventLoop as EventLoop
 from os.path import join
 
 from DeepPhysX.Core.Environment.BaseEnvironmentConfig import BaseEnvironmentConfig, TcpIpServer, BaseEnvironment
@@ -41,9 +42,16 @@ class EnvironmentManager:
         self.max_wrong_samples_per_step: int = environment_config.max_wrong_samples_per_step
         self.allow_prediction_requests: bool = pipeline != 'data_generation'
         self.dataset_batch: Optional[List[List[int]]] = None
+        self.environment_config: BaseEnvironmentConfig = environment_config
 
-        # Create a Visualizer to provide the visualization Database
+        # Several requests in flight would interleave the prediction requests of a Client with its next steps
         force_local = pipeline == 'prediction'
+        if environment_config.as_tcp_ip_client and not force_local and \
+                environment_config.requests_per_client > 1 and self.allow_prediction_requests:
+            raise ValueError(f"[{self.name}] The requests_per_client number must be 1 with a '{pipeline}' pipeline, "
+                             f"several requests per Client are only available for data generation.")
+
+        # Create a Visualizer to provide the visualization Database
         visualizer_db: Optional[Database] = None
         if environment_config.visualizer is not None:
             visualizer_db = Database(database_dir=join(session, 'dataset'),
@@ -53,6 +61,7 @@ class EnvironmentManager:
         self.number_of_thread: int = 1 if force_local else environment_config.number_of_thread
         self.server: Optional[TcpIpServer] = None
         self.environment: Optional[BaseEnvironment] = None
+        self.loop: Optional[EventLoop] = None
         # Create Server
         if environment_config.as_tcp_ip_client and not force_local:
             if visualizer_db is not None:
@@ -70,8 +79,11 @@ class EnvironmentManager:
             self.server.connect_visualization()
         # Create Environment
         else:
+            # Environment steps run on a single event loop in the calling thread (scenes may not be thread-safe)
+            self.loop = new_event_loop()
             self.environment = environment_config.create_environment()
             self.environment.environment_manager = self
+            self.environment.write_buffer_size = environment_config.write_buffer_size
             self.data_manager.connect_handler(self.environment.get_database_handler())
             self.environment.create()
             self.environment.init()
@@ -153,7 +165,7 @@ class EnvironmentManager:
                 for current_step in range(self.simulations_per_step):
                     # Sub-steps do not produce data
                     self.environment.compute_training_data = current_step == self.simulations_per_step - 1
-                    async_run(self.environment.step())
+                    self.loop.run_until_complete(self.environment.step())
 
             # 3. Add the produced sample index to the batch if the sample is validated
             if self.environment.check_sample():
@@ -166,7 +178,9 @@ class EnvironmentManager:
                     # Update the line if the sample was given by the database
                     if update_line is None:
                         new_line = self.environment._send_training_data()
-                        dataset_lines.append(new_line)
+                        # Buffered samples have no index yet
+                        if new_line is not None:
+                            dataset_lines.append(new_line)
                     # Create a new line otherwise
                     else:
                         self.environment._update_training_data(update_line)
@@ -174,6 +188,9 @@ class EnvironmentManager:
                 # 3.3. Rest the data variables
                 self.environment._reset_training_data()
 
+        # 4. Write the buffered samples
+        if save_data:
+            dataset_lines += self.environment._flush_training_data()
         return dataset_lines
 
     def __dispatch_batch_to_server(self,
@@ -218,6 +235,17 @@ class EnvironmentManager:
     ##########################################################################################
     ##########################################################################################
 
+    def flush_data(self) -> List[List[int]]:
+        """
+        Write the samples buffered by the Environment(s) in the Database.
+
+        :return: Indices of the written samples.
+        """
+
+        if self.server is not None:
+            return self.server.flush()
+        return self.environment._flush_training_data()
+
     def close(self) -> None:
         """
         Launch the closing procedure of the EnvironmentManager.
@@ -226,12 +254,15 @@ class EnvironmentManager:
         # Server case
         if self.server:
             self.server.close()
+            self.environment_config.close_clients()
 
         # Environment case
         if self.environment:
             if self.environment.factory is not None:
                 self.environment.factory.close()
+            self.environment._flush_training_data()
             self.environment.close()
+            self.loop.close()
 
     def __str__(self) -> str:
 
@@ -1,7 +1,7 @@
 from typing import Any, Dict, Optional, List
 from os import listdir
 from os.path import join, isdir, isfile, sep
-from numpy import ndarray, array
+from numpy import ndarray, array, empty, add, subtract, multiply, divide, stack
 
 from DeepPhysX.Core.Database.DatabaseHandler import DatabaseHandler
 from DeepPhysX.Core.Network.BaseNetworkConfig import BaseNetworkConfig
@@ -30,6 +30,7 @@ class NetworkManager:
         # Storage variables
         self.database_handler: DatabaseHandler = DatabaseHandler()
         self.batch: Optional[Any] = None
+        self.batch_buffers: Dict[str, ndarray] = {}
         self.session: str = session
         self.new_session: bool = new_session
         self.network_dir: Optional[str] = None
@@ -163,40 +164,79 @@ class NetworkManager:
     ##########################################################################################
     ##########################################################################################
 
+    def load_batch(self,
+                   data_lines: List[List[int]],
+                   normalization: Optional[Dict[str, List[float]]] = None,
+                   buffers: Optional[Dict[str, ndarray]] = None) -> Dict[str, Dict[str, ndarray]]:
+        """
+        Read a batch of samples in the Database and normalize it. The Network and Optimization fields are read at
+        once, a field used by both is read and normalized once.
+
+        :param data_lines: Batch of indices of samples in the Database.
+        :param normalization: Normalization coefficients.
+        :param buffers: Arrays reused to read the fields of the batch (new arrays are used if None).
+        :return: Network and Optimization batches.
+        """
+
+        # 1. Get the batch from the Database, array fields are read in buffers of the Network data type
+        normalization = {} if normalization is None else normalization
+        buffers = {} if buffers is None else buffers
+        for field in self.network.net_fields + self.network.opt_fields:
+            buffers.setdefault(field, empty(0, dtype=self.network.config.data_type))
+        batches = self.database_handler.get_lines_projections(table_name='Training',
+                                                              lines_id=data_lines,
+                                                              projections={'net': self.network.net_fields,
+                                                                           'opt': self.network.opt_fields},
+                                                              out=buffers)
+
+        # 2. Apply normalization
+        normalized = {}
+        for batch in batches.values():
+            for field in batch.keys():
+                if field in normalized:
+                    batch[field] = normalized[field]
+                    continue
+                # batch can contain dicts if fields refer to joined tables
+                if isinstance(batch[field], dict):
+                    batch[field] = batch[field][field]
+                # Buffers are normalized in place
+                if batch[field] is buffers.get(field) and batch[field].dtype.kind == 'f':
+                    if field in normalization:
+                        self.normalize_data(data=batch[field],
+                                            normalization=normalization[field],
+                                            in_place=True)
+                else:
+                    batch[field] = array(batch[field])
+                    if field in normalization:
+                        batch[field] = self.normalize_data(data=batch[field],
+                                                           normalization=normalization[field])
+                normalized[field] = batch[field]
+        return batches
+
     def compute_prediction_and_loss(self,
                                     optimize: bool,
                                     data_lines: List[List[int]],
-                                    normalization: Optional[Dict[str, List[float]]] = None) -> Dict[str, float]:
+                                    normalization: Optional[Dict[str, List[float]]] = None,
+                                    batch: Optional[Dict[str, Dict[str, ndarray]]] = None) -> Dict[str, float]:
         """
         Make a prediction with the data passed as argument, optimize or not the network
 
         :param optimize: If true, run a backward propagation.
         :param data_lines: Batch of indices of samples in the Database.
         :param normalization: Normalization coefficients.
+        :param batch: Network and Optimization batches if they were already read with 'load_batch'.
         :return: The prediction and the associated loss value
         """
 
-        # 1. Define Network and Optimization batches
-        batches = {}
-        normalization = {} if normalization is None else normalization
-        for side, fields in zip(['net', 'opt'], [self.network.net_fields, self.network.opt_fields]):
-            # Get the batch from the Database
-            batch = self.database_handler.get_lines(table_name='Training',
-                                                    fields=fields,
-                                                    lines_id=data_lines)
-            # Apply normalization and convert to tensor
-            for field in batch.keys():
-                # batch can contain dicts if fields refer to joined tables
-                if isinstance(batch[field], dict):
-                    batch[field] = batch[field][field]
-                batch[field] = array(batch[field])
-                if field in normalization:
-                    batch[field] = self.normalize_data(data=batch[field],
-                                                       normalization=normalization[field])
-                batch[field] = self.network.numpy_to_tensor(data=batch[field],
-                                                            grad=optimize)
-            batches[side] = batch
-        data_net, data_opt = batches.values()
+        # 1. Define Network and Optimization batches (read in the reused buffers if not already loaded)
+        batches = self.load_batch(data_lines=data_lines,
+                                  normalization=normalization,
+                                  buffers=self.batch_buffers) if batch is None else batch
+        for side_batch in batches.values():
+            for field in side_batch.keys():
+                side_batch[field] = self.network.numpy_to_tensor(data=side_batch[field],
+                                                                 grad=optimize)
+        data_net, data_opt = batches['net'], batches['opt']
 
         # 2. Compute prediction
         data_net = self.data_transformation.transform_before_prediction(data_net)
@@ -222,56 +262,95 @@ class NetworkManager:
         :param normalization: Normalization coefficients.
         """
 
-        # Get Network data
+        self.compute_online_predictions(instance_ids=[instance_id],
+                                        normalization=normalization)
+
+    def compute_online_predictions(self,
+                                   instance_ids: List[int],
+                                   normalization: Optional[Dict[str, List[float]]] = None) -> None:
+        """
+        Make a single prediction for several Environment instances. The samples are stacked in a single batch if their
+        fields have the same shapes, otherwise a prediction is made for each instance.
+
+        :param instance_ids: Indices of the Environment instances to provide a prediction.
+        :param normalization: Normalization coefficients.
+        """
+
+        # Get Network data of each instance
         normalization = {} if normalization is None else normalization
-        sample = self.database_handler.get_line(table_name='Exchange',
-                                                fields=self.network.net_fields,
-                                                line_id=instance_id)
-        del sample['id']
-
-        # Apply normalization and convert to tensor
-        for field in sample.keys():
-            if isinstance(sample[field], dict):
-                sample[field] = sample[field][field]
-            sample[field] = array([sample[field]])
+        samples = []
+        for instance_id in instance_ids:
+            sample = self.database_handler.get_line(table_name='Exchange',
+                                                    fields=self.network.net_fields,
+                                                    line_id=instance_id)
+            del sample['id']
+            for field in sample.keys():
+                if isinstance(sample[field], dict):
+                    sample[field] = sample[field][field]
+                sample[field] = array(sample[field])
+            samples.append(sample)
+
+        # Samples with different shapes are predicted separately
+        if any(sample.keys() != samples[0].keys() or
+               any(sample[field].shape != samples[0][field].shape for field in sample.keys())
+               for sample in samples[1:]):
+            for instance_id in instance_ids:
+                self.compute_online_predictions(instance_ids=[instance_id],
+                                                normalization=normalization)
+            return
+
+        # Stack the samples, apply normalization and convert to tensor
+        batch = {}
+        for field in samples[0].keys():
+            batch[field] = stack([sample[field] for sample in samples])
             if field in normalization.keys():
-                sample[field] = self.normalize_data(data=sample[field],
-                                                    normalization=normalization[field])
-            sample[field] = self.network.numpy_to_tensor(data=sample[field])
+                batch[field] = self.normalize_data(data=batch[field],
+                                                   normalization=normalization[field])
+            batch[field] = self.network.numpy_to_tensor(data=batch[field])
 
         # Compute prediction
-        data_net = self.data_transformation.transform_before_prediction(sample)
+        data_net = self.data_transformation.transform_before_prediction(batch)
         data_pred = self.network.predict(data_net)
         data_pred, _ = self.data_transformation.transform_before_loss(data_pred)
         data_pred = self.data_transformation.transform_before_apply(data_pred)
 
-        # Return the prediction
+        # Return the prediction of each instance
         for field in data_pred.keys():
-            data_pred[field] = self.network.tensor_to_numpy(data=data_pred[field][0])
+            data_pred[field] = self.network.tensor_to_numpy(data=data_pred[field])
             if self.network.pred_norm_fields[field] in normalization.keys():
                 data_pred[field] = self.normalize_data(data=data_pred[field],
                                                        normalization=normalization[self.network.pred_norm_fields[field]],
                                                        reverse=True)
-            data_pred[field].reshape(-1)
-        self.database_handler.update(table_name='Exchange',
-                                     data=data_pred,
-                                     line_id=instance_id,
-                                     create_fields=True)
+        for i, instance_id in enumerate(instance_ids):
+            self.database_handler.update(table_name='Exchange',
+                                         data={field: data_pred[field][i] for field in data_pred.keys()},
+                                         line_id=instance_id,
+                                         create_fields=True)
 
     @classmethod
     def normalize_data(cls,
                        data: ndarray,
                        normalization: List[float],
-                       reverse: bool = False) -> ndarray:
+                       reverse: bool = False,
+                       in_place: bool = False) -> ndarray:
         """
         Apply or unapply normalization following current standard score.
 
         :param data: Data to normalize.
         :param normalization: Normalization coefficients.
         :param reverse: If True, apply normalization; if False, unapply normalization.
+        :param in_place: If True, the normalization is applied to the given array instead of a new one.
         :return: Data with applied or misapplied normalization.
         """
 
+        # Apply or unapply normalization without allocating a new array
+        if in_place:
+            if reverse:
+                multiply(data, normalization[1], out=data)
+                return add(data, normalization[0], out=data)
+            subtract(data, normalization[0], out=data)
+            return divide(data, normalization[1], out=data)
+
         # Unapply normalization
         if reverse:
             return (data * normalization[1]) + normalization[0]
@@ -183,10 +183,12 @@ class BaseTraining(BasePipeline):
         """
         self.data_manager.get_data(epoch=self.epoch_id,
                                    animate=True)
-        self.loss_dict = self.network_manager.compute_prediction_and_loss(
-            data_lines=self.data_manager.data_lines,
-            normalization=self.data_manager.normalization,
-            optimize=True)
+        with self.data_manager.network_lock:
+            self.loss_dict = self.network_manager.compute_prediction_and_loss(
+                data_lines=self.data_manager.data_lines,
+                normalization=self.data_manager.normalization,
+                optimize=True,
+                batch=self.data_manager.data_batch)
 
     def execute_validation(self):
         self.set_eval()
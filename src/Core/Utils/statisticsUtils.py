@@ -0,0 +1,124 @@
+from typing import Any, Dict, List, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from numpy import ndarray, array
+
+from SSD.Core.Storage.Database import Database
+
+Statistics = List[Union[int, ndarray]]
+
+
+def compute_statistics(data: Any,
+                       per_component: bool = False) -> Statistics:
+    """
+    Compute the number of values, the mean and the sum of squared differences to the mean of a set of samples.
+
+    :param data: Samples of a data field.
+    :param per_component: If True, statistics are computed for each component of the samples.
+    :return: Statistics [count, mean, M2].
+    """
+
+    data = array(data, dtype=float)
+    if data.size == 0:
+        return [0, array(0.), array(0.)]
+    # Statistics of each component: reduce the samples axis only
+    if per_component:
+        data = data.reshape((data.shape[0], 1)) if data.ndim == 1 else data
+        data_mean = data.mean(axis=0)
+        return [data.shape[0], data_mean, ((data - data_mean) ** 2).sum(axis=0)]
+    data_mean = data.mean()
+    return [data.size, data_mean, ((data - data_mean) ** 2).sum()]
+
+
+def merge_statistics(stats_a: Statistics,
+                     stats_b: Statistics) -> Statistics:
+    """
+    Merge the statistics of two sets of samples (parallel algorithm of Chan et al.).
+
+    :param stats_a: Statistics [count, mean, M2] of the first set.
+    :param stats_b: Statistics [count, mean, M2] of the second set.
+    :return: Statistics [count, mean, M2] of the union.
+    """
+
+    if stats_a[0] == 0 or stats_b[0] == 0:
+        return stats_b if stats_a[0] == 0 else stats_a
+    (count_a, mean_a, m2_a), (count_b, mean_b, m2_b) = stats_a, stats_b
+    mean_a, mean_b, m2_a, m2_b = array(mean_a), array(mean_b), array(m2_a), array(m2_b)
+    count = count_a + count_b
+    delta = mean_b - mean_a
+    return [count, mean_a + delta * count_b / count, m2_a + m2_b + delta ** 2 * count_a * count_b / count]
+
+
+def statistics_to_list(stats: Statistics) -> List[Any]:
+    """
+    Convert statistics to a JSON serializable list.
+
+    :param stats: Statistics [count, mean, M2].
+    :return: Statistics [count, mean, M2] with float or nested lists values.
+    """
+
+    return [int(stats[0]), array(stats[1]).tolist(), array(stats[2]).tolist()]
+
+
+def scan_partition(database_path: Tuple[str, str],
+                   fields: List[str],
+                   chunk_size: int = 1000,
+                   per_component: bool = False) -> Dict[str, Statistics]:
+    """
+    Compute the statistics of Fields of the Training Table of a Database partition. Lines are read by chunks, so that
+    a whole Field is never loaded at once.
+
+    :param database_path: Path to the partition as (database_dir, database_name).
+    :param fields: Data Fields to scan.
+    :param chunk_size: Number of lines to read at once.
+    :param per_component: If True, statistics are computed for each component of the samples.
+    :return: Statistics [count, mean, M2] of each Field.
+    """
+
+    database = Database(database_dir=database_path[0],
+                        database_name=database_path[1]).load()
+    stats = {field: [0, array(0.), array(0.)] for field in fields}
+    nb_lines = database.nb_lines(table_name='Training')
+    for first_line in range(1, nb_lines + 1, chunk_size):
+        data = database.get_lines(table_name='Training',
+                                  fields=fields,
+                                  lines_id=list(range(first_line, min(first_line + chunk_size, nb_lines + 1))),
+                                  batched=True)
+        for field in fields:
+            stats[field] = merge_statistics(stats[field], compute_statistics(data[field], per_component))
+    database.close()
+    return stats
+
+
+def scan_partitions(database_paths: List[Tuple[str, str]],
+                    fields: List[str],
+                    chunk_size: int = 1000,
+                    per_component: bool = False,
+                    nb_workers: int = 0) -> Dict[str, Statistics]:
+    """
+    Compute the statistics of Fields of the Training Table over several Database partitions.
+
+    :param database_paths: Paths to the partitions as (database_dir, database_name).
+    :param fields: Data Fields to scan.
+    :param chunk_size: Number of lines to read at once.
+    :param per_component: If True, statistics are computed for each component of the samples.
+    :param nb_workers: Number of processes scanning the partitions in parallel (0 to scan them in this process).
+    :return: Statistics [count, mean, M2] of each Field.
+    """
+
+    # Scan each partition, in a pool of processes if required
+    args = ([path for path in database_paths], [fields] * len(database_paths),
+            [chunk_size] * len(database_paths), [per_component] * len(database_paths))
+    if nb_workers > 1 and len(database_paths) > 1:
+        with ProcessPoolExecutor(max_workers=min(nb_workers, len(database_paths)),
+                                 mp_context=get_context('spawn')) as pool:
+            partitions_stats = list(pool.map(scan_partition, *args))
+    else:
+        partitions_stats = list(map(scan_partition, *args))
+
+    # Merge the statistics of the partitions
+    stats = {field: [0, array(0.), array(0.)] for field in fields}
+    for partition_stats in partitions_stats:
+        for field in fields:
+            stats[field] = merge_statistics(stats[field], partition_stats[field])
+    return stats
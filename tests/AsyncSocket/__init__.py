@@ -1,2 +1,3 @@
 from .tests_BytesConverter import TestBytesConverter
 from .tests_TcpIpObject import TestTcpIpObjects
+from .tests_TcpIpServer import TestTcpIpServer
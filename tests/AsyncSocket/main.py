@@ -3,7 +3,9 @@ from os import devnull
 from sys import stdout
 
 from tests_BytesConverter import TestBytesConverter
+from tests_EventLoopThread import TestEventLoopThread
 from tests_TcpIpObject import TestTcpIpObjects
+from tests_TcpIpServer import TestTcpIpServer
 
 
 if __name__ == '__main__':
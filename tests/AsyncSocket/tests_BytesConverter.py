@@ -1,5 +1,5 @@
 from unittest import TestCase
-from numpy import array, ndarray
+from numpy import array, ndarray, float32, float64, int64
 
 from DeepPhysX.Core.AsyncSocket.BytesConverter import BytesConverter
 
@@ -31,3 +31,61 @@ class TestBytesConverter(TestCase):
             self.assertEqual(type(data), type(recovered_data))
             # Finally, check equality
             self.assertTrue(self.types[type(data)]['equality'](data, recovered_data))
+
+    def test_frames(self):
+        # Check framed conversions for all types
+        for data in [None, b'test', 'test', True, False, 1, -1, 1., -1., [0.1, 0.1], [[-1, 0], [0, 1]],
+                     array([0.1, 0.1], dtype=float), array([[-1, 0], [0, 1]], dtype=int)]:
+            # Convert data to a header and a payload
+            header, payload = self.converter.data_to_frame(data, as_list=True)
+            self.assertEqual(len(header), self.converter.header_size)
+            # Recover the header fields, the last one is the size of the payload
+            header_fields = self.converter.header_from_bytes(header)
+            self.assertEqual(header_fields[-1], len(payload))
+            # Convert the payload into data
+            recovered_data = self.converter.frame_to_data(header_fields, payload)
+            self.assertEqual(type(data), type(recovered_data))
+            # Finally, check equality
+            self.assertTrue(self.types[type(data)]['equality'](data, recovered_data))
+
+    def test_frames_dtype(self):
+        # Check that framed arrays keep their own datatype
+        for data in [array([0.1, 0.1], dtype=float32), array([[-1, 0], [0, 1]], dtype=int64), array([True, False])]:
+            header, payload = self.converter.data_to_frame(data, as_list=True)
+            self.assertEqual(len(payload), data.nbytes)
+            recovered_data = self.converter.frame_to_data(self.converter.header_from_bytes(header), payload)
+            self.assertEqual(data.dtype, recovered_data.dtype)
+            self.assertTrue((data == recovered_data).all())
+
+    def test_frames_byte_order(self):
+        # Check that arrays with a non-native byte order are recovered with their values
+        for data in [array([1., 2.], dtype='>f8'), array([[1, -2], [3, 4]], dtype='<i4'), array([5, 6], dtype='>u2')]:
+            header, payload = self.converter.data_to_frame(data, as_list=True)
+            recovered_data = self.converter.frame_to_data(self.converter.header_from_bytes(header), payload)
+            self.assertEqual(recovered_data.dtype.kind, data.dtype.kind)
+            self.assertEqual(recovered_data.dtype.itemsize, data.dtype.itemsize)
+            self.assertTrue((data == recovered_data).all())
+
+    def test_frames_0d(self):
+        # Check that 0-d arrays and numpy scalars keep their shape
+        for data in [array(1.5), array(3, dtype=int64), float64(2.5), float32(-1.)]:
+            header, payload = self.converter.data_to_frame(data, as_list=True)
+            recovered_data = self.converter.frame_to_data(self.converter.header_from_bytes(header), payload)
+            self.assertEqual(recovered_data.shape, ())
+            self.assertEqual(recovered_data.dtype, data.dtype)
+            self.assertEqual(recovered_data, data)
+
+    def test_frames_dict(self):
+        # Check that a nested dictionary is packed in a single frame
+        data = {'int': 1, 'str': 'test', 'nested': {'array': array([[-1, 0], [0, 1]], dtype=int), 'empty': {}},
+                'list': [0.1, 0.1]}
+        header, *payloads = self.converter.data_to_frame(data, as_list=True)
+        header_fields = self.converter.header_from_bytes(header)
+        self.assertEqual(header_fields[0], dict.__name__)
+        self.assertEqual(header_fields[-1], sum([len(payload) for payload in payloads]))
+        recovered_data = self.converter.frame_to_data(header_fields, b''.join(payloads))
+        self.assertEqual(data.keys(), recovered_data.keys())
+        self.assertTrue((data['nested']['array'] == recovered_data['nested']['array']).all())
+        self.assertEqual(recovered_data['nested']['empty'], {})
+        for key in ['int', 'str', 'list']:
+            self.assertEqual(data[key], recovered_data[key])
@@ -0,0 +1,45 @@
+from unittest import TestCase
+from asyncio import sleep, get_event_loop
+from threading import Thread
+
+from DeepPhysX.Core.AsyncSocket.EventLoopThread import EventLoopThread
+
+
+class TestEventLoopThread(TestCase):
+
+    def setUp(self):
+        self.event_loop = EventLoopThread()
+
+    def tearDown(self):
+        self.event_loop.close()
+
+    def test_run(self):
+        async def add(a, b):
+            await sleep(0.01)
+            return a + b, get_event_loop()
+        # Coroutines always run on the same loop
+        result, loop = self.event_loop.run(add(1, 2))
+        self.assertEqual(result, 3)
+        self.assertEqual(self.event_loop.run(add(3, 4)), (7, loop))
+        self.assertIs(loop, self.event_loop.loop)
+
+    def test_submit(self):
+        async def identity(a):
+            await sleep(0.01)
+            return a
+        # Submit from several threads
+        results = [None] * 4
+
+        def submit(i):
+            results[i] = self.event_loop.submit(identity(i)).result()
+        threads = [Thread(target=submit, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [0, 1, 2, 3])
+
+    def test_close(self):
+        self.event_loop.close()
+        self.assertFalse(self.event_loop.thread.is_alive())
+        self.assertRaises(RuntimeError, self.event_loop.submit, sleep(0))
@@ -0,0 +1,78 @@
+from unittest import TestCase
+from unittest.mock import patch
+from asyncio import gather, sleep, get_event_loop
+from threading import get_ident
+from types import SimpleNamespace
+from time import time
+
+from DeepPhysX.Core.AsyncSocket.TcpIpServer import TcpIpServer
+
+
+class TestTcpIpServer(TestCase):
+
+    def setUp(self):
+        # Predictions are recorded as groups of Client indices
+        self.groups = []
+        self.threads = []
+        data_manager = SimpleNamespace(connect_handler=lambda handler: None,
+                                       get_prediction=lambda client_id: self.predict([client_id]),
+                                       get_predictions=self.predict)
+        self.manager = SimpleNamespace(data_manager=data_manager)
+        self.server = None
+
+    def tearDown(self):
+        if self.server is not None:
+            self.server.close()
+
+    def predict(self, client_ids):
+        self.groups.append(client_ids)
+        self.threads.append(get_ident())
+
+    def create_server(self, prediction_batch_size, prediction_window):
+        self.server = TcpIpServer(port=11112,
+                                  prediction_batch_size=prediction_batch_size,
+                                  prediction_window=prediction_window,
+                                  manager=self.manager)
+        return self.server
+
+    def request_predictions(self, client_ids, delay=0.001):
+        # Each Client sends a prediction request, the answers are not sent
+        async def send_data(data_to_send, receiver, loop=None):
+            pass
+
+        async def request(client_id):
+            await sleep(delay * client_id)
+            await self.server.action_on_prediction(data={}, client_id=client_id, sender=None, loop=get_event_loop())
+
+        async def requests():
+            await gather(*[request(client_id) for client_id in client_ids])
+
+        with patch.object(self.server, 'send_data', send_data):
+            self.server.event_loop.run(requests())
+
+    def test_prediction_batch(self):
+        self.create_server(prediction_batch_size=4, prediction_window=10.)
+        # Requests are computed together as soon as the batch is full, without waiting for the window
+        start = time()
+        self.request_predictions(range(8))
+        self.assertLess(time() - start, 1.)
+        self.assertEqual(self.groups, [[0, 1, 2, 3], [4, 5, 6, 7]])
+
+    def test_prediction_window(self):
+        self.create_server(prediction_batch_size=8, prediction_window=0.2)
+        # Incomplete batches are computed when the window of the first request ends
+        start = time()
+        self.request_predictions(range(3))
+        self.assertGreaterEqual(time() - start, 0.2)
+        self.assertEqual(self.groups, [[0, 1, 2]])
+        # Requests received after the window are computed in the next batch
+        self.groups = []
+        self.request_predictions([0, 1, 300], delay=0.001)
+        self.assertEqual(self.groups, [[0, 1], [300]])
+
+    def test_prediction_thread(self):
+        self.create_server(prediction_batch_size=1, prediction_window=0.)
+        self.request_predictions(range(2))
+        # Predictions are not computed on the event loop
+        self.assertEqual(self.groups, [[0], [1]])
+        self.assertNotIn(self.server.event_loop.thread.ident, self.threads)
@@ -4,6 +4,10 @@ from sys import stdout
 
 from tests_DatasetConfig import TestBaseDatasetConfig
 from tests_Dataset import TestBaseDataset
+from tests_BatchLoader import TestBatchLoader
+from tests_SharedExchange import TestSharedExchange
+from tests_DatabaseHandler import TestDatabaseHandler
+from tests_MemmapPartition import TestMemmapPartition
 
 
 if __name__ == '__main__':
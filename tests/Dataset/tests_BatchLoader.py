@@ -0,0 +1,60 @@
+from unittest import TestCase
+from time import sleep
+from random import random
+from itertools import count
+
+from DeepPhysX.Core.Database.BatchLoader import BatchLoader
+
+
+class TestBatchLoader(TestCase):
+
+    def setUp(self):
+        self.counter = count()
+        self.nb_drawn = 0
+
+    def get_indices(self):
+        self.nb_drawn += 1
+        return [[0, next(self.counter)]]
+
+    @staticmethod
+    def load_batch(data_lines):
+        sleep(0.01 * random())
+        return data_lines[0][1] * 2
+
+    def test_order(self):
+        loader = BatchLoader(get_indices=self.get_indices, load_batch=self.load_batch, nb_workers=4, queue_size=8)
+        # Batches are delivered in the order their indices were drawn
+        for i in range(20):
+            self.assertEqual(loader.get(), ([[0, i]], 2 * i))
+        loader.close()
+
+    def test_queue_size(self):
+        loader = BatchLoader(get_indices=self.get_indices, load_batch=self.load_batch, nb_workers=2, queue_size=3)
+        sleep(0.2)
+        self.assertEqual(self.nb_drawn, 3)
+        loader.get()
+        sleep(0.2)
+        self.assertEqual(self.nb_drawn, 4)
+        loader.close()
+
+    def test_close(self):
+        loader = BatchLoader(get_indices=self.get_indices, load_batch=self.load_batch, nb_workers=2, queue_size=3)
+        self.assertEqual(loader.get()[1], 0)
+        # Batches read and not delivered are returned, then delivered first by the next loader
+        pending = loader.close()
+        self.assertFalse(any(worker.is_alive() for worker in loader.workers))
+        self.assertEqual([batch[1] for batch in pending], [2, 4, 6][:len(pending)])
+        loader = BatchLoader(get_indices=self.get_indices, load_batch=self.load_batch, nb_workers=2, queue_size=3,
+                             pending=pending)
+        self.assertEqual([loader.get()[1] for _ in range(5)], [2, 4, 6, 8, 10])
+        loader.close()
+
+    def test_error(self):
+        def load_batch(data_lines):
+            if data_lines[0][1] == 2:
+                raise ValueError
+            return data_lines[0][1]
+        loader = BatchLoader(get_indices=self.get_indices, load_batch=load_batch, nb_workers=2, queue_size=4)
+        self.assertEqual([loader.get()[1] for _ in range(2)], [0, 1])
+        self.assertRaises(ValueError, loader.get)
+        loader.close()
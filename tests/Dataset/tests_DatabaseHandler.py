@@ -0,0 +1,87 @@
+from unittest import TestCase
+from os import getcwd
+from os.path import join, isdir
+from shutil import rmtree
+from numpy import ndarray, arange, empty, full
+from numpy.testing import assert_array_equal
+
+from SSD.Core.Storage.Database import Database
+
+from DeepPhysX.Core.Database.DatabaseHandler import DatabaseHandler
+
+
+class TestDatabaseHandler(TestCase):
+
+    def setUp(self):
+        # Partitions of different sizes, the value of a line is 100 * partition_id + line_id
+        self.database_dir = join(getcwd(), 'test_handler_dataset')
+        self.partitions = []
+        for partition_id, nb_lines in enumerate([5, 3, 7]):
+            partition = Database(database_dir=self.database_dir,
+                                 database_name=f'partition_{partition_id}').new()
+            partition.create_table(table_name='Training',
+                                   fields=[('input', ndarray), ('step', int)])
+            values = 100 * partition_id + arange(1, nb_lines + 1)
+            partition.add_batch(table_name='Training',
+                                batch={'input': [full((2, 3), value, dtype=float) for value in values],
+                                       'step': values.tolist()})
+            self.partitions.append(partition)
+        self.handler = DatabaseHandler()
+        self.handler.init(storing_partitions=self.partitions,
+                          exchange_db=None)
+        # Lines requested out of order across the partitions, with a duplicate
+        self.lines_id = [[2, 7], [0, 3], [1, 1], [0, 1], [2, 2], [1, 3], [0, 3], [2, 5]]
+        self.values = [100 * partition_id + line_id for partition_id, line_id in self.lines_id]
+
+    def tearDown(self):
+        for partition in self.partitions:
+            partition.close()
+        if isdir(self.database_dir):
+            rmtree(self.database_dir)
+
+    def test_get_lines(self):
+        # Lines are returned in the requested order
+        batch = self.handler.get_lines(table_name='Training',
+                                       lines_id=self.lines_id,
+                                       fields=['input', 'step'])
+        self.assertIsInstance(batch['input'], ndarray)
+        self.assertEqual(batch['input'].shape, (len(self.lines_id), 2, 3))
+        assert_array_equal(batch['input'][:, 0, 0], self.values)
+        self.assertEqual(batch['step'], self.values)
+
+    def test_get_lines_out(self):
+        # Lines are read in the given buffer in the requested order
+        out = {'input': empty((len(self.lines_id), 2, 3))}
+        buffer = out['input']
+        batch = self.handler.get_lines(table_name='Training',
+                                       lines_id=self.lines_id,
+                                       fields=['input', 'step'],
+                                       out=out)
+        self.assertIs(batch['input'], buffer)
+        assert_array_equal(buffer[:, 0, 0], self.values)
+        self.assertEqual(batch['step'], self.values)
+        # A buffer that does not match the batch is replaced
+        out = {'input': empty((2, 2, 3))}
+        batch = self.handler.get_lines(table_name='Training',
+                                       lines_id=self.lines_id,
+                                       fields='input',
+                                       out=out)
+        self.assertIs(out['input'], batch['input'])
+        assert_array_equal(batch['input'][:, 0, 0], self.values)
+
+    def test_add_batch(self):
+        # Indices of the new lines are given by the written lines, after the existing ones
+        values = [700, 701, 702]
+        lines = self.handler.add_batch(table_name='Training',
+                                       batch={'input': [full((2, 3), value, dtype=float) for value in values],
+                                              'step': values})
+        self.assertEqual(lines, [[2, 8], [2, 9], [2, 10]])
+        batch = self.handler.get_lines(table_name='Training',
+                                       lines_id=lines,
+                                       fields=['input', 'step'])
+        self.assertEqual(batch['step'], values)
+        # A batch of a single line
+        lines = self.handler.add_batch(table_name='Training',
+                                       batch={'input': [full((2, 3), 703, dtype=float)], 'step': [703]})
+        self.assertEqual(lines, [[2, 11]])
+        self.assertEqual(self.handler.add_batch(table_name='Training', batch={}), [])
@@ -0,0 +1,84 @@
+from unittest import TestCase
+from os import getcwd
+from os.path import join, isdir, isfile, getmtime
+from shutil import rmtree
+from numpy import ndarray, arange, full, zeros
+from numpy.testing import assert_array_equal
+
+from SSD.Core.Storage.Database import Database
+
+from DeepPhysX.Core.Database.MemmapPartition import MemmapPartition
+from DeepPhysX.Core.Database.DatabaseHandler import DatabaseHandler
+
+
+class TestMemmapPartition(TestCase):
+
+    def setUp(self):
+        # The value of a line is its index, the 'mesh' Field has a variable shape
+        self.database_dir = join(getcwd(), 'test_memmap_dataset')
+        self.partition = Database(database_dir=self.database_dir,
+                                  database_name='partition').new()
+        self.partition.create_table(table_name='Training',
+                                    fields=[('input', ndarray), ('mesh', ndarray)])
+        self.partition.add_batch(table_name='Training',
+                                 batch={'input': [full((2, 3), line_id, dtype=float) for line_id in range(1, 11)],
+                                        'mesh': [zeros((line_id % 3 + 1, 3)) for line_id in range(1, 11)]})
+        self.fields = {'input': (2, 3), 'mesh': (1, 3)}
+
+    def tearDown(self):
+        self.partition.close()
+        if isdir(self.database_dir):
+            rmtree(self.database_dir)
+
+    def test_export(self):
+        memmap = MemmapPartition(partition=self.partition,
+                                 fields=self.fields)
+        self.assertTrue(isfile(join(self.database_dir, 'partition.input.npy')))
+        self.assertTrue(memmap.has_fields(['input']))
+        # Lines are read in the requested order
+        assert_array_equal(memmap.get_lines(lines_id=[7, 2, 9], fields=['input'])['input'][:, 0, 0], [7, 2, 9])
+        # Fields with a variable shape are not mapped
+        self.assertFalse(memmap.has_fields(['mesh']))
+        self.assertFalse(isfile(join(self.database_dir, 'partition.mesh.npy')))
+
+    def test_reuse(self):
+        MemmapPartition(partition=self.partition,
+                        fields=self.fields)
+        mtime = getmtime(join(self.database_dir, 'partition.input.npy'))
+        # The file of an unchanged partition is not exported again
+        memmap = MemmapPartition(partition=self.partition,
+                                 fields=self.fields)
+        self.assertEqual(getmtime(join(self.database_dir, 'partition.input.npy')), mtime)
+        assert_array_equal(memmap.get_lines(lines_id=arange(1, 11), fields=['input'])['input'][:, 0, 0],
+                           arange(1, 11))
+
+    def test_invalidation(self):
+        memmap = MemmapPartition(partition=self.partition,
+                                 fields=self.fields)
+        # Lines rewritten in place: the memory-mapped Fields are no longer read
+        self.partition.update(table_name='Training',
+                              data={'input': full((2, 3), -1.)},
+                              line_id=4)
+        self.assertFalse(memmap.has_fields(['input']))
+        # The file is exported again with the new lines
+        memmap = MemmapPartition(partition=self.partition,
+                                 fields=self.fields)
+        self.assertTrue(memmap.has_fields(['input']))
+        assert_array_equal(memmap.get_lines(lines_id=[3, 4, 5], fields=['input'])['input'][:, 0, 0], [3, -1, 5])
+
+    def test_handler_update(self):
+        memmap = MemmapPartition(partition=self.partition,
+                                 fields=self.fields)
+        handler = DatabaseHandler()
+        handler.init(storing_partitions=[self.partition],
+                     exchange_db=None,
+                     memmap_partitions=[memmap])
+        # Lines updated through the handler are read in the Database
+        handler.update(table_name='Training',
+                       data={'input': full((2, 3), -1.)},
+                       line_id=[0, 2])
+        self.assertFalse(memmap.has_fields(['input']))
+        batch = handler.get_lines(table_name='Training',
+                                  lines_id=[[0, 1], [0, 2]],
+                                  fields=['input'])
+        assert_array_equal(batch['input'][:, 0, 0], [1, -1])
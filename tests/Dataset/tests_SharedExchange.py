@@ -0,0 +1,71 @@
+from unittest import TestCase
+from os import getpid
+from multiprocessing import get_context
+from numpy import arange, zeros, ndarray
+from numpy.testing import assert_array_equal
+
+from DeepPhysX.Core.Database.SharedExchange import SharedExchange
+
+
+def client_process(name, queue):
+    # A Client reads the line of the server, writes its own line and closes
+    exchange = SharedExchange(name=name)
+    queue.put(exchange.get_line(line_id=1)['input'].tolist())
+    exchange.update(line_id=2, data={'input': arange(3.)})
+    exchange.update(line_id=1, data={'prediction': arange(2.)})
+    queue.put(exchange.get_line(line_id=2)['input'].tolist())
+    exchange.close()
+    exchange.close()
+
+
+class TestSharedExchange(TestCase):
+
+    def setUp(self):
+        self.writer = SharedExchange(name=f'dpx_test_{getpid()}')
+        self.reader = SharedExchange(name=f'dpx_test_{getpid()}')
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.close()
+
+    def test_update(self):
+        # Lines are empty before being written
+        self.assertEqual(self.reader.get_line(line_id=1), {})
+        self.writer.update(line_id=1, data={'input': arange(6.).reshape((2, 3)), 'step': 3})
+        line = self.reader.get_line(line_id=1)
+        self.assertEqual(line['id'], 1)
+        assert_array_equal(line['input'], arange(6.).reshape((2, 3)))
+        self.assertEqual(line['step'], 3)
+        # Fields can be selected
+        self.assertEqual(list(self.reader.get_line(line_id=1, fields='input').keys()), ['id', 'input'])
+
+    def test_resize(self):
+        self.writer.update(line_id=1, data={'input': zeros(2)})
+        self.reader.get_line(line_id=1)
+        # Larger data is written in a new block
+        self.writer.update(line_id=1, data={'input': arange(100.)})
+        assert_array_equal(self.reader.get_line(line_id=1, fields=['input'])['input'], arange(100.))
+        # Both sides can write in the same line
+        self.reader.update(line_id=1, data={'prediction': arange(3)})
+        self.assertIsInstance(self.writer.get_line(line_id=1)['prediction'], ndarray)
+        self.assertEqual(set(self.writer.get_line(line_id=1).keys()), {'id', 'input', 'prediction'})
+
+    def test_processes(self):
+        self.writer.update(line_id=1, data={'input': arange(4.)})
+        self.writer.get_line(line_id=1)
+        # The Client attaches to the blocks of the server from another process
+        context = get_context('spawn')
+        queue = context.Queue()
+        client = context.Process(target=client_process, args=(self.writer.name, queue))
+        client.start()
+        self.assertEqual(queue.get(timeout=30), [0., 1., 2., 3.])
+        self.assertEqual(queue.get(timeout=30), [0., 1., 2.])
+        client.join(timeout=30)
+        self.assertEqual(client.exitcode, 0)
+        # The blocks of the server are not unlinked by the Client, the blocks of the Client are
+        assert_array_equal(self.reader.get_line(line_id=1, fields='input')['input'], arange(4.))
+        self.assertEqual(self.reader.get_line(line_id=2), {})
+        # The blocks of the server are unlinked when it is closed
+        self.writer.close()
+        self.writer.close()
+        self.assertEqual(SharedExchange(name=self.writer.name).get_line(line_id=1), {})
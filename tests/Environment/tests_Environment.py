@@ -1,6 +1,11 @@
 from unittest import TestCase
+from os import getcwd
+from os.path import join
+from shutil import rmtree
 import numpy as np
 
+from SSD.Core.Storage.Database import Database
+
 from DeepPhysX.Core.Environment.BaseEnvironment import BaseEnvironment
 
 
@@ -70,3 +75,29 @@ class TestBaseEnvironment(TestCase):
         # Check additional data are well-defined in environment
         self.assertTrue('field' in self.env.additional_fields)
         self.assertTrue(np.equal(self.env.additional_fields['field'], additional_field).all())
+
+    def test_write_buffer(self):
+        # Partition in which the Environment writes its samples
+        database_dir = join(getcwd(), 'test_environment_dataset')
+        self.addCleanup(rmtree, database_dir, ignore_errors=True)
+        partition = Database(database_dir=database_dir, database_name='partition_0').new()
+        self.addCleanup(partition.close)
+        partition.create_table(table_name='Training', fields=[('env_id', int), ('input', np.ndarray)])
+        partition.create_table(table_name='Additional', fields=[('env_id', int)])
+        handler = self.env.get_database_handler()
+        handler.init(storing_partitions=[partition], exchange_db=None)
+        self.env.write_buffer_size = 3
+        # Samples are buffered, the buffer is written when it is full
+        for step in range(5):
+            self.env.set_training_data(input=np.full((2,), step, dtype=float))
+            self.assertIsNone(self.env._send_training_data())
+            self.env._reset_training_data()
+        self.assertEqual(partition.nb_lines(table_name='Training'), 3)
+        # The flush writes the remaining samples and gives the indices of every written sample
+        lines = self.env._flush_training_data()
+        self.assertEqual(lines, [[0, line_id] for line_id in range(1, 6)])
+        self.assertEqual(self.env._flush_training_data(), [])
+        data = handler.get_lines(table_name='Training', lines_id=lines, fields=['input'])
+        self.assertTrue(np.equal(data['input'][:, 0], np.arange(5)).all())
+        # Each Table has a line per sample
+        self.assertEqual(partition.nb_lines(table_name='Additional'), 5)
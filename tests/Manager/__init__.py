@@ -1,3 +1,6 @@
 from .tests_EnvironmentManager import TestEnvironmentManager
 from .tests_NetworkManager import TestNetworkManager
+from .tests_NetworkPredictions import TestNetworkPredictions
 from .tests_DatasetManager import TestDatasetManager
+from .tests_DatabaseManager import TestDatabaseManager
+from .tests_DataManager import TestDataManager
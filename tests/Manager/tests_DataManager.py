@@ -0,0 +1,147 @@
+from unittest import TestCase
+from os import getcwd
+from os.path import join, isdir
+from shutil import rmtree
+from threading import Event
+from types import SimpleNamespace
+from time import sleep
+from unittest.mock import patch
+
+from DeepPhysX.Core.Manager.DataManager import DataManager
+from DeepPhysX.Core.Database.BaseDatabaseConfig import BaseDatabaseConfig
+
+
+class ProducerEnvironmentManager:
+
+    def __init__(self, error_at=None):
+        # Produce batches of a single sample with increasing indices
+        self.always_produce = True
+        self.nb_batches = 0
+        self.error_at = error_at
+        self.produced = Event()
+        self.buffered = []
+
+    def get_data(self, animate=True):
+        self.nb_batches += 1
+        self.produced.set()
+        if self.nb_batches == self.error_at:
+            raise ValueError('Error in the Environment.')
+        sleep(0.01)
+        return [[0, self.nb_batches]]
+
+    def flush_data(self):
+        lines, self.buffered = self.buffered, []
+        return lines
+
+    def close(self):
+        pass
+
+
+class TestDataManager(TestCase):
+
+    def setUp(self):
+        self.session = join(getcwd(), 'test_data_manager')
+        self.manager = None
+
+    def tearDown(self):
+        if self.manager is not None:
+            self.manager.close()
+        if isdir(self.session):
+            rmtree(self.session)
+
+    def create_manager(self, prefetch_batches, error_at=None):
+        self.manager = DataManager(pipeline=SimpleNamespace(type='training'),
+                                   database_config=BaseDatabaseConfig(),
+                                   session=self.session)
+        self.manager.environment_manager = ProducerEnvironmentManager(error_at=error_at)
+        self.manager.prefetch_batches = prefetch_batches
+        return self.manager
+
+    def wait_production(self):
+        # Let the prefetch thread produce the batches it is allowed to
+        environment_manager = self.manager.environment_manager
+        while environment_manager.produced.wait(timeout=0.2):
+            environment_manager.produced.clear()
+
+    def test_prefetch_order(self):
+        manager = self.create_manager(prefetch_batches=2)
+        # Batches are used in the order they were produced
+        for batch_id in range(1, 6):
+            manager.get_data()
+            self.assertEqual(manager.data_lines, [[0, batch_id]])
+
+    def test_prefetch_slots(self):
+        manager = self.create_manager(prefetch_batches=2)
+        manager.get_data()
+        self.wait_production()
+        # Only 'prefetch_batches' batches are produced in advance
+        self.assertEqual(manager.environment_manager.nb_batches, 3)
+        manager.get_data()
+        self.wait_production()
+        self.assertEqual(manager.environment_manager.nb_batches, 4)
+
+    def test_prefetch_stop(self):
+        manager = self.create_manager(prefetch_batches=2)
+        manager.get_data()
+        self.wait_production()
+        # The batches produced in advance are added to the Database when the prefetch stops
+        manager.set_eval()
+        self.assertEqual(manager.database_manager.json_content['nb_samples']['training'], [3])
+        nb_batches = manager.environment_manager.nb_batches
+        self.wait_production()
+        self.assertEqual(manager.environment_manager.nb_batches, nb_batches)
+
+    def test_prefetch_error(self):
+        manager = self.create_manager(prefetch_batches=2, error_at=2)
+        manager.get_data()
+        # The error of the prefetch thread is raised when its batch is used
+        self.assertRaises(ValueError, manager.get_data)
+        # The production restarts at the next batch
+        manager.get_data()
+        self.assertEqual(manager.data_lines, [[0, 3]])
+
+    def test_close_flush(self):
+        manager = self.create_manager(prefetch_batches=0)
+        manager.environment_manager.buffered = [[0, 4], [0, 5]]
+        # The samples still buffered by the Environments are added to the Database when closing
+        with patch.object(manager.database_manager, 'add_data') as add_data:
+            manager.close()
+        self.manager = None
+        add_data.assert_called_once_with([[0, 4], [0, 5]])
+
+    def create_dataset(self, nb_samples):
+        # A Database of samples read by the loader workers, a batch is read as its indices
+        self.manager = DataManager(pipeline=SimpleNamespace(type='training', network_manager=SimpleNamespace(
+                                       load_batch=lambda data_lines, normalization: data_lines)),
+                                   database_config=BaseDatabaseConfig(shuffle=True, loader_workers=2),
+                                   session=self.session)
+        database_manager = self.manager.database_manager
+        partition = database_manager.partitions['training'][0]
+        database_manager.add_data([[0, partition.add_data(table_name='Training', data={'env_id': 0})]
+                                   for _ in range(nb_samples)])
+        return self.manager
+
+    def test_loader_mode(self):
+        manager = self.create_dataset(nb_samples=20)
+        epoch = []
+        for _ in range(2):
+            manager.get_data()
+            epoch += manager.data_lines
+        # The batches read before a validation are used after it, in the same epoch
+        manager.set_eval()
+        manager.set_train()
+        for _ in range(18):
+            manager.get_data()
+            epoch += manager.data_lines
+        self.assertEqual(sorted(epoch), [[0, line_id] for line_id in range(1, 21)])
+
+    def test_loader_indexing(self):
+        manager = self.create_dataset(nb_samples=20)
+        manager.get_data()
+        manager.set_eval()
+        manager.set_train()
+        # The batches read from a previous indexing are dropped
+        manager.database_manager.index_samples()
+        expected = manager.database_manager.get_sample_indices(start=0, end=1)
+        manager.get_data()
+        self.assertEqual(manager.data_lines, expected)
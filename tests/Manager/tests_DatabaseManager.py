@@ -0,0 +1,271 @@
+from unittest import TestCase
+from os import getcwd, listdir
+from os.path import join, isdir, isfile
+from shutil import rmtree
+from json import load, loads
+from numpy import ndarray, zeros
+from numpy.random import seed
+from unittest.mock import patch
+
+from SSD.Core.Storage.Database import Database
+
+from DeepPhysX.Core.Manager.DatabaseManager import DatabaseManager
+from DeepPhysX.Core.Database.BaseDatabaseConfig import BaseDatabaseConfig
+from DeepPhysX.Core.Database.DatabaseHandler import DatabaseHandler
+
+
+class TestDatabaseManager(TestCase):
+
+    def setUp(self):
+        # Partitions of different sizes, including an empty one
+        self.nb_samples = [5, 0, 7, 3]
+        self.samples = sorted([partition_id, line_id] for partition_id, nb_lines in enumerate(self.nb_samples)
+                              for line_id in range(1, nb_lines + 1))
+        self.session = join(getcwd(), 'test_database_manager')
+        self.manager = None
+
+    def tearDown(self):
+        if self.manager is not None:
+            self.manager.close()
+        if isdir(self.session):
+            rmtree(self.session)
+
+    def create_session(self, nb_shards=1, **config):
+        self.manager = DatabaseManager(database_config=BaseDatabaseConfig(**config),
+                                       pipeline='data_generation',
+                                       session=self.session,
+                                       nb_shards=nb_shards)
+        return self.manager
+
+    def add_samples(self, manager, nb_samples):
+        # Write the given number of samples in each partition
+        lines = []
+        for partition_id, nb_lines in enumerate(nb_samples):
+            partition = manager.partitions[manager.mode][partition_id]
+            lines += [[partition_id, partition.add_data(table_name='Training', data={'env_id': partition_id})]
+                      for _ in range(nb_lines)]
+        manager.add_data(lines)
+
+    def create_dataset(self, shuffle, shuffle_block_size=None):
+        # A new session with partitions of different sizes
+        if self.manager is not None:
+            self.manager.close()
+            rmtree(self.session)
+        manager = self.create_session(shuffle=shuffle, shuffle_block_size=shuffle_block_size)
+        for _ in range(len(self.nb_samples) - 1):
+            manager.create_partitions()
+        self.add_samples(manager, self.nb_samples)
+        return manager
+
+    def test_index_samples(self):
+        for shuffle, shuffle_block_size in [(False, None), (True, None), (True, 1), (True, 4), (True, 100)]:
+            manager = self.create_dataset(shuffle, shuffle_block_size)
+            manager.index_samples()
+            self.assertEqual(manager.nb_indexed_samples, len(self.samples))
+            samples = manager.get_sample_indices(start=0, end=len(self.samples))
+            # Each sample is returned exactly once
+            self.assertEqual(sorted(samples), self.samples)
+            if not shuffle:
+                self.assertEqual(samples, self.samples)
+            # Reading the indexing by batches gives the same order
+            batches = []
+            for start in range(0, len(self.samples), 4):
+                batches += manager.get_sample_indices(start=start, end=min(start + 4, len(self.samples)))
+            self.assertEqual(batches, samples)
+
+    def test_partitions_boundaries(self):
+        manager = self.create_dataset(shuffle=False)
+        manager.index_samples()
+        # Last line of a partition and first line of the next non-empty one
+        self.assertEqual(manager.get_sample_indices(start=4, end=6), [[0, 5], [2, 1]])
+        self.assertEqual(manager.get_sample_indices(start=11, end=13), [[2, 7], [3, 1]])
+        self.assertEqual(manager.get_sample_indices(start=14, end=15), [[3, 3]])
+
+    def test_seed(self):
+        for shuffle_block_size in [None, 4]:
+            orders = []
+            for _ in range(2):
+                manager = self.create_dataset(shuffle=True, shuffle_block_size=shuffle_block_size)
+                seed(0)
+                manager.index_samples()
+                orders.append(manager.get_sample_indices(start=0, end=len(self.samples)))
+            self.assertEqual(orders[0], orders[1])
+
+    def test_get_data(self):
+        for shuffle_block_size in [None, 4]:
+            manager = self.create_dataset(shuffle=True, shuffle_block_size=shuffle_block_size)
+            # Each epoch returns every sample exactly once
+            for _ in range(3):
+                epoch = []
+                for _ in range(3):
+                    epoch += manager.get_data(batch_size=5)
+                self.assertEqual(sorted(epoch), self.samples)
+
+    def test_change_mode(self):
+        for shuffle_block_size in [None, 4]:
+            manager = self.create_dataset(shuffle=True, shuffle_block_size=shuffle_block_size)
+            epoch = manager.get_data(batch_size=5) + manager.get_data(batch_size=5)
+            # The indexing of the training samples is kept while the validation samples are used
+            manager.change_mode('validation')
+            manager.create_partitions()
+            self.add_samples(manager, [2])
+            self.assertEqual(sorted(manager.get_data(batch_size=2)), [[0, 1], [0, 2]])
+            manager.change_mode('training')
+            epoch += manager.get_data(batch_size=5)
+            self.assertEqual(sorted(epoch), self.samples)
+
+    def test_extend_indexing(self):
+        for shuffle, shuffle_block_size in [(False, None), (True, None), (True, 4)]:
+            manager = self.create_dataset(shuffle, shuffle_block_size)
+            epoch = manager.get_data(batch_size=5)
+            # The samples added during an epoch are used in the same epoch
+            self.add_samples(manager, [0, 2, 0, 1])
+            epoch += manager.get_data(batch_size=len(self.samples) - 2)
+            samples = sorted(self.samples + [[1, 1], [1, 2], [3, 4]])
+            self.assertEqual(sorted(epoch), samples)
+            self.assertEqual(manager.nb_indexed_samples, len(samples))
+            # The next epoch uses a new indexing of every sample
+            self.assertEqual(sorted(manager.get_data(batch_size=len(samples))), samples)
+
+    def test_create_partitions(self):
+        manager = self.create_session(nb_shards=3)
+        self.assertEqual(len(manager.partitions['training']), 3)
+        # The new shards are given to the handlers at once
+        updates = []
+        handler = DatabaseHandler(on_partitions_handler=lambda: updates.append(len(handler.get_partitions())))
+        manager.connect_handler(handler)
+        manager.create_partitions()
+        self.assertEqual(updates, [6])
+        self.assertEqual(handler.get_partitions(), manager.partitions['training'])
+
+    def test_remove_empty_partitions(self):
+        manager = self.create_session(nb_shards=3)
+        manager.create_partitions()
+        # Only the first and the last of the current shards receive samples
+        for partition_id in [3, 5]:
+            manager.partitions['training'][partition_id].add_data(table_name='Training',
+                                                                  data={'env_id': partition_id})
+        manager.add_data()
+        names = [manager.partition_names['training'][partition_id] for partition_id in [3, 5]]
+        manager.close()
+        self.manager = None
+        # Empty shards are removed at any position
+        with open(join(self.session, 'dataset', 'dataset.json')) as json_file:
+            json_content = load(json_file)
+        self.assertEqual(json_content['partitions']['training'], names)
+        self.assertEqual(json_content['nb_samples']['training'], [1, 1])
+        self.assertEqual(sorted(f for f in listdir(join(self.session, 'dataset')) if f.endswith('.db')),
+                         sorted(f'{name}.db' for name in names))
+
+    def test_add_data_counts(self):
+        manager = self.create_session()
+        partition = manager.partitions['training'][0]
+        lines = [[0, partition.add_data(table_name='Training', data={'env_id': 0})] for _ in range(3)]
+        # The number of samples is given by the new lines, the partition is not queried
+        with patch.object(partition, 'nb_lines', side_effect=AssertionError('The partition should not be queried.')):
+            manager.add_data(lines)
+        self.assertEqual(manager.json_content['nb_samples']['training'], [3])
+
+    def test_prepare_partitions(self):
+        manager = self.create_session()
+        manager.partitions['training'][0].create_fields(table_name='Training', fields=('input', ndarray))
+        name = manager.partition_template['training'].format(1)
+        # The next partition is created in advance with the Fields of the Database
+        manager.prepare_partitions()
+        manager.next_partitions_thread.join()
+        self.assertEqual(manager.next_partitions, [name])
+        self.assertTrue(isfile(join(manager.database_dir, f'{name}.db')))
+        # The prepared partitions are discarded when the mode changes
+        manager.change_mode('validation')
+        self.assertEqual(manager.next_partitions, [])
+        self.assertFalse(isfile(join(manager.database_dir, f'{name}.db')))
+        # A prepared partition is used when the partitions are created
+        manager.change_mode('training')
+        manager.prepare_partitions()
+        manager.create_partitions()
+        self.assertEqual(manager.partition_names['training'][-1], name)
+        self.assertIn('input', manager.partitions['training'][-1].get_fields(table_name='Training'))
+
+    def test_partitions_rollover(self):
+        manager = self.create_session(max_file_size=1e-4)
+        manager.partitions['training'][0].create_fields(table_name='Training', fields=('input', ndarray))
+        probes = []
+        memory_size = Database.memory_size
+        with patch.object(Database, 'memory_size', property(lambda db: probes.append(db) or memory_size.fget(db))):
+            for _ in range(500):
+                partition_id = len(manager.partitions['training']) - 1
+                line_id = manager.partitions['training'][partition_id].add_data(table_name='Training',
+                                                                                data={'env_id': 0,
+                                                                                      'input': zeros(100)})
+                manager.add_data([[partition_id, line_id]])
+        # New partitions are created with the same Fields when the current one is full
+        self.assertGreater(len(manager.partitions['training']), 1)
+        for partition in manager.partitions['training']:
+            self.assertIn('input', partition.get_fields(table_name='Training'))
+        self.assertEqual(sum(manager.json_content['nb_samples']['training']), 500)
+        # The size is only measured when the estimated size reaches half of the remaining space
+        self.assertLess(len(probes), 100)
+
+    def test_journal_append(self):
+        manager = self.create_session()
+        json_path = join(self.session, 'dataset', 'dataset.json')
+        journal_path = join(self.session, 'dataset', 'dataset.journal')
+        self.add_samples(manager, [2])
+        self.add_samples(manager, [3])
+        # Each batch is recorded in the journal, the json file is only written at compaction
+        with open(journal_path) as journal_file:
+            records = [loads(line) for line in journal_file]
+        self.assertEqual(records, [{'mode': 'training', 'nb_samples': {'0': 2}},
+                                   {'mode': 'training', 'nb_samples': {'0': 5}}])
+        with open(json_path) as json_file:
+            self.assertEqual(load(json_file)['nb_samples']['training'], [2])
+
+    def test_journal_replay(self):
+        manager = self.create_session()
+        manager.json_content['normalization'] = {'env_id': [0., 1.]}
+        self.add_samples(manager, [2])
+        self.add_samples(manager, [3])
+        # The session is interrupted while a record is written
+        manager.journal_file.write('{"mode":"training","nb_sa')
+        manager.journal_file.flush()
+        manager = DatabaseManager(database_config=BaseDatabaseConfig(),
+                                  pipeline='data_generation',
+                                  session=self.session,
+                                  new_session=False)
+        self.manager = manager
+        # The complete records are applied and the normalization is cleared to be computed again
+        self.assertEqual(manager.json_content['nb_samples']['training'], [5])
+        self.assertEqual(manager.json_content['normalization'], {})
+        # The journal is compacted in the json file when the Database is loaded
+        self.assertFalse(isfile(join(self.session, 'dataset', 'dataset.journal')))
+        with open(join(self.session, 'dataset', 'dataset.json')) as json_file:
+            self.assertEqual(load(json_file)['nb_samples']['training'], [5])
+
+    def test_journal_compaction(self):
+        manager = self.create_session(journal_checkpoint=2)
+        json_path = join(self.session, 'dataset', 'dataset.json')
+        journal_path = join(self.session, 'dataset', 'dataset.journal')
+        self.add_samples(manager, [1])
+        with open(json_path) as json_file:
+            content = json_file.read()
+        # The compaction is interrupted before the json file is replaced
+        calls = []
+
+        def interrupted_replace(src, dst):
+            calls.append('replace')
+            raise OSError('Interrupted compaction.')
+
+        with patch('DeepPhysX.Core.Manager.DatabaseManager.fsync', side_effect=lambda fd: calls.append('fsync')), \
+                patch('DeepPhysX.Core.Manager.DatabaseManager.replace', side_effect=interrupted_replace):
+            self.assertRaises(OSError, self.add_samples, manager, [1])
+        # The temporary file is synchronized before replacing the json file, which is left unchanged
+        self.assertEqual(calls, ['fsync', 'replace'])
+        with open(json_path) as json_file:
+            self.assertEqual(json_file.read(), content)
+        self.assertTrue(isfile(journal_path))
+        # The next compaction replaces the json file and removes the journal
+        self.add_samples(manager, [1])
+        with open(json_path) as json_file:
+            self.assertEqual(load(json_file)['nb_samples']['training'], [3])
+        self.assertFalse(isfile(journal_path))
+        self.assertFalse(isfile(f'{json_path}.tmp'))
@@ -17,9 +17,9 @@ class TestEnvironmentManager(TestCase):
     def setUp(self):
         self.env_config_single = BaseEnvironmentConfig(environment_class=TestEnvironment,
                                                        as_tcp_ip_client=False,
-                                                       param_dict={'interpolation': [0, 1, 0, 0]})
+                                                       env_kwargs={'interpolation': [0, 1, 0, 0]})
         self.env_config_tcp_ip = BaseEnvironmentConfig(environment_class=TestEnvironment,
-                                                       param_dict={'interpolation': [0, 1, 0, 0]},
+                                                       env_kwargs={'interpolation': [0, 1, 0, 0]},
                                                        number_of_thread=4)
         self.manager = None
 
@@ -49,6 +49,13 @@ class TestEnvironmentManager(TestCase):
         self.assertEqual(self.manager.train, True)
         self.assertEqual(self.manager.visualizer_manager, None)
 
+    def test_requests_per_client(self):
+        config = BaseEnvironmentConfig(environment_class=TestEnvironment,
+                                       number_of_thread=2,
+                                       requests_per_client=2)
+        # Several requests per Client are not allowed when Environments may request predictions
+        self.assertRaises(ValueError, EnvironmentManager, environment_config=config, pipeline='training')
+
     def test_get_data_single(self):
         self.manager = EnvironmentManager(environment_config=self.env_config_single, batch_size=5)
         # Get a batch size of 5
@@ -0,0 +1,94 @@
+from unittest import TestCase
+from os import getcwd, makedirs
+from os.path import join, isdir
+from shutil import rmtree
+from numpy import ndarray, array, full, arange
+from numpy.testing import assert_allclose
+
+from SSD.Core.Storage.Database import Database
+
+from DeepPhysX.Core.Manager.NetworkManager import NetworkManager
+from DeepPhysX.Core.Network.BaseNetwork import BaseNetwork
+from DeepPhysX.Core.Network.BaseNetworkConfig import BaseNetworkConfig
+
+
+class SumNetwork(BaseNetwork):
+
+    def __init__(self, config):
+        BaseNetwork.__init__(self, config)
+        # Shapes of the batches given to the Network
+        self.batches = []
+
+    def forward(self, input_data):
+        self.batches.append(input_data.shape)
+        return 2 * input_data.sum(axis=-1)
+
+    def set_eval(self):
+        pass
+
+    def set_device(self):
+        pass
+
+    def load_parameters(self, path):
+        pass
+
+    def numpy_to_tensor(self, data, grad=True):
+        return data
+
+    def tensor_to_numpy(self, data):
+        return data
+
+
+class TestNetworkPredictions(TestCase):
+
+    def setUp(self):
+        # A prediction session with a saved Network and an Exchange Database with a line for each instance
+        self.session = join(getcwd(), 'test_network_predictions')
+        makedirs(join(self.session, 'network'))
+        open(join(self.session, 'network', 'network.pth'), 'w').close()
+        self.manager = NetworkManager(network_config=BaseNetworkConfig(network_class=SumNetwork),
+                                      session=self.session)
+        self.exchange = Database(database_dir=self.session, database_name='Exchange').new()
+        self.exchange.create_table(table_name='Exchange')
+        self.manager.get_database_handler().init(storing_partitions=[], exchange_db=self.exchange)
+        self.manager.link_clients(nb_clients=4)
+        self.normalization = {'input': [0.5, 2.], 'ground_truth': [1., 3.]}
+
+    def tearDown(self):
+        self.exchange.close()
+        if isdir(self.session):
+            rmtree(self.session)
+
+    def set_inputs(self, inputs):
+        for instance_id, data in enumerate(inputs, start=1):
+            self.manager.get_database_handler().update(table_name='Exchange', data={'input': data},
+                                                       line_id=instance_id)
+
+    def get_predictions(self, instance_ids):
+        return [self.manager.get_database_handler().get_line(table_name='Exchange', fields=['prediction'],
+                                                             line_id=instance_id)['prediction']
+                for instance_id in instance_ids]
+
+    def test_stacked_predictions(self):
+        self.set_inputs([full((4, 3), value, dtype=float) for value in arange(1, 5)])
+        # The samples of the instances are predicted in a single batch
+        self.manager.compute_online_predictions(instance_ids=[1, 2, 3, 4], normalization=self.normalization)
+        self.assertEqual(self.manager.network.batches, [(4, 4, 3)])
+        stacked = self.get_predictions([1, 2, 3, 4])
+        # Each instance gets its own prediction, which is the same as a single prediction
+        for instance_id in [1, 2, 3, 4]:
+            self.manager.compute_online_prediction(instance_id=instance_id, normalization=self.normalization)
+        for prediction, single in zip(stacked, self.get_predictions([1, 2, 3, 4])):
+            self.assertIsInstance(prediction, ndarray)
+            self.assertEqual(prediction.shape, (4,))
+            assert_allclose(prediction, single)
+        # Normalized input, prediction given with the ground truth normalization
+        expected = (2 * 3 * (array([1., 2., 3., 4.]) - 0.5) / 2.) * 3. + 1.
+        assert_allclose([prediction[0] for prediction in stacked], expected)
+
+    def test_different_shapes(self):
+        self.set_inputs([full((4, 3), 1.), full((4, 3), 2.), full((2, 3), 3.)])
+        # Samples with different shapes are predicted separately
+        self.manager.compute_online_predictions(instance_ids=[1, 2, 3], normalization=self.normalization)
+        self.assertEqual(self.manager.network.batches, [(1, 4, 3), (1, 4, 3), (1, 2, 3)])
+        self.assertEqual([prediction.shape for prediction in self.get_predictions([1, 2, 3])], [(4,), (4,), (2,)])
@@ -0,0 +1 @@
+from .tests_statisticsUtils import TestStatisticsUtils
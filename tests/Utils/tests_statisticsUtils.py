@@ -0,0 +1,77 @@
+from unittest import TestCase
+from numpy import array, concatenate, cumsum
+from numpy.random import default_rng
+from numpy.testing import assert_allclose
+
+from DeepPhysX.Core.Utils.statisticsUtils import compute_statistics, merge_statistics, statistics_to_list
+
+
+class TestStatisticsUtils(TestCase):
+
+    def setUp(self):
+        # Chunks of samples of different sizes, including a single sample
+        rng = default_rng(0)
+        sizes = [7, 1, 30, 2, 1, 15]
+        data = rng.normal(loc=3., scale=2., size=(sum(sizes), 4, 3))
+        self.data = data
+        self.chunks = [data[start:end] for start, end in zip(cumsum([0] + sizes[:-1]), cumsum(sizes))]
+
+    def merge_chunks(self, per_component):
+        stats = [0, array(0.), array(0.)]
+        for chunk in self.chunks:
+            stats = merge_statistics(stats, compute_statistics(chunk, per_component))
+        return stats
+
+    def test_compute_statistics(self):
+        # Statistics of all the values
+        count, mean, m2 = compute_statistics(self.data)
+        self.assertEqual(count, self.data.size)
+        assert_allclose(mean, self.data.mean())
+        assert_allclose(m2 / count, self.data.var())
+        # Statistics of each component
+        count, mean, m2 = compute_statistics(self.data, per_component=True)
+        self.assertEqual(count, self.data.shape[0])
+        assert_allclose(mean, self.data.mean(axis=0))
+        assert_allclose(m2 / count, self.data.var(axis=0))
+        # Empty and single samples
+        self.assertEqual(compute_statistics([])[0], 0)
+        count, mean, m2 = compute_statistics(self.data[:1], per_component=True)
+        self.assertEqual(count, 1)
+        assert_allclose(mean, self.data[0])
+        assert_allclose(m2, 0.)
+
+    def test_merge_statistics(self):
+        # Merged statistics of the chunks match the statistics of the whole data
+        count, mean, m2 = self.merge_chunks(per_component=False)
+        self.assertEqual(count, self.data.size)
+        assert_allclose(mean, self.data.mean())
+        assert_allclose((m2 / count) ** 0.5, self.data.std())
+        count, mean, m2 = self.merge_chunks(per_component=True)
+        self.assertEqual(count, self.data.shape[0])
+        assert_allclose(mean, self.data.mean(axis=0))
+        assert_allclose((m2 / count) ** 0.5, self.data.std(axis=0))
+        # Merging empty statistics has no effect
+        stats = compute_statistics(self.chunks[0])
+        self.assertIs(merge_statistics(stats, compute_statistics([])), stats)
+        self.assertIs(merge_statistics([0, array(0.), array(0.)], stats), stats)
+
+    def test_merge_single_samples(self):
+        # Samples merged one by one
+        stats = [0, array(0.), array(0.)]
+        for sample in concatenate(self.chunks[:3]):
+            stats = merge_statistics(stats, compute_statistics(sample[None], per_component=True))
+        count, mean, m2 = stats
+        data = concatenate(self.chunks[:3])
+        self.assertEqual(count, data.shape[0])
+        assert_allclose(mean, data.mean(axis=0))
+        assert_allclose((m2 / count) ** 0.5, data.std(axis=0))
+
+    def test_statistics_to_list(self):
+        # Statistics are converted to serializable values, then merged again
+        stats = statistics_to_list(compute_statistics(self.chunks[0], per_component=True))
+        self.assertIsInstance(stats[0], int)
+        self.assertIsInstance(stats[1], list)
+        count, mean, m2 = merge_statistics(stats, compute_statistics(self.chunks[2], per_component=True))
+        data = concatenate([self.chunks[0], self.chunks[2]])
+        assert_allclose(mean, data.mean(axis=0))
+        assert_allclose(m2 / count, data.var(axis=0))